@@ -0,0 +1,98 @@
+"""
+IVF index benchmark: query latency and recall@k against exact search.
+
+By default a synthetic clustered corpus of unit vectors is generated
+(--rows x --dim, float32) and queries are drawn from the same
+distribution. With --index, the embeddings of a corpus index written by
+`python -m src.index build` are used instead, and queries are stored
+rows with added noise.
+
+Reported: training time, incremental add rate, exact-search latency,
+and latency / speedup / recall@k for every nprobe.
+
+Usage:
+  python benchmarks/bench_ann.py [--rows 200000] [--dim 384] [--lists 1024]
+                                 [--nprobe 1 4 16 64 256] [--index DIR] [--json results.json]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def synthetic(rows, dim, clusters=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim)).astype(np.float32)
+    vectors = np.empty((rows, dim), dtype=np.float32)
+    for start in range(0, rows, 50000):
+        n = min(50000, rows - start)
+        vectors[start:start + n] = centers[rng.integers(clusters, size=n)] + rng.normal(size=(n, dim)) * 1.8
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="IVF index benchmark")
+    parser.add_argument("--rows", type=int, default=200000, help="Synthetic corpus size")
+    parser.add_argument("--dim", type=int, default=384, help="Synthetic embedding size (e5-small: 384)")
+    parser.add_argument("--index", default=None, help="Use the embeddings of this corpus index instead")
+    parser.add_argument("--lists", type=int, default=None, help="IVF lists (default: 4 x sqrt(rows))")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 16, 64, 256], help="Lists searched per query")
+    parser.add_argument("--queries", type=int, default=200, help="Number of queries")
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--json", default=None, help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    from src.ann import IVFIndex, exact_search, recall_at_k
+
+    if args.index:
+        vectors = np.load(os.path.join(args.index, "embeddings.npy"))
+        rng = np.random.default_rng(1)
+        queries = vectors[rng.choice(len(vectors), args.queries)] + rng.normal(size=(args.queries, vectors.shape[1])) * 0.05
+        queries = (queries / np.linalg.norm(queries, axis=1, keepdims=True)).astype(np.float32)
+    else:
+        vectors = synthetic(args.rows + args.queries, args.dim)
+        vectors, queries = vectors[:args.rows], vectors[args.rows:]
+    lists = args.lists or int(4 * np.sqrt(len(vectors)))
+
+    # Train on the first 90% and add the rest incrementally
+    split = int(len(vectors) * 0.9)
+    start = time.perf_counter()
+    index = IVFIndex.train(vectors[:split], lists)
+    train_s = time.perf_counter() - start
+    start = time.perf_counter()
+    index.add(vectors[split:])
+    add_s = time.perf_counter() - start
+    print(f"{len(vectors)} rows x {vectors.shape[1]}, {lists} lists: train {train_s:.1f} s, "
+          f"add {(len(vectors) - split) / max(add_s, 1e-9):.0f} rows/s")
+
+    start = time.perf_counter()
+    exact = [exact_search(vectors, q, args.top_k)[0] for q in queries]
+    exact_ms = (time.perf_counter() - start) / len(queries) * 1000
+    print(f"exact        {exact_ms:>8.2f} ms/query")
+
+    results = {"rows": len(vectors), "dim": int(vectors.shape[1]), "lists": lists, "train_s": round(train_s, 2),
+               "add_rows_per_s": round((len(vectors) - split) / max(add_s, 1e-9)), "exact_ms": round(exact_ms, 3),
+               "ivf": []}
+    for nprobe in args.nprobe:
+        start = time.perf_counter()
+        approx = [index.search(vectors, q, args.top_k, nprobe)[0] for q in queries]
+        ms = (time.perf_counter() - start) / len(queries) * 1000
+        recall = float(np.mean([recall_at_k(e, a) for e, a in zip(exact, approx)]))
+        results["ivf"].append({"nprobe": nprobe, "ms": round(ms, 3), "speedup": round(exact_ms / ms, 1),
+                               f"recall@{args.top_k}": round(recall, 4)})
+        print(f"nprobe={nprobe:<5} {ms:>8.2f} ms/query  ({exact_ms / ms:>5.1f}x)  recall@{args.top_k} {recall:>6.1%}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, ROOT)
+    main()
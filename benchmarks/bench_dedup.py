@@ -0,0 +1,89 @@
+"""
+Encoder work saved by page-furniture removal and duplicate collapsing.
+
+For every collection of config.json, counts the heading candidates that
+would go through the encoder:
+
+  raw          candidates the heading rules select before furniture removal
+  candidates   candidates after furniture removal (what PDFParser returns)
+  exact        distinct candidate texts
+  normalized   distinct texts after whitespace collapsing and lowercasing
+               (what RankingEngine encodes with an uncased tokenizer such
+               as the default e5-small-v2)
+
+and the forward passes (batches) each count takes. No model is loaded.
+
+Usage:
+  python benchmarks/bench_dedup.py [--config config.json] [--batch-size 64] [--json results.json]
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _batches(size, batch_size):
+    return -(-size // batch_size)
+
+
+def _raw_candidates(pdf_parser, pdf_path):
+    # PDFParser._extract_candidates() without the furniture filter
+    lines = pdf_parser._merge_spans_to_lines(pdf_parser._collect_spans(pdf_parser.load_layout(pdf_path)))
+    if not lines["text"]:
+        return []
+    median_size, threshold_width = pdf_parser._calculate_doc_stats(lines)
+    return pdf_parser._build_candidates(lines, median_size, threshold_width)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark for furniture removal and duplicate collapsing")
+    parser.add_argument("--config", default=os.path.join(ROOT, "config.json"), help="Config with the collections")
+    parser.add_argument("--batch-size", type=int, default=64, help="Texts per forward pass")
+    parser.add_argument("--json", default=None, help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    from src.parser import PDFParser
+
+    with open(args.config, "r") as f:
+        collections = json.load(f)["collections"]
+
+    results = []
+    print(f"{'collection':<28} {'raw':>6} {'cand':>6} {'exact':>6} {'norm':>6} {'saved':>6} {'batches':>9}")
+    for name, coll in collections.items():
+        pdf_paths = sorted(glob.glob(os.path.join(ROOT, coll["input_folder"], "*.pdf")))
+        pdf_parser = PDFParser()
+        raw = [c["text"] for p in pdf_paths for c in _raw_candidates(pdf_parser, p)]
+        texts = [c["text"] for p in pdf_paths for c in pdf_parser.extract_candidates(p)]
+        exact = len(set(texts))
+        normalized = len({" ".join(t.split()).lower() for t in texts})
+
+        row = {
+            "collection": name,
+            "documents": len(pdf_paths),
+            "raw": len(raw),
+            "candidates": len(texts),
+            "exact_unique": exact,
+            "normalized_unique": normalized,
+            "texts_saved": len(raw) - normalized,
+            "batches_before": _batches(len(raw), args.batch_size),
+            "batches_after": _batches(normalized, args.batch_size)
+        }
+        results.append(row)
+        print(f"{name:<28} {row['raw']:>6} {row['candidates']:>6} {exact:>6} {normalized:>6} "
+              f"{row['texts_saved']:>6} {row['batches_before']:>4} -> {row['batches_after']:<3}")
+
+    raw = sum(r["raw"] for r in results)
+    saved = sum(r["texts_saved"] for r in results)
+    print(f"\nTotal: {saved} of {raw} encoded texts saved ({saved / raw:.1%})" if raw else "\nNo candidates")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, ROOT)
+    main()
@@ -0,0 +1,108 @@
+"""
+Encoder backend benchmark: throughput and ranking agreement.
+
+All heading candidates of the bundled collections are encoded with each
+backend (see src.ranking.ENCODER_BACKENDS). Reported per backend:
+
+  load_s           model load time
+  texts_per_s      encode throughput (best of --repeat runs, no cache)
+  top_k_overlap    mean share of each document's top-k headings that the
+                   reference backend (the first one listed) also picks,
+                   using the job_query of every collection in config.json
+  top_k_identical  share of documents whose top-k list is identical
+
+Usage:
+  python benchmarks/bench_encoders.py [--backends torch int8 onnx] [--threads 4]
+                                      [--batch-size 64] [--model NAME_OR_PATH] [--json results.json]
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_collections():
+    """(job_query, candidates per document) for every collection in config.json."""
+    from src.pipeline import parse_documents
+
+    with open(os.path.join(ROOT, "config.json"), "r", encoding="utf-8") as f:
+        config = json.load(f)
+
+    collections = []
+    for name, coll in config["collections"].items():
+        pdfs = sorted(glob.glob(os.path.join(ROOT, coll["input_folder"], "*.pdf")))
+        parsed = parse_documents(pdfs)
+        collections.append((name, coll.get("job_query", coll["job_to_be_done"]),
+                            [candidates for _, _, candidates in parsed]))
+    return collections
+
+
+def _keys(matches):
+    return [(m["page_num"], m["y"], m["text"]) for m in matches]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Encoder backend benchmark")
+    parser.add_argument("--backends", nargs="+", default=["torch", "int8", "onnx"],
+                        help="Backends to compare; the first one is the reference")
+    parser.add_argument("--model", default="intfloat/e5-small-v2", help="Model name or local model directory")
+    parser.add_argument("--threads", type=int, default=None, help="CPU threads per backend")
+    parser.add_argument("--batch-size", type=int, default=64, help="Texts per forward pass")
+    parser.add_argument("--top-k", type=int, default=10, help="Headings kept per document")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed encode runs per backend")
+    parser.add_argument("--json", default=None, help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    from src.ranking import RankingEngine
+
+    collections = load_collections()
+    texts = [c["text"] for _, _, docs in collections for candidates in docs for c in candidates]
+    print(f"{len(texts)} candidate texts in {len(collections)} collections")
+
+    results, reference = [], None
+    for backend in args.backends:
+        start = time.perf_counter()
+        try:
+            ranker = RankingEngine(model_name=args.model, batch_size=args.batch_size,
+                                   backend=backend, threads=args.threads)
+        except ImportError as e:
+            print(f"{backend:<6} skipped: {e}")
+            continue
+        load_s = time.perf_counter() - start
+
+        best = float("inf")
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            ranker.encode(texts)
+            best = min(best, time.perf_counter() - start)
+
+        rankings = [
+            _keys(matches)
+            for _, query, docs in collections
+            for matches in ranker.rank_collection(docs, query, top_k=args.top_k)
+        ]
+        if reference is None:
+            reference = rankings
+
+        ranked = [(ref, got) for ref, got in zip(reference, rankings) if ref]
+        overlap = sum(len(set(ref) & set(got)) / len(ref) for ref, got in ranked) / max(len(ranked), 1)
+        identical = sum(ref == got for ref, got in ranked) / max(len(ranked), 1)
+
+        row = {"backend": backend, "load_s": round(load_s, 2), "texts_per_s": round(len(texts) / best, 1),
+               "top_k_overlap": round(overlap, 4), "top_k_identical": round(identical, 4)}
+        results.append(row)
+        print(f"{backend:<6} load {load_s:>6.2f} s  {row['texts_per_s']:>8.1f} texts/s  "
+              f"top-{args.top_k} overlap {overlap:>6.1%}  identical {identical:>6.1%}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, ROOT)
+    main()
@@ -0,0 +1,145 @@
+"""
+Peak-RSS benchmark for parsed documents held in memory.
+
+For every bundled collection, a fresh interpreter parses all PDFs and
+keeps the results alive, as the pipeline does between the parse and
+extract stages. Two representations are compared:
+
+  dict-spans  one 11-key dict per span plus (text, size, span) line
+              tuples (the parser's previous internal format)
+  compact     PDFParser layouts (struct-of-arrays pages) + candidates
+
+Reported per mode: peak RSS, its growth over the post-import baseline,
+and the bytes still referenced by the held results (tracemalloc).
+
+Usage:
+  python benchmarks/bench_memory.py [--json results.json]
+"""
+import argparse
+import glob
+import json
+import os
+import resource
+import subprocess
+import sys
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak / 1024 if sys.platform != "darwin" else peak / (1024 * 1024)
+
+
+def _hold_dict_spans(pdf_paths):
+    import fitz
+    from src.utils import clean_text, is_binary_data
+
+    held = []
+    for pdf_path in pdf_paths:
+        with fitz.open(pdf_path) as doc:
+            all_lines = []
+            for page_num, page in enumerate(doc):
+                spans = []
+                for block in page.get_text("dict")["blocks"]:
+                    for line in block.get("lines", []):
+                        for span in line["spans"]:
+                            spans.append({
+                                "text": span["text"], "font": span["font"], "size": span["size"],
+                                "flags": span["flags"], "x0": span["bbox"][0], "x1": span["bbox"][2],
+                                "y0": span["bbox"][1], "y1": span["bbox"][3], "origin_y": line["bbox"][1],
+                                "page_width": page.rect.width, "page_num": page_num
+                            })
+                # Merge into (text, size, last_span) tuples as the old parser did
+                spans.sort(key=lambda s: (round(s["origin_y"], 1), s["x0"]))
+                buffer, last_y, last_span = "", None, None
+                for span in spans:
+                    text = "" if is_binary_data(span["text"]) else clean_text(span["text"])
+                    if not text:
+                        continue
+                    current_y = round(span["origin_y"], 1)
+                    is_new_para = last_y is not None and abs(current_y - last_y) > span["size"] * 1.2
+                    if buffer and (buffer.endswith((".", "?", "!")) or is_new_para):
+                        all_lines.append((buffer, last_span["size"], last_span))
+                        buffer = text
+                    else:
+                        buffer = buffer + " " + text if buffer else text
+                    last_y, last_span = current_y, span
+                if buffer:
+                    all_lines.append((buffer, last_span["size"], last_span))
+                held.append(spans)
+            held.append(all_lines)
+    return held
+
+
+def _hold_compact(pdf_paths):
+    from src.parser import PDFParser
+
+    parser = PDFParser()
+    held = []
+    for pdf_path in pdf_paths:
+        layout = parser.load_layout(pdf_path)
+        held.append((layout, parser.extract_candidates(layout)))
+    return held
+
+
+def _measure(mode, pdf_paths):
+    """Runs in the child interpreter: returns peak RSS before/after parsing."""
+    import fitz  # noqa: F401  (import cost is not part of the measurement)
+    import numpy  # noqa: F401
+    import src.parser  # noqa: F401
+
+    before = _peak_rss_mb()
+    held = (_hold_dict_spans if mode == "dict-spans" else _hold_compact)(pdf_paths)
+    after = _peak_rss_mb()
+
+    # Second run under tracemalloc: bytes still referenced by the held results
+    del held
+    tracemalloc.start()
+    held = (_hold_dict_spans if mode == "dict-spans" else _hold_compact)(pdf_paths)
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    return {"mode": mode, "documents": len(pdf_paths), "held_objects": len(held),
+            "peak_rss_mb": round(after, 1), "growth_mb": round(after - before, 1),
+            "retained_mb": round(retained / (1024 * 1024), 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Peak-RSS benchmark for parsed document representations")
+    parser.add_argument("--json", default=None, help="Write results to this JSON file")
+    parser.add_argument("--child", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        mode, folder = args.child
+        print(json.dumps(_measure(mode, sorted(glob.glob(os.path.join(folder, "*.pdf"))))))
+        return
+
+    results = []
+    for folder in sorted(glob.glob(os.path.join(ROOT, "data", "*", "PDFs"))):
+        name = os.path.basename(os.path.dirname(folder))
+        row = {"collection": name}
+        for mode in ("dict-spans", "compact"):
+            out = subprocess.run([sys.executable, __file__, "--child", mode, folder],
+                                 check=True, capture_output=True, text=True, cwd=ROOT)
+            row[mode] = json.loads(out.stdout.strip().splitlines()[-1])
+        row["growth_reduction"] = round(1 - row["compact"]["growth_mb"] / max(row["dict-spans"]["growth_mb"], 1e-9), 3)
+        results.append(row)
+
+        for mode in ("dict-spans", "compact"):
+            r = row[mode]
+            print(f"{name:<14} {mode:<11} peak RSS {r['peak_rss_mb']:>6.1f} MB  "
+                  f"growth +{r['growth_mb']:>5.1f} MB  retained {r['retained_mb']:>5.1f} MB")
+        print(f"{name:<14} peak-RSS growth reduction: {row['growth_reduction']:.0%}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, ROOT)
+    main()
@@ -0,0 +1,73 @@
+"""
+Wall-time benchmark for page-range parallelism inside one large PDF.
+
+Builds a synthetic PDF by repeating the pages of the bundled collections
+and extracts its candidates and text index:
+
+  serial     PDFParser.load_layout() + extract_candidates() in one process
+  ranges/N   PDFParser.extract_candidates_parallel() with N workers
+
+Every parallel run is checked against the serial candidates.
+
+Usage:
+  python benchmarks/bench_page_ranges.py [--pages 2000] [--workers 2 4] [--json results.json]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark for page-range parallel parsing")
+    parser.add_argument("--pages", type=int, default=2000, help="Synthetic page count")
+    parser.add_argument("--workers", type=int, nargs="+", default=[2, 4], help="Worker counts")
+    parser.add_argument("--json", default=None, help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    from src.bench import build_pdf
+    from src.parser import PDFParser, page_ranges
+    import glob
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = os.path.join(tmp, f"synthetic-{args.pages}.pdf")
+        build_pdf(pdf_path, args.pages, sorted(glob.glob(os.path.join(ROOT, "data", "*", "PDFs", "*.pdf"))))
+
+        start = time.perf_counter()
+        pdf_parser = PDFParser()
+        layout = pdf_parser.load_layout(pdf_path)
+        serial = (pdf_parser.extract_candidates(layout), layout.to_text_index())
+        serial_seconds = time.perf_counter() - start
+        del layout
+        results.append({"mode": "serial", "seconds": round(serial_seconds, 2), "candidates": len(serial[0])})
+        print(f"serial      {serial_seconds:>6.2f} s  {len(serial[0])} candidates")
+
+        for workers in args.workers:
+            ctx = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+                # Worker start-up is not part of the measurement
+                list(pool.map(abs, range(workers)))
+                start = time.perf_counter()
+                parallel = PDFParser().extract_candidates_parallel(pdf_path, workers, pool)
+                seconds = time.perf_counter() - start
+            results.append({"mode": f"ranges/{workers}", "workers": workers, "seconds": round(seconds, 2),
+                            "ranges": len(page_ranges(args.pages, workers)),
+                            "speedup": round(serial_seconds / seconds, 2), "identical": parallel == serial})
+            print(f"ranges/{workers:<4} {seconds:>6.2f} s  x{serial_seconds / seconds:.2f}  "
+                  f"identical: {parallel == serial}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, ROOT)
+    main()
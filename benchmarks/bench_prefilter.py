@@ -0,0 +1,72 @@
+"""
+Recall@k of the lexical pre-filter against full semantic ranking.
+
+For every collection in config.json, the per-document top-k of full
+semantic ranking (every candidate embedded) is the reference. The same
+ranking is then run on the BM25 shortlist of each size N, and the share
+of reference matches that survive is reported with the number of texts
+that still had to be embedded and the encode time.
+
+Usage:
+  python benchmarks/bench_prefilter.py [--sizes 50 100 200 400] [--top-k 10]
+                                       [--model NAME_OR_PATH] [--json results.json]
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-filter recall@k benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 100, 200, 400], help="Shortlist sizes N")
+    parser.add_argument("--top-k", type=int, default=10, help="Headings kept per document")
+    parser.add_argument("--model", default="intfloat/e5-small-v2", help="Model name or local model directory")
+    parser.add_argument("--json", default=None, help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    from src.lexical import recall_at_k
+    from src.pipeline import parse_documents, prefilter_candidates
+    from src.ranking import RankingEngine
+
+    with open(os.path.join(ROOT, "config.json"), "r", encoding="utf-8") as f:
+        collections = json.load(f)["collections"]
+    ranker = RankingEngine(model_name=args.model)
+
+    def rank(candidates_by_doc, query):
+        # No embedding cache: every run pays for its own encodes
+        start = time.perf_counter()
+        matches = ranker.rank_collection(candidates_by_doc, query, top_k=args.top_k)
+        return matches, time.perf_counter() - start
+
+    results = []
+    for name, coll in collections.items():
+        query = coll.get("job_query", coll["job_to_be_done"])
+        parsed = parse_documents(sorted(glob.glob(os.path.join(ROOT, coll["input_folder"], "*.pdf"))))
+        candidates_by_doc = [candidates for _, _, candidates in parsed]
+        total = sum(map(len, candidates_by_doc))
+
+        reference, full_s = rank(candidates_by_doc, query)
+        print(f"{name}: {total} candidates, full ranking {full_s:.2f} s")
+        for size in args.sizes:
+            shortlisted = prefilter_candidates(parsed, query, size)
+            matches, encode_s = rank(shortlisted, query)
+            recall = recall_at_k(reference, matches)
+            results.append({"collection": name, "candidates": total, "n": size,
+                            "embedded": sum(map(len, shortlisted)), f"recall@{args.top_k}": round(recall, 4),
+                            "rank_s": round(encode_s, 3), "full_rank_s": round(full_s, 3)})
+            print(f"  N={size:<5} embedded {sum(map(len, shortlisted)):>5}  "
+                  f"recall@{args.top_k} {recall:>6.1%}  rank {encode_s:.2f} s")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, ROOT)
+    main()
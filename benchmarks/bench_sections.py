@@ -0,0 +1,159 @@
+"""
+Section-extraction benchmark on synthetic many-heading, many-page PDFs.
+
+Every page holds `headings` headings, each followed by a few body lines,
+and every heading is used as a match. Three implementations cut the same
+sections:
+
+  original     per heading: re-decode every page of its range and build
+               the text with += (the first version of PDFParser)
+  per-heading  per heading: filter the pages of its range on the decoded
+               layout (the previous DocumentLayout.extract_sections)
+  sweep        DocumentLayout.extract_sections (one ordered pass)
+
+Decoding the layout itself is not timed for per-heading and sweep.
+
+Usage:
+  python benchmarks/bench_sections.py [--pages 20 100 400] [--headings 5 20] [--json results.json]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BODY_LINES = 3
+
+
+def build_pdf(path, page_count, headings):
+    """page_count pages, each with `headings` bold headings and BODY_LINES body lines per heading."""
+    import fitz
+
+    line_height = (760 - 40) / (headings * (BODY_LINES + 1))
+    with fitz.open() as doc:
+        for p in range(page_count):
+            page = doc.new_page(width=595, height=842)
+            y = 40
+            for h in range(headings):
+                page.insert_text((50, y + 10), f"Heading {p + 1}.{h + 1}", fontname="hebo", fontsize=10)
+                y += line_height
+                for b in range(BODY_LINES):
+                    page.insert_text((50, y + 8), f"Body line {b + 1} under heading {h + 1} on page {p + 1}",
+                                     fontname="helv", fontsize=7)
+                    y += line_height
+        doc.save(path)
+
+
+def original_sections(pdf_path, matches):
+    import fitz
+    from src.layout import _section
+
+    sorted_matches = sorted(matches, key=lambda x: (x["page_num"], x["y"]))
+    sections = []
+    with fitz.open(pdf_path) as doc:
+        for i, current in enumerate(sorted_matches):
+            start_page, start_y = current["page_num"], current["y"]
+            if i + 1 < len(sorted_matches):
+                end_page, end_y = sorted_matches[i + 1]["page_num"], sorted_matches[i + 1]["y"]
+            else:
+                end_page, end_y = doc.page_count - 1, None
+
+            text = ""
+            for p in range(start_page, end_page + 1):
+                for block in doc[p].get_text("dict")["blocks"]:
+                    for line in block.get("lines", []):
+                        line_y = line["bbox"][1]
+                        if p == start_page and line_y < start_y: continue
+                        if p == end_page and end_y is not None and line_y >= end_y: continue
+                        for span in line["spans"]:
+                            text += span["text"] + " "
+                text += "\n"
+            sections.append(_section(current, text))
+    return sections
+
+
+def per_heading_sections(layout, matches):
+    from src.layout import _section
+
+    sorted_matches = sorted(matches, key=lambda x: (x["page_num"], x["y"]))
+    sections = []
+    for i, current in enumerate(sorted_matches):
+        start_page, start_y = current["page_num"], current["y"]
+        if i + 1 < len(sorted_matches):
+            end_page, end_y = sorted_matches[i + 1]["page_num"], sorted_matches[i + 1]["y"]
+        else:
+            end_page, end_y = layout.page_count - 1, None
+
+        parts = []
+        for p in range(start_page, end_page + 1):
+            page = layout.pages[p]
+            if p == start_page or p == end_page:
+                for line_y, line_text in zip(page.line_y.tolist(), page.line_texts()):
+                    if p == start_page and line_y < start_y: continue
+                    if p == end_page and end_y is not None and line_y >= end_y: continue
+                    parts.append(line_text)
+            else:
+                parts.append(page.text)
+            parts.append("\n")
+        sections.append(_section(current, "".join(parts)))
+    return sections
+
+
+def _timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Section-extraction benchmark")
+    parser.add_argument("--pages", type=int, nargs="+", default=[20, 100, 400], help="Synthetic page counts")
+    parser.add_argument("--headings", type=int, nargs="+", default=[5, 20], help="Headings per page")
+    parser.add_argument("--skip-original", action="store_true", help="Do not time the re-decoding version")
+    parser.add_argument("--json", default=None, help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    from src.parser import PDFParser
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for page_count in args.pages:
+            for headings in args.headings:
+                pdf_path = os.path.join(tmp, f"synthetic-{page_count}-{headings}.pdf")
+                build_pdf(pdf_path, page_count, headings)
+                layout = PDFParser().load_layout(pdf_path)
+                matches = [
+                    {"text": text, "page_num": page.number, "y": y, "score": 0.5}
+                    for page in layout.pages
+                    for y, text in zip(page.line_y.tolist(), page.line_texts()) if text.startswith("Heading")
+                ]
+
+                row = {"pages": page_count, "headings_per_page": headings, "sections": len(matches)}
+                sweep_s, expected = _timed(lambda: layout.extract_sections(matches), 3)
+                per_heading_s, sections = _timed(lambda: per_heading_sections(layout, matches), 3)
+                assert sections == expected
+                row["sweep_s"] = round(sweep_s, 4)
+                row["per_heading_s"] = round(per_heading_s, 4)
+                line = (f"{page_count:>5} pages x {headings:>3} headings  sweep {sweep_s:>8.4f} s  "
+                        f"per-heading {per_heading_s:>8.4f} s ({per_heading_s / sweep_s:>5.1f}x)")
+                if not args.skip_original:
+                    original_s, sections = _timed(lambda: original_sections(pdf_path, matches), 1)
+                    assert sections == expected
+                    row["original_s"] = round(original_s, 4)
+                    line += f"  original {original_s:>8.3f} s ({original_s / sweep_s:>6.0f}x)"
+                print(line)
+                results.append(row)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, ROOT)
+    main()
@@ -0,0 +1,110 @@
+"""
+Peak-RSS benchmark for whole-document vs streaming parsing.
+
+Builds synthetic PDFs of increasing page count by repeating the pages of
+the bundled collections, then parses each one in a fresh interpreter:
+
+  document  PDFParser.extract_candidates() + extract_sections()
+  stream    PDFParser.iter_candidates() + iter_sections()
+
+Streaming peak RSS should stay nearly flat as the page count grows (what
+remains is the list of candidates itself, which the benchmark keeps).
+
+Usage:
+  python benchmarks/bench_streaming.py [--pages 250 1000 3000] [--json results.json]
+"""
+import argparse
+import glob
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak / 1024 if sys.platform != "darwin" else peak / (1024 * 1024)
+
+
+def build_pdf(path, page_count):
+    """Writes a page_count-page PDF made of the bundled PDFs, repeated."""
+    import fitz
+
+    sources = sorted(glob.glob(os.path.join(ROOT, "data", "*", "PDFs", "*.pdf")))
+    with fitz.open() as out:
+        while out.page_count < page_count:
+            for source in sources:
+                with fitz.open(source) as doc:
+                    last = min(doc.page_count, page_count - out.page_count) - 1
+                    out.insert_pdf(doc, to_page=last)
+                if out.page_count >= page_count:
+                    break
+        out.save(path, garbage=1)
+
+
+def _measure(mode, pdf_path):
+    """Runs in the child interpreter."""
+    from src.parser import PDFParser
+
+    parser = PDFParser()
+    before = _peak_rss_mb()
+    start = time.perf_counter()
+    if mode == "document":
+        candidates = parser.extract_candidates(pdf_path)
+        sections = parser.extract_sections(pdf_path, candidates[::10])
+    else:
+        candidates = list(parser.iter_candidates(pdf_path))
+        sections = sum(1 for _ in parser.iter_sections(pdf_path, candidates[::10]))
+    elapsed = time.perf_counter() - start
+    after = _peak_rss_mb()
+
+    return {"mode": mode, "candidates": len(candidates),
+            "sections": sections if isinstance(sections, int) else len(sections),
+            "seconds": round(elapsed, 2), "peak_rss_mb": round(after, 1), "growth_mb": round(after - before, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Peak-RSS benchmark for streaming parsing")
+    parser.add_argument("--pages", type=int, nargs="+", default=[250, 1000, 3000], help="Synthetic page counts")
+    parser.add_argument("--json", default=None, help="Write results to this JSON file")
+    parser.add_argument("--child", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        mode, pdf_path = args.child
+        if mode == "build":
+            build_pdf(pdf_path, int(os.path.basename(pdf_path).split("-")[1].split(".")[0]))
+        else:
+            print(json.dumps(_measure(mode, pdf_path)))
+        return
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for page_count in args.pages:
+            pdf_path = os.path.join(tmp, f"synthetic-{page_count}.pdf")
+            # Built in a child too: Linux carries the peak RSS of a process across exec
+            subprocess.run([sys.executable, __file__, "--child", "build", pdf_path], check=True,
+                           capture_output=True, cwd=ROOT)
+            row = {"pages": page_count}
+            for mode in ("document", "stream"):
+                out = subprocess.run([sys.executable, __file__, "--child", mode, pdf_path],
+                                     check=True, capture_output=True, text=True, cwd=ROOT)
+                row[mode] = r = json.loads(out.stdout.strip().splitlines()[-1])
+                print(f"{page_count:>6} pages  {mode:<9} peak RSS {r['peak_rss_mb']:>7.1f} MB  "
+                      f"growth +{r['growth_mb']:>6.1f} MB  {r['seconds']:>6.2f} s")
+            results.append(row)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, ROOT)
+    main()
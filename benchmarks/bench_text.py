@@ -0,0 +1,152 @@
+"""
+Micro-benchmarks for src/utils text functions on realistic inputs.
+
+Inputs come from the bundled collections:
+
+  spans     raw span texts (what the parser cleans one by one)
+  lines     merged lines (what the heading rules look at)
+  sections  raw section texts, with the newline per page (what
+            extract_sections cleans)
+
+Each function is timed against the original per-character version
+(kept below as reference) and checked to return the same results.
+text_profile() is timed with an empty cache.
+
+Usage:
+  python benchmarks/bench_text.py [--repeat 5] [--json results.json]
+"""
+import argparse
+import glob
+import json
+import os
+import re
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# --- Original implementations (reference) ---
+
+def ref_is_binary_data(text):
+    if not isinstance(text, str):
+        return True
+    printable_chars = sum(1 for c in text if c.isprintable() or c.isspace())
+    if len(text) > 0 and printable_chars / len(text) < 0.7:
+        return True
+    if '\x00' in text or len([c for c in text if ord(c) < 32 and c not in '\n\r\t']) > len(text) * 0.1:
+        return True
+    return False
+
+
+def ref_is_title_case(text):
+    if ref_is_binary_data(text):
+        return False
+    words = text.strip().split()
+    return len(words) > 0 and all(w[0].isupper() for w in words if w[0].isalpha())
+
+
+def ref_is_all_upper(text):
+    if ref_is_binary_data(text):
+        return False
+    return text.isupper() and any(c.isalpha() for c in text)
+
+
+def ref_clean_text(text, max_words=150):
+    if not isinstance(text, str):
+        return ""
+    if ref_is_binary_data(text):
+        return ""
+    cleaned = ''.join(char for char in text if char.isprintable() or char in '\n\r\t ')
+    cleaned = cleaned.replace('\t', ' ')
+    cleaned = re.sub(r'\s+', ' ', cleaned).strip()
+    if ref_is_binary_data(cleaned):
+        return ""
+    words = cleaned.split()
+    if len(words) <= max_words:
+        return cleaned.strip()
+    prefix, suffix = words[:max_words], words[max_words:]
+    collected = []
+    found_period = False
+    for word in suffix:
+        collected.append(word)
+        if word.endswith('.'):
+            found_period = True
+            break
+    if not found_period:
+        return " ".join(prefix + collected).strip() + " ..."
+    return " ".join(prefix + collected).strip()
+
+
+def ref_heading_text_rules(text):
+    return ref_is_all_upper(text), ref_is_title_case(text), len(text.split())
+
+
+def load_inputs():
+    from src.parser import PDFParser
+
+    parser = PDFParser()
+    spans, lines, sections = [], [], []
+    for pdf_path in sorted(glob.glob(os.path.join(ROOT, "data", "*", "PDFs", "*.pdf"))):
+        layout = parser.load_layout(pdf_path)
+        for page in layout.pages:
+            spans.extend(page.span_text)
+            sections.append(page.text + "\n")
+        merged = parser._merge_spans_to_lines(parser._collect_spans(layout))
+        lines.extend(merged["text"])
+    return {"spans": spans, "lines": lines, "sections": sections}
+
+
+def _time(fn, inputs, repeat, before=None):
+    best = float("inf")
+    for _ in range(repeat):
+        if before:
+            before()
+        start = time.perf_counter()
+        results = [fn(text) for text in inputs]
+        best = min(best, time.perf_counter() - start)
+    return best, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks for src/utils")
+    parser.add_argument("--repeat", type=int, default=5, help="Timing runs per case (best is kept)")
+    parser.add_argument("--json", default=None, help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    from src import utils
+
+    def profile_rules(text):
+        profile = utils.text_profile(text)
+        return profile.is_upper, profile.is_title, profile.word_count
+
+    cases = [
+        ("is_binary_data", ref_is_binary_data, utils.is_binary_data, ("spans", "lines", "sections"), None),
+        ("clean_text", ref_clean_text, utils.clean_text, ("spans", "sections"), None),
+        ("is_all_upper", ref_is_all_upper, utils.is_all_upper, ("lines",), utils.text_profile.cache_clear),
+        ("is_title_case", ref_is_title_case, utils.is_title_case, ("lines",), utils.text_profile.cache_clear),
+        ("heading text rules", ref_heading_text_rules, profile_rules, ("lines",), utils.text_profile.cache_clear),
+    ]
+
+    inputs = load_inputs()
+    results = []
+    for name, ref_fn, new_fn, kinds, before in cases:
+        for kind in kinds:
+            ref_s, expected = _time(ref_fn, inputs[kind], args.repeat)
+            new_s, actual = _time(new_fn, inputs[kind], args.repeat, before)
+            assert actual == expected, f"{name} differs on {kind}"
+            n = len(inputs[kind])
+            results.append({"function": name, "inputs": kind, "count": n,
+                            "reference_us": round(ref_s / n * 1e6, 3), "current_us": round(new_s / n * 1e6, 3),
+                            "speedup": round(ref_s / new_s, 2)})
+            print(f"{name:<19} {kind:<9} n={n:<6} reference {ref_s / n * 1e6:>8.2f} us  "
+                  f"current {new_s / n * 1e6:>7.2f} us  ({ref_s / new_s:>5.1f}x)")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, ROOT)
+    main()
@@ -0,0 +1,131 @@
+import os
+import numpy as np
+
+# Rows scored per matrix product while training / assigning (bounds memory)
+CHUNK_ROWS = 8192
+
+
+def _assign(vectors, centroids):
+    """Index of the nearest centroid (highest dot product) of every row."""
+    assign = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), CHUNK_ROWS):
+        chunk = np.asarray(vectors[start:start + CHUNK_ROWS], dtype=np.float32)
+        assign[start:start + len(chunk)] = np.argmax(chunk @ centroids.T, axis=1)
+    return assign
+
+
+def exact_search(vectors, query, k):
+    """Rows of the k highest dot products with query (ties by row) and their scores."""
+    scores = np.asarray(vectors, dtype=np.float32) @ query
+    return _top_k(np.arange(len(scores)), scores, k)
+
+
+def _top_k(rows, scores, k):
+    k = min(k, len(rows))
+    if not k:
+        return rows[:0], scores[:0]
+    top = np.argpartition(-scores, k - 1)[:k]
+    top = top[np.lexsort((rows[top], -scores[top]))]
+    return rows[top], scores[top]
+
+
+def recall_at_k(exact_rows, approx_rows):
+    """Share of the exact top-k rows that the approximate search returned."""
+    if not len(exact_rows):
+        return 1.0
+    return len(np.intersect1d(exact_rows, approx_rows)) / len(exact_rows)
+
+
+class IVFIndex:
+    """
+    Inverted-file (IVF-Flat) index for cosine search over L2-normalized
+    rows of an embedding matrix that is kept elsewhere (e.g. the
+    memory-mapped embeddings.npy of a CorpusIndex).
+
+    Training clusters the rows with spherical k-means; every row is filed
+    under its nearest centroid. A query only scores the rows of its
+    nprobe nearest lists, so cost grows with nprobe / n_lists of the
+    corpus instead of all of it. nprobe is the speed/recall knob:
+    nprobe = n_lists is exact search.
+
+    Rows added later (add) are filed under the existing centroids, so
+    documents can be appended without retraining.
+    """
+
+    def __init__(self, centroids, assign=None):
+        self.centroids = np.asarray(centroids, dtype=np.float32)
+        self.assign = np.zeros(0, dtype=np.int32) if assign is None else np.asarray(assign, dtype=np.int32)
+        self._order = None
+        self._offsets = None
+
+    @property
+    def n_lists(self):
+        return len(self.centroids)
+
+    @property
+    def size(self):
+        return len(self.assign)
+
+    @classmethod
+    def train(cls, vectors, n_lists, iterations=10, sample_size=100000, seed=0):
+        """
+        Learns n_lists centroids from (a sample of) vectors and files
+        every row of vectors in the index.
+        """
+        rng = np.random.default_rng(seed)
+        n_lists = max(1, min(n_lists, len(vectors)))
+        sample_rows = np.sort(rng.choice(len(vectors), min(sample_size, len(vectors)), replace=False))
+        sample = np.asarray(vectors[sample_rows], dtype=np.float32)
+
+        centroids = sample[rng.choice(len(sample), n_lists, replace=False)]
+        for _ in range(iterations):
+            assign = _assign(sample, centroids)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, sample)
+            counts = np.bincount(assign, minlength=n_lists)
+
+            # Empty lists are re-seeded with random sample rows
+            empty = counts == 0
+            sums[empty] = sample[rng.choice(len(sample), int(empty.sum()))]
+            centroids = sums / np.maximum(np.linalg.norm(sums, axis=1, keepdims=True), 1e-12)
+
+        index = cls(centroids)
+        index.add(vectors)
+        return index
+
+    def add(self, vectors):
+        """Files new rows (appended after the existing ones) under their nearest list."""
+        if len(vectors):
+            self.assign = np.concatenate([self.assign, _assign(vectors, self.centroids)])
+            self._order = None
+
+    def probe(self, query, nprobe):
+        """Rows filed under the nprobe lists nearest to query, in row order."""
+        if nprobe < 1:
+            raise ValueError(f"nprobe must be at least 1, got {nprobe}")
+        if self._order is None:
+            # Rows grouped by list: rows of list l are _order[_offsets[l]:_offsets[l + 1]]
+            self._order = np.argsort(self.assign, kind="stable")
+            self._offsets = np.searchsorted(self.assign[self._order], np.arange(self.n_lists + 1))
+
+        nprobe = min(nprobe, self.n_lists)
+        lists = np.argpartition(-(self.centroids @ query), nprobe - 1)[:nprobe]
+        rows = [self._order[self._offsets[l]:self._offsets[l + 1]] for l in lists]
+        return np.sort(np.concatenate(rows)) if rows else np.zeros(0, dtype=int)
+
+    def search(self, vectors, query, k, nprobe=8):
+        """Approximate exact_search(vectors, query, k): only probed rows are scored."""
+        rows = self.probe(query, nprobe)
+        scores = np.asarray(vectors[rows], dtype=np.float32) @ query
+        return _top_k(rows, scores, k)
+
+    def save(self, path):
+        # Written next to path and renamed, so a crash never leaves half a file
+        tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+        np.savez(tmp_path, centroids=self.centroids, assign=self.assign)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data["centroids"], data["assign"])
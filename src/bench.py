@@ -0,0 +1,289 @@
+"""
+Benchmark harness for the full pipeline.
+
+Runs every collection of config.json (and, with --synthetic-pages,
+scaled-up PDFs made of the bundled pages repeated) through
+parse -> encode -> rank -> extract -> write, each workload in a fresh
+interpreter so peak RSS and model load time belong to that workload.
+
+Reported per workload: model load time, wall time per stage, pages/sec,
+candidates/sec and peak RSS. Results are written as JSON (with the git
+commit) so runs of different commits can be compared:
+
+  python -m src.bench -o bench/main.json
+  python -m src.bench -o bench/branch.json --compare bench/main.json
+"""
+import argparse
+import glob
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+
+STAGES = ("parse", "encode", "rank", "extract", "write")
+
+# Workloads slower than the baseline by more than this are flagged by --compare
+REGRESSION_THRESHOLD = 0.10
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak / 1024 if sys.platform != "darwin" else peak / (1024 * 1024)
+
+
+class StageTimer:
+    """Accumulates wall time per named stage."""
+
+    def __init__(self):
+        self.seconds = {}
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[name] = self.seconds.get(name, 0.0) + time.perf_counter() - start
+
+
+def run_workload(pdf_paths, persona, job, ranker, job_query=None, top_k_matches=5, top_k=20,
+                 output_format="json", workers=1):
+    """
+    Runs the pipeline stages over pdf_paths with ranker (already loaded)
+    and returns the timings and throughput of this run. The output is
+    written to a temporary file that is removed afterwards.
+    """
+    from src.output import OutputGenerator
+    from src.parser import PDFParser
+    from src.pipeline import parse_documents
+
+    query = job_query or job
+    parser = PDFParser()
+    timer = StageTimer()
+
+    # 1. Parse candidates (layouts kept for the extract stage)
+    with timer.stage("parse"):
+        parsed = parse_documents(pdf_paths, workers=workers, parser=parser)
+    candidates_by_doc = [candidates for _, _, candidates in parsed]
+    texts = [c["text"] for candidates in candidates_by_doc for c in candidates]
+
+    # 2. Encode candidates and query, 3. rank them per document
+    with timer.stage("encode"):
+        embeddings = ranker.encode(texts) if texts else []
+        query_embedding = ranker.encode_query(query)
+    with timer.stage("rank"):
+        matches_by_doc = ranker.rank_embeddings(candidates_by_doc, embeddings, query_embedding, top_k_matches)
+
+    # 4. Extract sections
+    with timer.stage("extract"):
+        results = [(pdf_path, parser.extract_sections(layout, matches))
+                   for (pdf_path, layout, _), matches in zip(parsed, matches_by_doc)]
+
+    # 5. Write the result file
+    with tempfile.TemporaryDirectory() as tmp:
+        with timer.stage("write"):
+            formatter = OutputGenerator([os.path.basename(p) for p in pdf_paths], persona, job, top_k=top_k)
+            for pdf_path, sections in results:
+                for sec in sections:
+                    formatter.add_result(os.path.basename(pdf_path), sec)
+            formatter.save(os.path.join(tmp, "output.json"), output_format)
+
+    pages = sum(parser.page_count(layout) for _, layout, _ in parsed)
+    total = sum(timer.seconds.values())
+    return {
+        "documents": len(parsed),
+        "pages": pages,
+        "candidates": len(texts),
+        "sections": sum(len(sections) for _, sections in results),
+        "stages": {name: round(timer.seconds.get(name, 0.0), 4) for name in STAGES},
+        "total_seconds": round(total, 4),
+        "pages_per_sec": round(pages / timer.seconds["parse"], 1) if timer.seconds["parse"] else None,
+        "candidates_per_sec": round(len(texts) / timer.seconds["encode"], 1) if timer.seconds["encode"] else None
+    }
+
+
+def build_pdf(path, page_count, sources):
+    """Writes a page_count-page PDF made of the pages of sources, repeated."""
+    import fitz
+
+    with fitz.open() as out:
+        while out.page_count < page_count:
+            for source in sources:
+                with fitz.open(source) as doc:
+                    last = min(doc.page_count, page_count - out.page_count) - 1
+                    out.insert_pdf(doc, to_page=last)
+                if out.page_count >= page_count:
+                    break
+        out.save(path, garbage=1)
+
+
+def compare(results, baseline, threshold=REGRESSION_THRESHOLD):
+    """
+    Total and per-stage time of every workload relative to the same
+    workload in baseline (1.0 = unchanged). Workloads missing from the
+    baseline are skipped.
+    """
+    reference = {w["name"]: w for w in baseline["workloads"]}
+    rows = []
+    for workload in results["workloads"]:
+        old = reference.get(workload["name"])
+        if old is None:
+            continue
+        ratio = workload["total_seconds"] / old["total_seconds"] if old["total_seconds"] else None
+        rows.append({
+            "name": workload["name"],
+            "total_ratio": round(ratio, 3) if ratio is not None else None,
+            "stage_ratios": {
+                name: round(workload["stages"][name] / old["stages"][name], 3) if old["stages"].get(name) else None
+                for name in STAGES
+            },
+            "peak_rss_delta_mb": round(workload["peak_rss_mb"] - old["peak_rss_mb"], 1),
+            "regression": ratio is not None and ratio > 1 + threshold
+        })
+    return rows
+
+
+def _git_commit(root):
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=root,
+                             capture_output=True, text=True, timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def _child(spec):
+    """Runs in a fresh interpreter: loads the model, then runs one workload."""
+    if spec.get("build"):
+        # Built in a child of its own: Linux carries the peak RSS of a process across exec
+        build_pdf(spec["path"], spec["build"], spec["sources"])
+        return {}
+
+    # Import cost is not part of the measurement
+    import fitz  # noqa: F401
+    import torch  # noqa: F401
+
+    from src.ranking import RankingEngine
+
+    start = time.perf_counter()
+    ranker = RankingEngine(model_name=spec["model"], model_path=spec.get("model_path"),
+                           batch_size=spec["batch_size"], backend=spec["backend"], threads=spec["threads"])
+    model_load = time.perf_counter() - start
+
+    row = run_workload(spec["pdf_paths"], spec["persona"], spec["job"], ranker, job_query=spec.get("job_query"),
+                       top_k_matches=spec["top_k_matches"], output_format=spec["output_format"],
+                       workers=spec["workers"])
+    row["model_load_seconds"] = round(model_load, 4)
+    row["peak_rss_mb"] = round(peak_rss_mb(), 1)
+    return row
+
+
+def _run_child(spec, root):
+    out = subprocess.run([sys.executable, "-m", "src.bench", "--child", json.dumps(spec)],
+                         check=True, capture_output=True, text=True, cwd=root)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DocLayout AI - Pipeline benchmark")
+    parser.add_argument('-c', '--config', default="config.json", help="Config with the collections to run")
+    parser.add_argument('-o', '--output', default=None, help="Write results to this JSON file")
+    parser.add_argument('--compare', default=None, help="Baseline results JSON to compare against")
+    parser.add_argument('--collections', nargs="*", default=None,
+                        help="Only these collections (default: all in the config)")
+    parser.add_argument('--synthetic-pages', type=int, nargs="*", default=[],
+                        help="Also run one synthetic PDF per page count, made of the bundled pages repeated")
+    parser.add_argument('--repeat', type=int, default=1, help="Runs per workload (the fastest is kept)")
+    parser.add_argument('--model', default="intfloat/e5-small-v2", help="Sentence-transformers model")
+    parser.add_argument('--model-path', default=None, help="Local model cache folder")
+    parser.add_argument('--backend', default="torch", choices=["torch", "int8", "onnx"], help="Encoder backend")
+    parser.add_argument('--threads', type=int, default=None, help="CPU threads used for encoding")
+    parser.add_argument('--batch-size', type=int, default=64, help="Texts per forward pass")
+    parser.add_argument('-w', '--workers', type=int, default=1, help="Parse PDFs in N worker processes")
+    parser.add_argument('--output-format', default="json", choices=["json", "json-stream", "jsonl"],
+                        help="Format of the (discarded) result file")
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(_child(json.loads(args.child))))
+        return
+
+    root = os.getcwd()
+    with open(args.config, "r") as f:
+        config = json.load(f)
+    collections = config["collections"]
+    names = args.collections if args.collections is not None else list(collections)
+
+    common = {"model": args.model, "model_path": args.model_path, "backend": args.backend,
+              "threads": args.threads, "batch_size": args.batch_size, "workers": args.workers,
+              "output_format": args.output_format,
+              "top_k_matches": config.get("output_settings", {}).get("top_k_matches", 5)}
+
+    # 1. Workloads: the configured collections, then the synthetic PDFs
+    workloads = []
+    for name in names:
+        coll = collections[name]
+        workloads.append((name, {**common, "pdf_paths": sorted(glob.glob(os.path.join(coll["input_folder"], "*.pdf"))),
+                                 "persona": coll["persona"], "job": coll["job_to_be_done"],
+                                 "job_query": coll.get("job_query")}))
+
+    tmp = tempfile.TemporaryDirectory()
+    if args.synthetic_pages:
+        sources = sorted(p for coll in collections.values()
+                         for p in glob.glob(os.path.join(coll["input_folder"], "*.pdf")))
+        first = collections[next(iter(collections))]
+        for page_count in args.synthetic_pages:
+            path = os.path.join(tmp.name, f"synthetic-{page_count}.pdf")
+            _run_child({"build": page_count, "path": path, "sources": sources}, root)
+            workloads.append((f"synthetic-{page_count}", {
+                **common, "pdf_paths": [path], "persona": first["persona"],
+                "job": first["job_to_be_done"], "job_query": first.get("job_query")
+            }))
+
+    # 2. Every run in its own interpreter; the fastest run of each workload is kept
+    results = {
+        "commit": _git_commit(root),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": dict(common),
+        "workloads": []
+    }
+    try:
+        for name, spec in workloads:
+            runs = [_run_child(spec, root) for _ in range(max(1, args.repeat))]
+            row = {"name": name, **min(runs, key=lambda r: r["total_seconds"])}
+            results["workloads"].append(row)
+
+            stages = "  ".join(f"{s} {row['stages'][s]:.2f}s" for s in STAGES)
+            print(f"{name:<16} {row['pages']:>6} pages {row['candidates']:>7} cand  load {row['model_load_seconds']:.2f}s  "
+                  f"{stages}  {row['pages_per_sec'] or 0:.0f} pages/s  {row['candidates_per_sec'] or 0:.0f} cand/s  "
+                  f"peak RSS {row['peak_rss_mb']:.0f} MB")
+    finally:
+        tmp.cleanup()
+
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results saved to {args.output}")
+
+    # 3. Optional comparison with an earlier run
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        print(f"\nCompared with {args.compare} (commit {baseline.get('commit')}):")
+        for row in compare(results, baseline):
+            flag = "  REGRESSION" if row["regression"] else ""
+            print(f"{row['name']:<16} total x{row['total_ratio']}  peak RSS {row['peak_rss_delta_mb']:+.1f} MB{flag}")
+
+
+if __name__ == "__main__":
+    main()
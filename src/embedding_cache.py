@@ -0,0 +1,206 @@
+import contextlib
+import hashlib
+import heapq
+import json
+import os
+import re
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to unlocked access
+    fcntl = None
+
+
+def normalize_text(text):
+    """Whitespace-normalized form of a text, used for cache keys."""
+    return " ".join(text.split())
+
+
+class EmbeddingCache:
+    """
+    Persistent store of text embeddings for one model.
+
+    Vectors live in a memory-mapped float32 matrix (vectors.f32); index.json
+    maps sha1(model name + normalized text) to a row and its last use.
+    When max_entries texts are stored, the least recently used ones are
+    evicted and their rows go on a free list. A row is only overwritten
+    once an index.json without its old text has been written, so the index
+    on disk never points at another text's vector, even after a crash.
+    Writers hold an exclusive file lock and replace index.json atomically;
+    readers take a shared lock, so several processes can use one cache.
+    """
+
+    def __init__(self, cache_dir, model_name, max_entries=200000):
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.dir = os.path.join(cache_dir, re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name))
+        os.makedirs(self.dir, exist_ok=True)
+
+        self.index_path = os.path.join(self.dir, "index.json")
+        self.vectors_path = os.path.join(self.dir, "vectors.f32")
+        self.lock_path = os.path.join(self.dir, "lock")
+
+        self.hits = 0
+        self.misses = 0
+
+        self._index = {"dim": None, "clock": 0, "entries": {}, "free": [], "next_slot": 0}
+        self._index_stamp = None
+        self._vectors = None
+        # Keys hit by lookups (in order of use), persisted with the next write
+        self._touched = {}
+
+    def key(self, text):
+        payload = f"{self.model_name}\0{normalize_text(text)}".encode("utf-8")
+        return hashlib.sha1(payload).hexdigest()
+
+    def get_many(self, texts):
+        """
+        Returns a list with the cached vector (np.ndarray) for each text,
+        or None where the text has not been embedded before.
+        """
+        keys = [self.key(t) for t in texts]
+        found = []
+        with self._lock(shared=True):
+            self._reload()
+            entries = self._index["entries"]
+            for key in keys:
+                entry = entries.get(key)
+                if entry is None:
+                    self.misses += 1
+                    found.append(None)
+                    continue
+                self.hits += 1
+                self._touched.pop(key, None)
+                self._touched[key] = None
+                found.append(np.array(self._vectors[entry[0]]))
+        return found
+
+    def put_many(self, texts, vectors):
+        """Stores the vectors (one row per text) and persists the index."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if not len(texts):
+            return
+
+        with self._lock(shared=False):
+            self._reload()
+            index = self._index
+            entries = index["entries"]
+            if index["dim"] is None:
+                index["dim"] = int(vectors.shape[1])
+
+            for key in self._touched:
+                if key in entries:
+                    index["clock"] += 1
+                    entries[key][1] = index["clock"]
+            self._touched = {}
+
+            pending = {}
+            for text, vector in zip(texts, vectors):
+                key = self.key(text)
+                index["clock"] += 1
+                if key in entries:
+                    entries[key][1] = index["clock"]
+                else:
+                    pending[key] = (vector, index["clock"])
+
+            # More new texts than the cache can hold: keep the last ones
+            pending = dict(list(pending.items())[-self.max_entries:])
+
+            # Rows no entry uses: the free list, then rows from next_slot on
+            free = index.setdefault("free", [])
+            if "next_slot" not in index:
+                # Index written before slots were tracked
+                index["next_slot"] = max((e[0] for e in entries.values()), default=-1) + 1
+
+            # Once max_entries is reached the least recently used entries give
+            # up their rows. The index is saved without them before the rows
+            # are reused
+            overflow = len(entries) + len(pending) - self.max_entries
+            if overflow > 0:
+                for key in heapq.nsmallest(overflow, entries, key=lambda k: entries[k][1]):
+                    free.append(entries.pop(key)[0])
+                self._write_index()
+
+            new_rows = {}
+            for key, (vector, clock) in pending.items():
+                if free:
+                    slot = free.pop()
+                else:
+                    slot = index["next_slot"]
+                    index["next_slot"] += 1
+                entries[key] = [slot, clock]
+                new_rows[slot] = vector
+
+            if new_rows:
+                self._ensure_capacity(max(new_rows) + 1)
+                for slot, vector in new_rows.items():
+                    self._vectors[slot] = vector
+                self._vectors.flush()
+            self._write_index()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._index["entries"]),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0
+        }
+
+    # --- Helper Methods for Internal Logic ---
+
+    def _ensure_capacity(self, rows):
+        dim = self._index["dim"]
+        row_bytes = dim * 4
+        current = os.path.getsize(self.vectors_path) // row_bytes if os.path.exists(self.vectors_path) else 0
+        if current < rows:
+            # Grow geometrically (up to max_entries, unless more rows are in use) to
+            # avoid resizing on every write
+            capacity = max(rows, min(self.max_entries, max(current * 2, 1024)))
+            with open(self.vectors_path, "ab") as f:
+                f.truncate(capacity * row_bytes)
+            self._vectors = None
+        if self._vectors is None:
+            self._open_vectors()
+
+    def _open_vectors(self):
+        dim = self._index["dim"]
+        rows = os.path.getsize(self.vectors_path) // (dim * 4)
+        self._vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r+", shape=(rows, dim))
+
+    def _reload(self):
+        """Re-reads index.json if another process replaced it."""
+        if not os.path.exists(self.index_path):
+            return
+        stat = os.stat(self.index_path)
+        stamp = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        if stamp == self._index_stamp:
+            return
+
+        with open(self.index_path, "r", encoding="utf-8") as f:
+            self._index = json.load(f)
+        self._index_stamp = stamp
+        self._vectors = None
+        if self._index["dim"] is not None and os.path.exists(self.vectors_path):
+            self._open_vectors()
+
+    def _write_index(self):
+        tmp_path = f"{self.index_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._index, f)
+        os.replace(tmp_path, self.index_path)
+        stat = os.stat(self.index_path)
+        self._index_stamp = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+    @contextlib.contextmanager
+    def _lock(self, shared):
+        if fcntl is None:
+            yield
+            return
+        with open(self.lock_path, "a") as f:
+            fcntl.flock(f, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
@@ -0,0 +1,342 @@
+import argparse
+import glob
+import heapq
+import json
+import os
+import threading
+import numpy as np
+from src.ann import IVFIndex
+from src.layout import DocumentLayout, SectionCache
+from src.output import OutputGenerator
+
+INDEX_VERSION = 1
+
+# Lists probed per query when the index was built with an ANN index
+DEFAULT_NPROBE = 8
+
+
+def _normalize_rows(matrix):
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+
+def _to_numpy(embeddings):
+    # RankingEngine.encode() returns a torch tensor
+    return embeddings.cpu().numpy() if hasattr(embeddings, "cpu") else np.asarray(embeddings)
+
+
+def build_index(pdf_paths, index_dir, ranker, workers=1, parser=None, manifest=None,
+                ann_lists=None, nprobe=DEFAULT_NPROBE):
+    """
+    Parses and embeds every PDF once and saves the result to index_dir:
+      index.json      - documents and their heading candidates
+      embeddings.npy  - one L2-normalized float32 row per candidate
+      docs/<n>.json   - text index of document n (for cutting sections)
+      ann.npz         - only with ann_lists: IVF index over the embeddings
+                        (ann_lists inverted lists, nprobe probed per query)
+    """
+    parsed, embeddings = _parse_and_embed(pdf_paths, ranker, workers, parser, manifest)
+
+    os.makedirs(os.path.join(index_dir, "docs"), exist_ok=True)
+    np.save(os.path.join(index_dir, "embeddings.npy"), embeddings)
+    meta = {
+        "version": INDEX_VERSION,
+        "model_name": ranker.model_name,
+        "documents": _write_documents(index_dir, parsed, 0)
+    }
+
+    if ann_lists and len(embeddings):
+        print(f"Training ANN index ({ann_lists} lists)...")
+        IVFIndex.train(embeddings, ann_lists).save(os.path.join(index_dir, "ann.npz"))
+        meta["ann"] = {"type": "ivf", "lists": min(ann_lists, len(embeddings)), "nprobe": nprobe}
+
+    _write_meta(index_dir, meta)
+    print(f"Index with {len(meta['documents'])} documents saved to {index_dir}")
+
+
+def add_to_index(pdf_paths, index_dir, ranker, workers=1, parser=None, manifest=None):
+    """
+    Appends PDFs to an existing index: their candidates are embedded and
+    added after the stored rows, and filed in the ANN index (if any)
+    without retraining it. PDFs already in the index are skipped.
+    """
+    with open(os.path.join(index_dir, "index.json"), "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    if meta["model_name"] != ranker.model_name:
+        raise ValueError(f"Index was built with {meta['model_name']}, not {ranker.model_name}")
+
+    known = {os.path.abspath(d["path"]) for d in meta["documents"]}
+    pdf_paths = [p for p in pdf_paths if os.path.abspath(p) not in known]
+    if not pdf_paths:
+        print("No new documents to add")
+        return
+
+    parsed, embeddings = _parse_and_embed(pdf_paths, ranker, workers, parser, manifest)
+    # Rows past the documents of index.json were left by an add that did not finish
+    rows = sum(len(d["candidates"]) for d in meta["documents"])
+    stored = np.load(os.path.join(index_dir, "embeddings.npy"))[:rows]
+    if len(stored) and len(embeddings) and stored.shape[1] != embeddings.shape[1]:
+        raise ValueError("Embedding size does not match the index")
+    if len(embeddings):
+        _save_atomic(os.path.join(index_dir, "embeddings.npy"),
+                     np.concatenate([stored, embeddings]) if len(stored) else embeddings)
+
+    meta["documents"] += _write_documents(index_dir, parsed, len(meta["documents"]))
+    if meta.get("ann"):
+        ann_path = os.path.join(index_dir, "ann.npz")
+        ann = IVFIndex.load(ann_path)
+        ann.assign = ann.assign[:rows]
+        ann.add(embeddings)
+        ann.save(ann_path)
+
+    # index.json last: readers see either the old or the new index
+    _write_meta(index_dir, meta)
+    print(f"Added {len(parsed)} documents to {index_dir}")
+
+
+def _parse_and_embed(pdf_paths, ranker, workers, parser, manifest):
+    # PyMuPDF is only needed to build the index, never to query it
+    from src.pipeline import parse_documents
+
+    parsed = parse_documents(pdf_paths, workers=workers, parser=parser, manifest=manifest)
+    texts = [c["text"] for _, _, candidates in parsed for c in candidates]
+    print(f"Embedding {len(texts)} candidates...")
+    embeddings = _normalize_rows(_to_numpy(ranker.encode(texts))) if texts else np.zeros((0, 0), dtype=np.float32)
+    return parsed, embeddings
+
+
+def _write_documents(index_dir, parsed, first):
+    """Writes docs/<n>.json for n = first, first + 1, ... and returns the document entries."""
+    documents = []
+    for n, (pdf_path, layout, candidates) in enumerate(parsed, start=first):
+        with open(os.path.join(index_dir, "docs", f"{n}.json"), "w", encoding="utf-8") as f:
+            json.dump(layout.to_text_index(), f, ensure_ascii=False)
+        documents.append({"name": os.path.basename(pdf_path), "path": pdf_path, "candidates": candidates})
+    return documents
+
+
+def _write_meta(index_dir, meta):
+    tmp_path = os.path.join(index_dir, f"index.json.{os.getpid()}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False)
+    os.replace(tmp_path, os.path.join(index_dir, "index.json"))
+
+
+def _save_atomic(path, array):
+    # Open CorpusIndex instances keep reading their memory-mapped old file
+    tmp_path = f"{path}.{os.getpid()}.tmp.npy"
+    np.save(tmp_path, array)
+    os.replace(tmp_path, path)
+
+
+class CorpusIndex:
+    """
+    Read side of an index written by build_index(). Ranking is a single
+    matrix-vector product over the stored embeddings; no PDF is opened.
+    Long-running callers can keep up to layout_cache_size parsed
+    docs/<n>.json text indexes in memory.
+    """
+
+    def __init__(self, index_dir, layout_cache_size=0):
+        self.index_dir = index_dir
+        self.layout_cache_size = layout_cache_size
+        self._layouts = {}
+        self._layouts_lock = threading.Lock()
+        with open(os.path.join(index_dir, "index.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("version") != INDEX_VERSION:
+            raise ValueError(f"Unsupported index version {meta.get('version')} in {index_dir}, rebuild it")
+
+        self.model_name = meta["model_name"]
+        self.documents = meta["documents"]
+        self.embeddings = np.load(os.path.join(index_dir, "embeddings.npy"), mmap_mode="r")
+
+        # Row range of every document in the embedding matrix
+        sizes = [len(d["candidates"]) for d in self.documents]
+        self.offsets = np.concatenate([[0], np.cumsum(sizes)]).astype(int)
+
+        self.ann = None
+        self.nprobe = meta.get("ann", {}).get("nprobe", DEFAULT_NPROBE)
+        if meta.get("ann"):
+            self.ann = IVFIndex.load(os.path.join(index_dir, "ann.npz"))
+
+    def rank(self, query_embedding, top_k=10, nprobe=None):
+        """
+        Per-document top_k matches for a query embedding, in the same format
+        as RankingEngine.rank_collection().
+        If the index has an ANN index, only the rows of the nprobe nearest
+        lists are scored (default: the nprobe stored at build time).
+        nprobe=0 forces an exact search.
+        """
+        results = [[] for _ in self.documents]
+        if not len(self.embeddings):
+            return results
+
+        query = _normalize_rows(_to_numpy(query_embedding).reshape(-1))
+        nprobe = self.nprobe if nprobe is None else nprobe
+        if self.ann is not None and 0 < nprobe < self.ann.n_lists:
+            return self._rank_rows(self.ann.probe(query, nprobe), query, top_k)
+
+        scores = self.embeddings @ query
+
+        for n, doc in enumerate(self.documents):
+            start, end = self.offsets[n], self.offsets[n + 1]
+            if start == end:
+                continue
+            doc_scores = scores[start:end]
+            k = min(top_k, end - start)
+            top = np.argpartition(-doc_scores, k - 1)[:k]
+            # Highest score first, ties by document order
+            top = top[np.lexsort((top, -doc_scores[top]))]
+            for idx in top:
+                c = doc["candidates"][idx]
+                results[n].append({
+                    "text": c["text"],
+                    "score": round(float(doc_scores[idx]), 3),
+                    "page_num": c["page_num"],
+                    "y": c["y"]
+                })
+        return results
+
+    def _rank_rows(self, rows, query, top_k):
+        """Per-document top_k among the given rows only (ANN search)."""
+        results = [[] for _ in self.documents]
+        # Rows appended by a concurrent add_to_index() are not ours yet
+        rows = rows[rows < self.offsets[-1]]
+        scores = np.asarray(self.embeddings[rows], dtype=np.float32) @ query
+        docs = np.searchsorted(self.offsets, rows, side="right") - 1
+
+        # By document, then highest score first, ties by document order
+        order = np.lexsort((rows, -scores, docs))
+        rows, scores, docs = rows[order], scores[order], docs[order]
+        rank_in_doc = np.arange(len(rows)) - np.searchsorted(docs, docs)
+
+        for row, score, n in zip(rows[rank_in_doc < top_k], scores[rank_in_doc < top_k], docs[rank_in_doc < top_k]):
+            c = self.documents[n]["candidates"][row - self.offsets[n]]
+            results[n].append({
+                "text": c["text"],
+                "score": round(float(score), 3),
+                "page_num": c["page_num"],
+                "y": c["y"]
+            })
+        return results
+
+    def layout(self, n):
+        with self._layouts_lock:
+            layout = self._layouts.pop(n, None)
+            if layout is not None:
+                # Most recently used last
+                self._layouts[n] = layout
+                return layout
+
+        with open(os.path.join(self.index_dir, "docs", f"{n}.json"), "r", encoding="utf-8") as f:
+            layout = DocumentLayout.from_text_index(self.documents[n]["path"], json.load(f))
+        if self.layout_cache_size > 0:
+            with self._layouts_lock:
+                self._layouts[n] = layout
+                while len(self._layouts) > self.layout_cache_size:
+                    self._layouts.pop(next(iter(self._layouts)))
+        return layout
+
+    def query(self, query_embedding, top_k=10, nprobe=None):
+        """Returns (document name, sections) for every document with matches."""
+        results = []
+        for n, matches in enumerate(self.rank(query_embedding, top_k, nprobe)):
+            if matches:
+                results.append((self.documents[n]["name"], self.layout(n).extract_sections(matches)))
+        return results
+
+    def query_top(self, query_embedding, top_k=10, output_top_k=20, nprobe=None):
+        """
+        query() for an output that keeps only the output_top_k best sections
+        (OutputGenerator's top_k). Only the sections of matches scoring at
+        least the output_top_k-th best score are cut (and only their
+        documents loaded); the others cannot reach the output. Returns
+        (results, skipped), skipped being the number of matches left out
+        (see OutputGenerator.count_skipped()).
+        """
+        ranked = self.rank(query_embedding, top_k, nprobe)
+        scores = [m["score"] for matches in ranked for m in matches]
+        cutoff = None
+        if output_top_k <= 0:
+            cutoff = float("inf")
+        elif len(scores) > output_top_k:
+            cutoff = heapq.nlargest(output_top_k, scores)[-1]
+
+        results = []
+        skipped = 0
+        for n, matches in enumerate(ranked):
+            selected = [m for m in matches if cutoff is None or m["score"] >= cutoff]
+            skipped += len(matches) - len(selected)
+            if selected:
+                # The other matches still bound the selected sections
+                sections = SectionCache(self.layout(n)).extract_sections(matches, selected)
+                results.append((self.documents[n]["name"], sections))
+        return results, skipped
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DocLayout AI - Corpus index (build once, query many times)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build", help="Parse and embed a folder of PDFs into an index")
+    build.add_argument('-i', '--input', required=True, help="Folder containing PDF files")
+    build.add_argument('--index', required=True, help="Folder to write the index to")
+    build.add_argument('-w', '--workers', type=int, default=1, help="Parse PDFs in N worker processes")
+    build.add_argument('--cache-dir', default=None, help="Folder for the persistent embedding cache")
+    build.add_argument('--ann-lists', type=int, default=None,
+                       help="Also build an IVF index with this many lists (about 4 x sqrt(candidates))")
+    build.add_argument('--nprobe', type=int, default=DEFAULT_NPROBE,
+                       help=f"Lists searched per query by default (default: {DEFAULT_NPROBE})")
+
+    add = commands.add_parser("add", help="Add the new PDFs of a folder to an existing index")
+    add.add_argument('-i', '--input', required=True, help="Folder containing PDF files")
+    add.add_argument('--index', required=True, help="Folder containing the index")
+    add.add_argument('-w', '--workers', type=int, default=1, help="Parse PDFs in N worker processes")
+    add.add_argument('--cache-dir', default=None, help="Folder for the persistent embedding cache")
+
+    query = commands.add_parser("query", help="Answer a persona/job from an index")
+    query.add_argument('--index', required=True, help="Folder containing the index")
+    query.add_argument('-p', '--persona', required=True, help="User Persona (e.g., 'Data Scientist')")
+    query.add_argument('-j', '--job', required=True, help="Job to be done (Query string)")
+    query.add_argument('-o', '--output', required=True, help="Path to save output JSON file")
+    query.add_argument('--top-k-matches', type=int, default=10, help="Headings kept per document")
+    query.add_argument('--top-k', type=int, default=20, help="Sections kept in the output")
+    query.add_argument('--nprobe', type=int, default=None,
+                       help="ANN lists to search (more = slower, higher recall; 0 = exact search)")
+
+    args = parser.parse_args()
+    from src.ranking import RankingEngine
+
+    if args.command in ("build", "add"):
+        pdf_files = glob.glob(os.path.join(args.input, "*.pdf"))
+        if not pdf_files:
+            print(f"Error: No PDF files found in '{args.input}'")
+            return
+        if args.command == "build":
+            build_index(pdf_files, args.index, RankingEngine(cache_dir=args.cache_dir), workers=args.workers,
+                        ann_lists=args.ann_lists, nprobe=args.nprobe)
+        else:
+            with open(os.path.join(args.index, "index.json"), "r", encoding="utf-8") as f:
+                model_name = json.load(f)["model_name"]
+            add_to_index(pdf_files, args.index, RankingEngine(model_name=model_name, cache_dir=args.cache_dir),
+                         workers=args.workers)
+        return
+
+    index = CorpusIndex(args.index)
+    ranker = RankingEngine(model_name=index.model_name)
+    results, skipped = index.query_top(ranker.encode_query(args.job), top_k=args.top_k_matches,
+                                       output_top_k=args.top_k, nprobe=args.nprobe)
+
+    formatter = OutputGenerator([d["name"] for d in index.documents], args.persona, args.job, top_k=args.top_k)
+    for name, sections in results:
+        for sec in sections:
+            formatter.add_result(name, sec)
+    formatter.count_skipped(skipped)
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    formatter.save_json(args.output)
+
+
+if __name__ == "__main__":
+    main()
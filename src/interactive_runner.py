@@ -1,13 +1,16 @@
+import argparse
 import json
 import os
 import glob
 import sys
 import time
+from src import trace
 
 # Use modular imports (matching your src folder)
-from src.parser import PDFParser
-from src.ranking import RankingEngine
+from src.parser import PDFParser, PARSER_VERSION
 from src.output import OutputGenerator
+from src.pipeline import collect_parsed, parse_pool, process_documents, rank_and_extract, submit_parse
+from src.manifest import DocumentManifest
 
 def load_config():
     if not os.path.exists("config.json"):
@@ -16,87 +19,210 @@ def load_config():
     with open("config.json", "r") as f:
         return json.load(f)
 
-def process_collection(name, config):
+def build_ranker(config):
+    """RankingEngine configured by the "ranking" section (imports torch)."""
+    from src.ranking import RankingEngine
+
+    ranking = config.get("ranking", {})
+    return RankingEngine(
+        batch_size=ranking.get("batch_size", 64),
+        cache_dir=ranking.get("embedding_cache_dir"),
+        cache_size=ranking.get("embedding_cache_size", 200000),
+        backend=ranking.get("backend", "torch"),
+        threads=ranking.get("threads")
+    )
+
+def collection_pdfs(name, config):
+    """PDFs of a configured collection, or None (reported) if there are none."""
+    input_dir = config["collections"][name]["input_folder"]
+    if not os.path.exists(input_dir):
+        print(f"Error: The folder '{input_dir}' does not exist.")
+        print("Check your config.json paths.")
+        return None
+    pdfs = glob.glob(os.path.join(input_dir, "*.pdf"))
+    if not pdfs:
+        print(f"No PDFs found in {input_dir}")
+        return None
+    return pdfs
+
+def process_collection(name, config, ranker=None):
     coll = config["collections"][name]
     settings = config["output_settings"]
     
-    input_dir = coll["input_folder"]
-    output_dir = settings["output_folder"]
-    
     # 1. Validate Input Folder
-    if not os.path.exists(input_dir):
-        print(f"Error: The folder '{input_dir}' does not exist.")
-        print("Check your config.json paths.")
+    pdfs = collection_pdfs(name, config)
+    if pdfs is None:
         return
 
     print(f"\n--- Processing: {name} ---")
     print(f"Goal: {coll['job_to_be_done']}")
     
-    # 2. Initialize Modules
+    # 2. Initialize Modules (torch is only imported once a collection is chosen)
     parser = PDFParser()
-    ranker = RankingEngine()
-    
-    pdfs = glob.glob(os.path.join(input_dir, "*.pdf"))
-    if not pdfs:
-        print(f"No PDFs found in {input_dir}")
-        return
+    ranker = ranker or build_ranker(config)
+
+    # 3. Processing Loop (incremental if processing.state_dir is set)
+    processing = config.get("processing", {})
+    results = process_documents(
+        pdfs,
+        ranker,
+        coll.get("job_query", coll["job_to_be_done"]),
+        top_k=settings.get("top_k_matches", 10),
+        workers=processing.get("workers", 1),
+        parser=parser,
+        manifest=DocumentManifest(processing["state_dir"], PARSER_VERSION) if processing.get("state_dir") else None,
+        prefilter=config.get("ranking", {}).get("prefilter")
+    )
+
+    # 4. Save Final JSON
+    out_path = save_results(name, config, pdfs, results)
+    if ranker.cache is not None:
+        print(f"Embedding cache: {ranker.cache.stats()}")
+    print(f"\nSuccess! Output with Top {settings.get('top_k_output', 5)} saved to:")
+    print(out_path)
+
+def save_results(name, config, pdfs, results):
+    """Writes the output file of a collection and returns its path."""
+    coll = config["collections"][name]
+    settings = config["output_settings"]
 
-    # 3. Setup Output Generator (Uses top_k from config)
+    # Output Generator (Uses top_k from config)
     formatter = OutputGenerator(
         [os.path.basename(p) for p in pdfs],
         coll["persona"],
         coll["job_to_be_done"],
         top_k=settings.get("top_k_output", 5)  # Default to 5 if missing
     )
+    for pdf, sections in results:
+        for sec in sections:
+            formatter.add_result(os.path.basename(pdf), sec)
 
-    # 4. Processing Loop
-    for pdf in pdfs:
-        print(f"Scanning: {os.path.basename(pdf)}...")
-        try:
-            # A. Parse
-            candidates = parser.extract_candidates(pdf)
-            
-            # B. Rank
-            matches = ranker.rank_candidates(
-                candidates, 
-                coll.get("job_query", coll["job_to_be_done"]),
-                top_k=settings.get("top_k_matches", 10)
-            )
-            
-            # C. Extract
-            sections = parser.extract_sections(pdf, matches)
-            
-            # D. Save to memory
-            for sec in sections:
-                formatter.add_result(os.path.basename(pdf), sec)
-                
-        except Exception as e:
-            print(f"  Error: {e}")
-
-    # 5. Save Final JSON
+    output_dir = settings["output_folder"]
     os.makedirs(output_dir, exist_ok=True)
-    out_filename = f"{name.replace(' ', '_')}_results.json"
+    output_format = settings.get("format", "json")
+    extension = "jsonl" if output_format == "jsonl" else "json"
+    out_filename = f"{name.replace(' ', '_')}_results.{extension}"
     out_path = os.path.join(output_dir, out_filename)
-    formatter.save_json(out_path)
-    print(f"\nSuccess! Output with Top {settings.get('top_k_output', 5)} saved to:")
-    print(out_path)
+    formatter.save(out_path, output_format)
+    return out_path
+
+def run_all(config, names=None, ranker=None):
+    """
+    Batch mode: processes every configured collection (or only names) in
+    one process, with one loaded model and one parser. The documents of
+    all collections are queued on a pool of processing.workers parse
+    processes up front, so later collections are parsed while earlier
+    ones are encoded, ranked and written (and while the model loads).
+    Returns (and prints) a summary per collection.
+    """
+    names = list(config["collections"]) if names is None else names
+    settings = config["output_settings"]
+    processing = config.get("processing", {})
+    manifest = DocumentManifest(processing["state_dir"], PARSER_VERSION) if processing.get("state_dir") else None
+    parser = PDFParser()
+    start = time.perf_counter()
+
+    jobs = [(name, pdfs) for name in names for pdfs in [collection_pdfs(name, config)] if pdfs is not None]
+    if not jobs:
+        return []
+
+    summary = []
+    workers = max(1, processing.get("workers", 1))
+    with parse_pool(workers) as pool:
+        # 1. Queue every document before loading the model
+        pending = [submit_parse(pool, pdfs, manifest, workers=workers) for _, pdfs in jobs]
+        if ranker is None:
+            load_start = time.perf_counter()
+            ranker = build_ranker(config)
+            print(f"Model loaded in {time.perf_counter() - load_start:.2f}s")
+
+        # 2. Rank, extract and write each collection as soon as it is parsed
+        for (name, pdfs), work in zip(jobs, pending):
+            coll = config["collections"][name]
+            print(f"\n--- Processing: {name} ---")
+            print(f"Goal: {coll['job_to_be_done']}")
+
+            with trace.span("collection", collection=name):
+                t0 = time.perf_counter()
+                parsed = collect_parsed(pdfs, work, manifest)
+                if manifest is not None:
+                    manifest.save()
+                t1 = time.perf_counter()
+                results = rank_and_extract(
+                    parsed, ranker, coll.get("job_query", coll["job_to_be_done"]),
+                    top_k=settings.get("top_k_matches", 10), parser=parser,
+                    prefilter=config.get("ranking", {}).get("prefilter")
+                )
+                t2 = time.perf_counter()
+                out_path = save_results(name, config, pdfs, results)
+                t3 = time.perf_counter()
+
+            summary.append({
+                "collection": name,
+                "documents": len(parsed),
+                "pages": sum(layout.page_count for _, layout, _ in parsed),
+                "candidates": sum(len(candidates) for _, _, candidates in parsed),
+                "parse_wait_seconds": round(t1 - t0, 3),
+                "rank_extract_seconds": round(t2 - t1, 3),
+                "write_seconds": round(t3 - t2, 3),
+                "seconds": round(t3 - t0, 3),
+                "output": out_path
+            })
+
+    if ranker.cache is not None:
+        print(f"Embedding cache: {ranker.cache.stats()}")
+    print_summary(summary, time.perf_counter() - start)
+    return summary
+
+def print_summary(summary, elapsed):
+    """Per-collection timings and throughput of a run_all() batch."""
+    print("\n" + "="*40)
+    print("   Batch Summary")
+    print("="*40)
+    for row in summary:
+        pages_per_sec = row["pages"] / row["seconds"] if row["seconds"] else 0
+        candidates_per_sec = row["candidates"] / row["seconds"] if row["seconds"] else 0
+        print(f"{row['collection']}: {row['documents']} docs, {row['pages']} pages, {row['candidates']} candidates "
+              f"| parse wait {row['parse_wait_seconds']:.2f}s, rank+extract {row['rank_extract_seconds']:.2f}s, "
+              f"write {row['write_seconds']:.2f}s | {pages_per_sec:.0f} pages/s, {candidates_per_sec:.0f} candidates/s")
+        print(f"  -> {row['output']}")
+    print(f"Total: {len(summary)} collections in {elapsed:.2f}s")
 
 def main():
+    arg_parser = argparse.ArgumentParser(description="DocLayout AI - Interactive Runner")
+    arg_parser.add_argument('--all', action='store_true',
+                            help="Process every collection in config.json without prompting (batch mode)")
+    args = arg_parser.parse_args()
+
     config = load_config()
     collections = list(config["collections"].keys())
     
-    print("\n" + "="*40)
-    print("   DocLayout AI - Interactive Runner")
-    print("="*40)
-    
-    for i, c in enumerate(collections, 1):
-        print(f"{i}. {c}")
-        
-    choice = input("\nSelect Collection (Number or 'all'): ").strip().lower()
-    
+    if args.all:
+        choice = 'all'
+    else:
+        print("\n" + "="*40)
+        print("   DocLayout AI - Interactive Runner")
+        print("="*40)
+
+        for i, c in enumerate(collections, 1):
+            print(f"{i}. {c}")
+
+        choice = input("\nSelect Collection (Number or 'all'): ").strip().lower()
+
+    # Optional trace of the whole session (processing.trace: output path)
+    trace_path = config.get("processing", {}).get("trace")
+    if trace_path:
+        trace.enable()
+    try:
+        run_choice(choice, collections, config)
+    finally:
+        if trace_path:
+            trace.disable().save(trace_path)
+            print(f"Trace saved to {trace_path}")
+
+def run_choice(choice, collections, config):
     if choice == 'all':
-        for c in collections:
-            process_collection(c, config)
+        run_all(config, collections)
     else:
         try:
             idx = int(choice) - 1
@@ -108,4 +234,4 @@ def main():
             print("Please enter a number.")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,259 @@
+from bisect import bisect_right
+import numpy as np
+from src.utils import clean_text
+
+
+class LayoutPage:
+    """
+    One page in struct-of-arrays form (no Python object per span or line).
+    Coordinates and sizes are float32, which is what PyMuPDF reports, so
+    nothing is lost. Font names are codes into DocumentLayout.fonts.
+
+      line_bbox   (lines, 4) float32
+      line_start  (lines + 1,) int32, offsets of each line's spans
+      span_text   list of str
+      span_font   (spans,) int32
+      span_size   (spans,) float32
+      span_flags  (spans,) int32
+      span_bbox   (spans, 4) float32
+
+    Pages restored from a text index have no spans (and no height) and
+    keep each line's text instead.
+    """
+    __slots__ = ("number", "width", "line_bbox", "line_start", "span_text",
+                 "span_font", "span_size", "span_flags", "span_bbox", "_line_text", "height")
+
+    def __init__(self, number, width, line_bbox, line_start=None, span_text=None, span_font=None,
+                 span_size=None, span_flags=None, span_bbox=None, line_text=None, height=None):
+        self.number = number
+        self.width = width
+        self.height = height
+        self.line_bbox = line_bbox
+        self.line_start = line_start
+        self.span_text = span_text
+        self.span_font = span_font
+        self.span_size = span_size
+        self.span_flags = span_flags
+        self.span_bbox = span_bbox
+        self._line_text = line_text
+
+    @classmethod
+    def from_fitz(cls, page, page_num, fonts, text_flags=None):
+        """
+        Decodes one PyMuPDF page. fonts maps font names to codes and is
+        extended with the fonts first seen on this page.
+        """
+        line_bbox, line_start = [], [0]
+        span_text, span_font, span_size, span_flags, span_bbox = [], [], [], [], []
+        for block in page.get_text("dict", flags=text_flags)["blocks"]:
+            for line in block.get("lines", []):
+                line_bbox.append(line["bbox"])
+                for s in line["spans"]:
+                    span_text.append(s["text"])
+                    span_font.append(fonts.setdefault(s["font"], len(fonts)))
+                    span_size.append(s["size"])
+                    span_flags.append(s["flags"])
+                    span_bbox.append(s["bbox"])
+                line_start.append(len(span_text))
+
+        return cls(
+            page_num, page.rect.width,
+            np.array(line_bbox, dtype=np.float32).reshape(-1, 4),
+            np.array(line_start, dtype=np.int32),
+            span_text,
+            np.array(span_font, dtype=np.int32),
+            np.array(span_size, dtype=np.float32),
+            np.array(span_flags, dtype=np.int32),
+            np.array(span_bbox, dtype=np.float32).reshape(-1, 4),
+            height=page.rect.height
+        )
+
+    @property
+    def line_y(self):
+        return self.line_bbox[:, 1]
+
+    def line_texts(self):
+        """Text of every line: its span texts, each followed by a space."""
+        if self._line_text is not None:
+            return self._line_text
+        starts = self.line_start.tolist()
+        return ["".join(t + " " for t in self.span_text[a:b]) for a, b in zip(starts, starts[1:])]
+
+    @property
+    def text(self):
+        if self._line_text is not None:
+            return "".join(self._line_text)
+        return "".join(t + " " for t in self.span_text)
+
+
+class DocumentLayout:
+    """
+    Decoded layout of a whole document (pages -> lines -> spans).
+    Built once per PDF so candidate detection and section extraction
+    don't have to call page.get_text("dict") again.
+    """
+
+    def __init__(self, path, pages, key=None, fonts=None):
+        self.path = path
+        self.pages = pages
+        self.key = key
+        self.fonts = fonts or []
+
+    @property
+    def page_count(self):
+        return len(self.pages)
+
+    @classmethod
+    def from_fitz(cls, doc, path, key=None, text_flags=None):
+        """
+        Decodes every page of an open PyMuPDF document. text_flags are
+        passed to page.get_text("dict") (PDFParser leaves out images).
+        """
+        fonts = {}
+        pages = [LayoutPage.from_fitz(page, page_num, fonts, text_flags) for page_num, page in enumerate(doc)]
+        return cls(path, pages, key, list(fonts))
+
+    def to_text_index(self):
+        """
+        JSON-serializable form holding only what section extraction needs
+        (line boxes and text, no spans).
+        """
+        return [
+            {"width": page.width, "lines": [list(line) for line in zip(page.line_bbox.tolist(), page.line_texts())]}
+            for page in self.pages
+        ]
+
+    @classmethod
+    def from_text_index(cls, path, pages, key=None):
+        """Rebuilds a text-only layout saved with to_text_index()."""
+        return cls(path, [
+            LayoutPage(
+                page_num, page["width"],
+                np.array([bbox for bbox, _ in page["lines"]], dtype=np.float32).reshape(-1, 4),
+                line_text=[text for _, text in page["lines"]]
+            )
+            for page_num, page in enumerate(pages)
+        ], key)
+
+    def extract_sections(self, heading_matches):
+        """
+        Extracts content text between identified headings.
+        Lives here (not in PDFParser) so documents restored from a text
+        index can be sliced without importing PyMuPDF.
+        """
+        return list(iter_sections(self.pages, self.page_count, heading_matches))
+
+
+def _section(match, raw_text):
+    return {
+        "heading": match["text"],
+        "score": match.get("score", 0.0),
+        "content": clean_text(raw_text),
+        "page_number": match["page_num"] + 1
+    }
+
+
+def iter_sections(pages, page_count, heading_matches):
+    """
+    Cuts the sections delimited by heading_matches in one ordered sweep
+    over the lines of pages (an iterable visited once, so pages may be
+    decoded one at a time).
+
+    Section i covers the half-open interval [(page, y) of heading i,
+    (page, y) of heading i + 1), the last one runs to the end of the
+    document. Each line is assigned to its interval by bisecting the
+    sorted boundaries, and every section gets one "\n" per page it spans.
+    Sections are yielded in heading order as soon as their last page has
+    been seen.
+    """
+    matches = sorted(heading_matches, key=lambda x: (x["page_num"], x["y"]))
+    bounds = [(m["page_num"], m["y"]) for m in matches]
+    end_pages = [page_num for page_num, _ in bounds[1:]] + [page_count - 1]
+
+    open_parts = {}
+    next_start = 0
+    for page in pages:
+        p = page.number
+
+        # 1. Open the sections whose heading is on this page
+        first_start = next_start
+        while next_start < len(bounds) and bounds[next_start][0] <= p:
+            open_parts[next_start] = []
+            next_start += 1
+        if not open_parts:
+            continue
+
+        # 2. Assign the lines of the page
+        if next_start == first_start:
+            # No heading on this page: it lies inside the one open section
+            for parts in open_parts.values():
+                parts.append(page.text)
+        else:
+            for line_y, line_text in zip(page.line_y.tolist(), page.line_texts()):
+                i = bisect_right(bounds, (p, line_y), 0, next_start) - 1
+                if i in open_parts:
+                    open_parts[i].append(line_text)
+
+        # 3. Close the sections that end on this page
+        for i in list(open_parts):
+            open_parts[i].append("\n")
+            if end_pages[i] == p:
+                yield _section(matches[i], "".join(open_parts.pop(i)))
+
+
+class SectionCache:
+    """
+    Cuts sections for many heading selections over one document (e.g.
+    the matches of several queries) without cutting any text twice.
+
+    Following iter_sections(), the content of a section depends only on
+    its heading's (page, y) and on the (page, y) of the next selected
+    heading, so the cleaned content of every distinct (start, end)
+    interval is computed once and shared by all selections containing it.
+    Results are identical to layout.extract_sections().
+    """
+
+    def __init__(self, layout):
+        self.layout = layout
+        self._content = {}
+        self.hits = 0
+        self.misses = 0
+
+    def extract_sections(self, heading_matches, selected=None):
+        """
+        Sections of heading_matches, in document order. With selected (a
+        subset of heading_matches), only those sections are cut; the
+        other matches still end the sections before them.
+        """
+        matches = sorted(heading_matches, key=lambda x: (x["page_num"], x["y"]))
+        bounds = [(m["page_num"], m["y"]) for m in matches] + [None]
+        keep = None if selected is None else {id(m) for m in selected}
+
+        sections = []
+        for i, match in enumerate(matches):
+            if keep is not None and id(match) not in keep:
+                continue
+            key = (bounds[i], bounds[i + 1])
+            if key in self._content:
+                self.hits += 1
+            else:
+                self.misses += 1
+                self._content[key] = clean_text(self._interval_text(*key))
+            sections.append({**_section(match, ""), "content": self._content[key]})
+        return sections
+
+    def _interval_text(self, start, end):
+        """Raw text of the lines in [start, end) plus one "\n" per page, as iter_sections() cuts it."""
+        end_page = end[0] if end is not None else self.layout.page_count - 1
+        parts = []
+        for page in self.layout.pages[start[0]:end_page + 1]:
+            p = page.number
+            if start[0] < p and (end is None or p < end[0]):
+                # No selected heading on this page: all of it belongs here
+                parts.append(page.text)
+            else:
+                for line_y, line_text in zip(page.line_y.tolist(), page.line_texts()):
+                    if start <= (p, line_y) and (end is None or (p, line_y) < end):
+                        parts.append(line_text)
+            parts.append("\n")
+        return "".join(parts)
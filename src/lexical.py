@@ -0,0 +1,83 @@
+import math
+import re
+from collections import Counter, defaultdict
+import numpy as np
+
+_TOKEN = re.compile(r"\w+")
+
+
+def tokenize(text):
+    """Lowercased word tokens."""
+    return _TOKEN.findall(text.lower())
+
+
+class BM25Index:
+    """
+    In-memory Okapi BM25 index over a list of texts. Cheap enough to build
+    per collection: one pass over the tokens, postings kept as numpy arrays.
+    """
+
+    def __init__(self, texts, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.size = len(texts)
+
+        postings = defaultdict(lambda: ([], []))
+        lengths = []
+        for n, text in enumerate(texts):
+            tokens = tokenize(text)
+            lengths.append(len(tokens))
+            for term, tf in Counter(tokens).items():
+                docs, tfs = postings[term]
+                docs.append(n)
+                tfs.append(tf)
+
+        self.lengths = np.array(lengths, dtype=float)
+        self.avg_length = float(self.lengths.mean()) if self.size else 0.0
+        self.postings = {
+            term: (np.array(docs, dtype=int), np.array(tfs, dtype=float))
+            for term, (docs, tfs) in postings.items()
+        }
+
+    def idf(self, term):
+        df = len(self.postings[term][0]) if term in self.postings else 0
+        return math.log(1 + (self.size - df + 0.5) / (df + 0.5))
+
+    def scores(self, query):
+        """BM25 score of every indexed text for query (each query term counted once)."""
+        scores = np.zeros(self.size)
+        if not self.size or not self.avg_length:
+            return scores
+
+        norm = self.k1 * (1 - self.b + self.b * self.lengths / self.avg_length)
+        for term in dict.fromkeys(tokenize(query)):
+            if term not in self.postings:
+                continue
+            docs, tfs = self.postings[term]
+            scores[docs] += self.idf(term) * tfs * (self.k1 + 1) / (tfs + norm[docs])
+        return scores
+
+
+def shortlist(texts, query, top_n):
+    """
+    Indices of the top_n texts for query by BM25, in their original order
+    (ties go to the earlier text). Everything is kept if top_n >= len(texts).
+    """
+    if top_n >= len(texts):
+        return list(range(len(texts)))
+    scores = BM25Index(texts).scores(query)
+    return sorted(np.argsort(-scores, kind="stable")[:top_n].tolist())
+
+
+def recall_at_k(reference_by_doc, matches_by_doc):
+    """
+    Share of the reference matches (full semantic ranking, per document)
+    that are also returned with the pre-filter. Matches are compared by
+    (page_num, y, text). Returns 1.0 if there is nothing to find.
+    """
+    found = total = 0
+    for reference, matches in zip(reference_by_doc, matches_by_doc):
+        kept = {(m["page_num"], m["y"], m["text"]) for m in matches}
+        found += sum((m["page_num"], m["y"], m["text"]) in kept for m in reference)
+        total += len(reference)
+    return found / total if total else 1.0
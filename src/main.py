@@ -1,34 +1,171 @@
 import argparse
+import json
 import os
 import glob
-from src.parser import PDFParser
-from src.ranking import RankingEngine
-from src.output import OutputGenerator  # Updated import to match src/output.py
+from src import trace
+from src.parser import PDFParser, PARSER_VERSION
+from src.output import OutputGenerator, OUTPUT_FORMATS  # Updated import to match src/output.py
+from src.pipeline import parse_documents, process_documents, process_queries
+from src.manifest import DocumentManifest
+# src.ranking (sentence-transformers/torch) is imported only once ranking is needed
+
+def parse_only(pdf_files, output_path, workers=1, manifest=None, stream=False):
+    """
+    Runs the parser alone and dumps every document's heading candidates and
+    the sections they delimit. Never imports torch.
+    """
+    pdf_parser = PDFParser()
+    documents = []
+    parsed = parse_documents(pdf_files, workers=workers, parser=pdf_parser, manifest=manifest, stream=stream)
+    for pdf_path, layout, candidates in parsed:
+        source = layout if layout is not None else pdf_path
+        documents.append({
+            "document": os.path.basename(pdf_path),
+            "page_count": pdf_parser.page_count(source),
+            "candidates": candidates,
+            "sections": list(pdf_parser.iter_sections(pdf_path, candidates)) if layout is None
+                        else layout.extract_sections(candidates)
+        })
+
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump({"documents": documents}, f, ensure_ascii=False, indent=2)
+    print(f"Results saved to {output_path}")
+
+def load_queries(path):
+    """
+    Reads a JSONL file of queries: one object per line with persona and
+    job (or job_to_be_done), optionally job_query (the text that is
+    ranked, default: job) and id (the output file name: unique, and
+    without path separators).
+    """
+    queries = []
+    seen = set()
+    with open(path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            query = json.loads(line)
+            job = query.get("job") or query.get("job_to_be_done")
+            if not query.get("persona") or not job:
+                raise ValueError(f"{path}:{line_no}: 'persona' and 'job' are required")
+            query_id = str(query["id"]) if query.get("id") is not None else f"query_{len(queries) + 1}"
+            if not query_id.strip() or query_id in (".", "..") or "/" in query_id or "\\" in query_id:
+                raise ValueError(f"{path}:{line_no}: invalid id {query_id!r} (used as a file name)")
+            if query_id in seen:
+                raise ValueError(f"{path}:{line_no}: duplicate id {query_id!r}")
+            seen.add(query_id)
+            queries.append({
+                "id": query_id,
+                "persona": query["persona"],
+                "job": job,
+                "job_query": query.get("job_query") or job
+            })
+    return queries
+
+def run_queries(args, pdf_files, manifest):
+    """Multi-query mode: one pass over the PDFs, one output file per query in args.output."""
+    queries = load_queries(args.queries)
+    print(f"Processing {len(pdf_files)} documents for {len(queries)} queries...")
+
+    from src.ranking import RankingEngine
+    ranker = RankingEngine(cache_dir=args.cache_dir, backend=args.backend, threads=args.threads)
+
+    results_by_query = process_queries(
+        pdf_files, ranker, [q["job_query"] for q in queries], top_k=10, workers=args.workers,
+        parser=PDFParser(), manifest=manifest
+    )
+
+    os.makedirs(args.output, exist_ok=True)
+    extension = "jsonl" if args.output_format == "jsonl" else "json"
+    for query, results in zip(queries, results_by_query):
+        formatter = OutputGenerator([os.path.basename(p) for p in pdf_files], query["persona"], query["job"])
+        for pdf_path, sections in results:
+            for sec in sections:
+                formatter.add_result(os.path.basename(pdf_path), sec)
+        formatter.save(os.path.join(args.output, f"{query['id']}.{extension}"), args.output_format)
+    if ranker.cache is not None:
+        print(f"Embedding cache: {ranker.cache.stats()}")
+    print("Done.")
 
 def main():
     # 1. Setup CLI Arguments
     parser = argparse.ArgumentParser(description="DocLayout AI - Assignment CLI")
     parser.add_argument('-i', '--input', required=True, help="Folder containing PDF files")
-    parser.add_argument('-o', '--output', required=True, help="Path to save output JSON file")
-    parser.add_argument('-p', '--persona', required=True, help="User Persona (e.g., 'Data Scientist')")
-    parser.add_argument('-j', '--job', required=True, help="Job to be done (Query string)")
+    parser.add_argument('-o', '--output', required=True,
+                        help="Path to save output JSON file (a folder with --queries)")
+    parser.add_argument('-p', '--persona', help="User Persona (e.g., 'Data Scientist')")
+    parser.add_argument('-j', '--job', help="Job to be done (Query string)")
+    parser.add_argument('-w', '--workers', type=int, default=1,
+                        help="Parse PDFs in N worker processes (default: 1, serial)")
+    parser.add_argument('--backend', default="torch", choices=["torch", "int8", "onnx"],
+                        help="Encoder backend: full-precision torch (default), int8-quantized torch, or ONNX Runtime")
+    parser.add_argument('--threads', type=int, default=None, help="CPU threads used for encoding")
+    parser.add_argument('--prefilter', type=int, default=None, metavar="N",
+                        help="Embed only the N candidates of the collection that best match the job lexically (BM25)")
+    parser.add_argument('--cache-dir', default=None,
+                        help="Folder for the persistent embedding cache (disabled if omitted)")
+    parser.add_argument('--output-format', default="json", choices=OUTPUT_FORMATS,
+                        help="json (default), json-stream (same file, written incrementally) "
+                             "or jsonl (metadata line, then one section per line)")
+    parser.add_argument('--state-dir', default=None,
+                        help="Incremental mode: keep parse results here and skip unchanged PDFs")
+    parser.add_argument('--parse-only', action='store_true',
+                        help="Only parse: dump candidates and sections per PDF (no model is loaded)")
+    parser.add_argument('--stream', action='store_true',
+                        help="Parse page by page with flat memory (for very large PDFs; pages are decoded "
+                             "more than once and new results are not stored in --state-dir)")
+    parser.add_argument('--queries', default=None, metavar="FILE",
+                        help="Multi-query mode: JSONL file of persona/job pairs, all answered in one pass "
+                             "(one output file per query in the -o folder)")
+    parser.add_argument('--trace', default=None, metavar="PATH",
+                        help="Record per-stage/per-document timings and counters to PATH "
+                             "(Chrome trace JSON, or JSON lines if PATH ends in .jsonl)")
     
     args = parser.parse_args()
+    if not (args.parse_only or args.queries) and not (args.persona and args.job):
+        parser.error("-p/--persona and -j/--job are required unless --parse-only or --queries is given")
+    if args.queries and (args.stream or args.prefilter):
+        parser.error("--queries cannot be combined with --stream or --prefilter")
 
+    if args.trace:
+        trace.enable()
+    try:
+        run(args)
+    finally:
+        if args.trace:
+            trace.disable().save(args.trace)
+            print(f"Trace saved to {args.trace}")
+
+def run(args):
+    """Runs the CLI with parsed, validated arguments."""
     # 2. Validate Input
     pdf_files = glob.glob(os.path.join(args.input, "*.pdf"))
     if not pdf_files:
         print(f"Error: No PDF files found in '{args.input}'")
         return
 
+    manifest = DocumentManifest(args.state_dir, PARSER_VERSION) if args.state_dir else None
+    if args.queries:
+        run_queries(args, pdf_files, manifest)
+        return
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+
+    if args.parse_only:
+        print(f"Parsing {len(pdf_files)} documents...")
+        parse_only(pdf_files, args.output, workers=args.workers, manifest=manifest, stream=args.stream)
+        return
+
     print(f"Processing {len(pdf_files)} documents...")
     print(f"Persona: {args.persona}")
     print(f"Query: {args.job}")
 
     # 3. Initialize Modules
     # Note: These classes are now imported from your new modular src/ folder
+    from src.ranking import RankingEngine
+
     pdf_parser = PDFParser()
-    ranker = RankingEngine() 
+    ranker = RankingEngine(cache_dir=args.cache_dir, backend=args.backend, threads=args.threads)
     
     formatter = OutputGenerator(
         [os.path.basename(p) for p in pdf_files], 
@@ -36,39 +173,21 @@ def main():
         args.job
     )
 
-    # 4. Execution Loop
-    for pdf_path in pdf_files:
-        print(f"\nScanning: {os.path.basename(pdf_path)}...")
-        
-        try:
-            # A. Parse Candidates (Heuristic)
-            # Updated method name to match src/parser.py
-            candidates = pdf_parser.extract_candidates(pdf_path)
-            print(f"  -> Found {len(candidates)} structural candidates")
-
-            if not candidates:
-                continue
-
-            # B. Rank Candidates (Semantic)
-            # Updated method name to match src/ranking.py
-            matches = ranker.rank_candidates(candidates, args.job, top_k=10)
-            print(f"  -> Identified {len(matches)} relevant sections")
+    # 4. Execution Loop (parse -> rank -> extract, optionally in parallel)
+    results = process_documents(
+        pdf_files, ranker, args.job, top_k=10, workers=args.workers, parser=pdf_parser,
+        manifest=manifest, stream=args.stream, prefilter=args.prefilter
+    )
 
-            # C. Extract Content
-            sections = pdf_parser.extract_sections(pdf_path, matches)
-            
-            # D. Add to Results
-            for sec in sections:
-                formatter.add_result(os.path.basename(pdf_path), sec)
-        
-        except Exception as e:
-            print(f"  X Error processing file: {e}")
+    for pdf_path, sections in results:
+        for sec in sections:
+            formatter.add_result(os.path.basename(pdf_path), sec)
 
     # 5. Finalize and Save
     print("\nGenerating Final JSON...")
-    # Ensure directory exists
-    os.makedirs(os.path.dirname(args.output), exist_ok=True)
-    formatter.save_json(args.output)
+    formatter.save(args.output, args.output_format)
+    if ranker.cache is not None:
+        print(f"Embedding cache: {ranker.cache.stats()}")
     print("Done.")
 
 if __name__ == "__main__":
@@ -0,0 +1,89 @@
+import hashlib
+import json
+import os
+from src.layout import DocumentLayout
+
+
+def file_digest(path, chunk_size=1 << 20):
+    """SHA-256 of the file content."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class DocumentManifest:
+    """
+    Remembers the parse results of every PDF seen by incremental runs.
+
+    manifest.json maps each PDF path to its size, mtime and content hash.
+    The parse result itself (candidates plus the text index used for
+    section extraction) is stored once per (content hash, parser version)
+    in docs/. If the size and mtime are unchanged, the file is not hashed
+    again. A PDF that was only touched or copied still matches on content.
+    """
+
+    def __init__(self, state_dir, parser_version):
+        self.state_dir = state_dir
+        self.parser_version = parser_version
+        self.docs_dir = os.path.join(state_dir, "docs")
+        self.manifest_path = os.path.join(state_dir, "manifest.json")
+        os.makedirs(self.docs_dir, exist_ok=True)
+
+        self.documents = {}
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                self.documents = json.load(f).get("documents", {})
+
+    def lookup(self, pdf_path):
+        """
+        Returns (digest, candidates, layout) for pdf_path. candidates and
+        layout are None if the document has to be parsed again.
+        """
+        key = os.path.abspath(pdf_path)
+        stat = os.stat(pdf_path)
+        known = self.documents.get(key)
+        if known and known["size"] == stat.st_size and known["mtime_ns"] == stat.st_mtime_ns:
+            digest = known["sha256"]
+        else:
+            digest = file_digest(pdf_path)
+            self.documents[key] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": digest}
+
+        doc_path = self._doc_path(digest)
+        if not os.path.exists(doc_path):
+            return digest, None, None
+
+        with open(doc_path, "r", encoding="utf-8") as f:
+            stored = json.load(f)
+        layout = DocumentLayout.from_text_index(pdf_path, stored["pages"])
+        return digest, stored["candidates"], layout
+
+    def store(self, digest, candidates, text_index):
+        """Saves the parse result of a document (text_index from DocumentLayout.to_text_index())."""
+        self._write_json(self._doc_path(digest), {
+            "parser_version": self.parser_version,
+            "candidates": candidates,
+            "pages": text_index
+        })
+
+    def save(self):
+        """Writes manifest.json, dropping deleted files and unreferenced parse results."""
+        self.documents = {k: v for k, v in self.documents.items() if os.path.exists(k)}
+        self._write_json(self.manifest_path, {"documents": self.documents})
+
+        referenced = {os.path.basename(self._doc_path(v["sha256"])) for v in self.documents.values()}
+        for name in os.listdir(self.docs_dir):
+            if name.endswith(".json") and name not in referenced:
+                os.remove(os.path.join(self.docs_dir, name))
+
+    # --- Helper Methods for Internal Logic ---
+
+    def _doc_path(self, digest):
+        return os.path.join(self.docs_dir, f"{digest}-v{self.parser_version}.json")
+
+    def _write_json(self, path, data):
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
@@ -1,8 +1,19 @@
+import heapq
 import json
 import os
+from contextlib import contextmanager
 from datetime import datetime
+from src import trace
+
+OUTPUT_FORMATS = ("json", "json-stream", "jsonl")
 
 class OutputGenerator:
+    """
+    Collects ranked sections and writes the final output document.
+    Only the best top_k sections are kept (a bounded heap), plus a count
+    of all sections added; ties on score keep the section added first.
+    """
+
     def __init__(self, input_docs, persona, job, top_k=20):
         self.metadata = {
             "input_documents": input_docs,
@@ -10,50 +21,196 @@ class OutputGenerator:
             "job_to_be_done": job,
             "processing_timestamp": datetime.now().isoformat()
         }
-        self.all_sections = []
         self.top_k = top_k
+        self.total_sections = 0
+        # Min-heap of (score, -seq, section): the root is the entry to drop
+        # next (lowest score; on ties the one added last)
+        self._heap = []
 
     def add_result(self, pdf_name, section):
-        self.all_sections.append({
+        self._push(section['score'], self.total_sections, {
             'document': pdf_name,
             'heading': section['heading'],
             'score': section['score'],
             'content': section['content'],
             'page_number': section['page_number']
         })
+        self.total_sections += 1
+
+    def count_skipped(self, count):
+        """
+        Counts sections that were ranked but never cut because they could
+        not reach the top_k (see CorpusIndex.query_top()).
+        """
+        self.total_sections += count
+
+    def merge(self, other):
+        """
+        Adds the sections of another generator (e.g. filled by a parallel
+        worker), as if they had been added here after the current ones.
+        """
+        for score, neg_seq, section in other._heap:
+            self._push(score, self.total_sections - neg_seq, section)
+        self.total_sections += other.total_sections
 
-    def save_json(self, output_path):
-        # Sort all findings by Score
-        sorted_sections = sorted(self.all_sections, key=lambda x: x['score'], reverse=True)
-        top_sections = sorted_sections[:self.top_k]
-
-        output = {
-            "metadata": {
-                **self.metadata,
-                "total_sections_found": len(sorted_sections),
-                "top_k_selected": len(top_sections)
-            },
-            "extracted_sections": [],
-            "subsection_analysis": []
+    def top_sections(self):
+        """The kept sections, best first."""
+        return [section for _, _, section in sorted(self._heap, key=lambda e: (-e[0], -e[1]))]
+
+    def _push(self, score, seq, section):
+        if self.top_k <= 0:
+            return
+        entry = (score, -seq, section)
+        if len(self._heap) < self.top_k:
+            heapq.heappush(self._heap, entry)
+        elif entry[:2] > self._heap[0][:2]:
+            heapq.heapreplace(self._heap, entry)
+
+    def build_output(self):
+        """Returns the output document (as written by save_json) as a dict."""
+        top_sections = self.top_sections()
+        return {
+            "metadata": self._output_metadata(len(top_sections)),
+            "extracted_sections": [_extracted_section(idx, section) for idx, section in enumerate(top_sections, 1)],
+            "subsection_analysis": [_subsection_analysis(section) for section in top_sections]
         }
 
-        for idx, section in enumerate(top_sections, 1):
-            output["extracted_sections"].append({
-                "document": section["document"],
-                "section_title": section["heading"],
-                "importance_rank": idx,
-                "page_number": section["page_number"]
-            })
+    def save(self, output_path, output_format="json", atomic=False):
+        """
+        Writes the output as "json" (default), "json-stream" or "jsonl".
+        With atomic=True, readers of output_path never see a partial file
+        (it is written next to it and then renamed over it).
+        """
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"Unknown output format '{output_format}'")
+        with trace.span("output.write", format=output_format, sections=len(self._heap)):
+            if output_format == "jsonl":
+                self.save_jsonl(output_path, atomic=atomic)
+            else:
+                self.save_json(output_path, stream=output_format == "json-stream", atomic=atomic)
 
-            output["subsection_analysis"].append({
-                "document": section["document"],
-                "refined_text": section["content"],
-                "page_number": section["page_number"]
-            })
+    def save_json(self, output_path, stream=False, atomic=False):
+        """
+        Writes the output document. With stream=True, entries are
+        serialized and written one at a time instead of building the whole
+        document first; the bytes are the same.
+        """
+        try:
+            with _open_output(output_path, atomic) as f:
+                if stream:
+                    self._write_json_stream(f)
+                else:
+                    json.dump(self.build_output(), f, ensure_ascii=False, indent=2)
+            print(f"Results saved to {output_path}")
+        except IOError as e:
+            print(f"Error saving file: {e}")
 
+    def save_jsonl(self, output_path, atomic=False):
+        """
+        Writes one JSON object per line: first {"metadata": ...}, then every
+        kept section (best first) with the fields of both output lists.
+        Uses orjson when it is installed.
+        """
+        top_sections = self.top_sections()
         try:
-            with open(output_path, "w", encoding="utf-8") as f:
-                json.dump(output, f, ensure_ascii=False, indent=2)
+            with _open_output(output_path, atomic) as f:
+                f.write(_dumps_line({"metadata": self._output_metadata(len(top_sections))}))
+                for idx, section in enumerate(top_sections, 1):
+                    f.write(_dumps_line({
+                        **_extracted_section(idx, section),
+                        "refined_text": section["content"]
+                    }))
             print(f"Results saved to {output_path}")
         except IOError as e:
-            print(f"Error saving file: {e}")
\ No newline at end of file
+            print(f"Error saving file: {e}")
+
+    def _output_metadata(self, selected):
+        return {
+            **self.metadata,
+            "total_sections_found": self.total_sections,
+            "top_k_selected": selected
+        }
+
+    def _write_json_stream(self, f):
+        # Reproduces json.dump(..., indent=2) piece by piece: every entry is
+        # dumped on its own and shifted to its nesting depth
+        top_sections = self.top_sections()
+        f.write('{\n  "metadata": ')
+        f.write(_indented(self._output_metadata(len(top_sections)), 1))
+        f.write(',\n  "extracted_sections": ')
+        _write_list(f, (_extracted_section(idx, section) for idx, section in enumerate(top_sections, 1)))
+        f.write(',\n  "subsection_analysis": ')
+        _write_list(f, (_subsection_analysis(section) for section in top_sections))
+        f.write("\n}")
+
+
+@contextmanager
+def _open_output(output_path, atomic=False):
+    if not atomic:
+        with open(output_path, "w", encoding="utf-8") as f:
+            yield f
+        return
+
+    tmp_path = f"{output_path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            yield f
+        os.replace(tmp_path, output_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _extracted_section(idx, section):
+    return {
+        "document": section["document"],
+        "section_title": section["heading"],
+        "importance_rank": idx,
+        "page_number": section["page_number"]
+    }
+
+
+def _subsection_analysis(section):
+    return {
+        "document": section["document"],
+        "refined_text": section["content"],
+        "page_number": section["page_number"]
+    }
+
+
+def _indented(value, depth):
+    # Strings never contain raw newlines in JSON, so this only touches layout
+    return json.dumps(value, ensure_ascii=False, indent=2).replace("\n", "\n" + "  " * depth)
+
+
+def _indented_entry(entry):
+    """_indented(entry, 2) for a flat dict, without the (pure Python) indenting encoder."""
+    if not entry or any(isinstance(v, (dict, list, tuple)) for v in entry.values()):
+        return _indented(entry, 2)
+    encode = _ENCODER.encode
+    return "{\n" + ",\n".join(
+        f"      {encode(key)}: {encode(value)}" for key, value in entry.items()
+    ) + "\n    }"
+
+
+def _write_list(f, items):
+    first = True
+    for item in items:
+        f.write("[\n    " if first else ",\n    ")
+        f.write(_indented_entry(item))
+        first = False
+    f.write("[]" if first else "\n  ]")
+
+
+_ENCODER = json.JSONEncoder(ensure_ascii=False)
+
+
+try:
+    import orjson
+
+    def _dumps_line(value):
+        return orjson.dumps(value, option=orjson.OPT_APPEND_NEWLINE).decode("utf-8")
+except ImportError:
+    def _dumps_line(value):
+        # Same bytes as orjson: compact separators, non-ASCII kept as is
+        return json.dumps(value, ensure_ascii=False, separators=(",", ":")) + "\n"
@@ -1,7 +1,62 @@
 import fitz  # PyMuPDF
+import math
+import multiprocessing
+import os
 import re
 from collections import Counter
-from src.utils import clean_text, is_bold_font, is_all_upper, is_title_case, is_binary_data
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from src import trace
+from src.layout import DocumentLayout, LayoutPage, iter_sections
+from src.utils import clean_text, is_bold_font, is_all_upper, is_title_case, text_profile
+
+# Bump whenever a change alters candidates or section text, so that
+# incremental runs (src/manifest.py) re-parse stored documents
+PARSER_VERSION = 2
+
+# Default "dict" extraction minus image blocks: they carry no text lines,
+# but decoding them dominated time and peak memory on image-heavy PDFs
+TEXT_FLAGS = fitz.TEXTFLAGS_DICT & ~fitz.TEXT_PRESERVE_IMAGES
+
+# Streaming mode keeps MuPDF's caches from growing with the page count:
+# the resource store is emptied every STREAM_STORE_PAGES pages and the
+# document is reopened every STREAM_REOPEN_PAGES pages
+STREAM_STORE_PAGES = 32
+STREAM_REOPEN_PAGES = 512
+
+# With several workers, documents of at least PARALLEL_MIN_PAGES pages
+# are split into page ranges (of at least PARALLEL_RANGE_PAGES pages)
+# that are decoded in separate processes
+PARALLEL_MIN_PAGES = 256
+PARALLEL_RANGE_PAGES = 32
+
+
+# Page furniture: a line in the top or bottom FURNITURE_MARGIN of the
+# page whose text (case-folded, digits ignored) recurs at the same height
+# on at least FURNITURE_MIN_SHARE of the pages (and FURNITURE_MIN_PAGES
+# pages) is a running header/footer, never a heading candidate
+FURNITURE_MARGIN = 0.1
+FURNITURE_MIN_SHARE = 0.5
+FURNITURE_MIN_PAGES = 3
+FURNITURE_Y_TOLERANCE = 4
+
+_DIGITS = re.compile(r"\d+")
+
+
+def page_ranges(page_count, workers):
+    """
+    Splits page_count pages into contiguous (start, stop) ranges: about
+    four per worker, so uneven pages still balance, but never fewer than
+    PARALLEL_RANGE_PAGES pages each.
+    """
+    count = max(1, min(workers * 4, page_count // PARALLEL_RANGE_PAGES))
+    bounds = [page_count * i // count for i in range(count + 1)]
+    return list(zip(bounds, bounds[1:]))
+
+
+def _parse_range(pdf_path, start, stop):
+    # Runs in a worker process (see PDFParser.extract_candidates_parallel)
+    return PDFParser().parse_range(pdf_path, start, stop)
 
 class PDFParser:
     """
@@ -9,149 +64,418 @@ class PDFParser:
     heuristic analysis of font metadata (size, weight, casing).
     """
 
+    def __init__(self):
+        # Layout of the most recently opened document, so that
+        # extract_sections() reuses the pages decoded by extract_candidates()
+        self._layout = None
+
+    def load_layout(self, pdf_path):
+        """
+        Returns the decoded layout of pdf_path, parsing it only if it is not
+        already cached (or the file changed on disk since).
+        An already loaded DocumentLayout is returned as is.
+        """
+        if isinstance(pdf_path, DocumentLayout):
+            return pdf_path
+
+        stat = os.stat(pdf_path)
+        key = (os.path.abspath(pdf_path), stat.st_mtime_ns, stat.st_size)
+        if self._layout is not None and self._layout.key == key:
+            return self._layout
+
+        with trace.span("parser.load_layout", document=os.path.basename(pdf_path)):
+            with fitz.open(pdf_path) as doc:
+                self._layout = DocumentLayout.from_fitz(doc, pdf_path, key, TEXT_FLAGS)
+        if trace.active():
+            trace.count("pages", self._layout.page_count)
+            trace.count("spans", sum(len(page.span_text) for page in self._layout.pages))
+        return self._layout
+
     def extract_candidates(self, pdf_path):
         """
         Analyzes PDF to find potential headings based on font properties.
+        Accepts a file path or a DocumentLayout from load_layout().
         (Renamed from extract_heading_candidates to match main.py)
         """
-        doc = fitz.open(pdf_path)
-        candidates = []
-        all_lines = []
-
-        # 1. First Pass: Extract all lines with detailed metadata
-        for page_num, page in enumerate(doc):
-            blocks = page.get_text("dict")["blocks"]
-            spans = []
-
-            for block in blocks:
-                for line in block.get("lines", []):
-                    for span in line["spans"]:
-                        spans.append({
-                            "text": span["text"],
-                            "font": span["font"],
-                            "size": span["size"],
-                            "flags": span["flags"],
-                            "x0": span["bbox"][0],
-                            "x1": span["bbox"][2],
-                            "y0": span["bbox"][1],
-                            "y1": span["bbox"][3],
-                            "origin_y": line["bbox"][1],
-                            "page_width": page.rect.width,
-                            "page_num": page_num
-                        })
-
-            # Sort spans by vertical position, then horizontal
-            spans.sort(key=lambda s: (round(s["origin_y"], 1), s["x0"]))
-            
-            # Merge spans into lines
-            merged_lines = self._merge_spans_to_lines(spans)
-            all_lines.extend(merged_lines)
+        layout = self.load_layout(pdf_path)
+        if not layout.page_count:
+            return []
 
-        if not all_lines:
+        with trace.span("parser.extract_candidates", document=os.path.basename(layout.path)):
+            candidates = self._extract_candidates(layout)
+        trace.count("candidates", len(candidates))
+        return candidates
+
+    def _extract_candidates(self, layout):
+        # 1. First Pass: columnar span arrays, merged into lines
+        spans = self._collect_spans(layout)
+        lines = self._merge_spans_to_lines(spans)
+
+        if not lines["text"]:
             return []
 
-        # 2. Analyze global document statistics
-        median_font_size, threshold_width = self._calculate_doc_stats(all_lines)
-
-        # 3. Second Pass: Filter candidates based on heuristics
-        for sentence, size, span in all_lines:
-            reasons = self._evaluate_heading_heuristics(
-                sentence, size, span, median_font_size, threshold_width
-            )
-
-            if reasons:
-                candidates.append({
-                    "text": sentence,
-                    "page_num": span["page_num"],
-                    "y": span["y0"],
-                    "reasons": reasons
-                })
+        # 2. Analyze global document statistics (and find page furniture)
+        median_font_size, threshold_width = self._calculate_doc_stats(lines)
+        furniture = self._find_furniture(self._furniture_pages(lines), layout.page_count)
 
-        return candidates
+        # 3. Second Pass: Filter candidates based on heuristics (one array per rule)
+        return self._build_candidates(lines, median_font_size, threshold_width, furniture)
 
     def extract_sections(self, pdf_path, heading_matches):
         """
         Extracts content text between identified headings.
+        Accepts a file path or a DocumentLayout from load_layout().
+        """
+        layout = self.load_layout(pdf_path)
+        with trace.span("parser.extract_sections", document=os.path.basename(layout.path)):
+            sections = layout.extract_sections(heading_matches)
+        trace.count("sections", len(sections))
+        return sections
+
+    def iter_candidates(self, pdf_path):
+        """
+        Streaming form of extract_candidates() for very large PDFs: yields
+        the same candidates, in the same order, while holding one page at
+        a time. A first pass keeps only a font-size histogram and a width
+        histogram for the document statistics; a second pass decodes the
+        pages again and evaluates the rules page by page.
+        """
+        # 1. First Pass: histograms only (plus the page counts of margin texts)
+        size_counts = Counter()
+        width_counts = Counter()
+        furniture_pages = Counter()
+        for page_lines in self._iter_page_lines(pdf_path):
+            size_counts.update(page_lines["size"].tolist())
+            width_counts.update(np.round(page_lines["x1"] - page_lines["x0"], -1).tolist())
+            furniture_pages.update(self._furniture_pages(page_lines))
+
+        if not size_counts:
+            return
+
+        # 2. Analyze global document statistics
+        median_font_size, threshold_width = self._stats_from_histograms(size_counts, width_counts)
+        furniture = self._find_furniture(furniture_pages, self.page_count(pdf_path))
+
+        # 3. Second Pass: Filter candidates page by page
+        for page_lines in self._iter_page_lines(pdf_path):
+            candidates = self._build_candidates(page_lines, median_font_size, threshold_width, furniture)
+            trace.count("candidates", len(candidates))
+            yield from candidates
+
+    def extract_candidates_parallel(self, pdf_path, workers=2, pool=None):
+        """
+        extract_candidates() for very large PDFs: the pages are split into
+        ranges (page_ranges) that worker processes decode with a fitz
+        handle of their own (see parse_range), and the results are merged
+        with merge_ranges(). Candidates are identical to a serial run.
+        Uses pool (a ProcessPoolExecutor) if given, else a spawn pool of
+        workers processes. Returns (candidates, text_index), text_index as
+        from DocumentLayout.to_text_index().
         """
+        ranges = page_ranges(self.page_count(pdf_path), workers)
+        if pool is None:
+            ctx = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as own_pool:
+                return self.extract_candidates_parallel(pdf_path, workers, own_pool)
+
+        futures = [pool.submit(_parse_range, pdf_path, start, stop) for start, stop in ranges]
+        return self.merge_ranges([future.result() for future in futures])
+
+    def parse_range(self, pdf_path, start, stop):
+        """
+        Decodes pages [start, stop) of pdf_path and returns what the
+        document-level pass needs from them: their merged lines, the
+        font-size and width histograms of those lines, and the pages' text
+        index. Lines never run across pages, so ranges can be cut anywhere.
+        """
+        fonts = {}
+        with fitz.open(pdf_path) as doc:
+            pages = [LayoutPage.from_fitz(doc.load_page(n), n, fonts, TEXT_FLAGS)
+                     for n in range(start, min(stop, doc.page_count))]
+        layout = DocumentLayout(pdf_path, pages, fonts=list(fonts))
+
+        lines = self._merge_spans_to_lines(self._collect_spans(layout)) if pages else {"text": []}
+        if not lines["text"]:
+            return {"lines": None, "size_counts": Counter(), "width_counts": Counter(),
+                    "furniture_pages": Counter(), "text_index": layout.to_text_index()}
+        return {
+            "lines": lines,
+            # Counted in line order, like _calculate_doc_stats() sees them
+            "size_counts": Counter(lines["size"].tolist()),
+            "width_counts": Counter(np.round(lines["x1"] - lines["x0"], -1).tolist()),
+            "furniture_pages": self._furniture_pages(lines),
+            "text_index": layout.to_text_index()
+        }
+
+    def merge_ranges(self, ranges):
+        """
+        Candidates and text index of a document from the parse_range()
+        results of all its page ranges, in page order. The histograms are
+        merged in page order (so ties on the most common width still go to
+        the width seen first) and give the statistics of
+        _calculate_doc_stats(); the heading rules then run per range.
+        """
+        size_counts = Counter()
+        width_counts = Counter()
+        furniture_pages = Counter()
+        for r in ranges:
+            size_counts.update(r["size_counts"])
+            width_counts.update(r["width_counts"])
+            furniture_pages.update(r["furniture_pages"])
+        text_index = [page for r in ranges for page in r["text_index"]]
+        if not size_counts:
+            return [], text_index
+
+        median_font_size, threshold_width = self._stats_from_histograms(size_counts, width_counts)
+        furniture = self._find_furniture(furniture_pages, len(text_index))
+        candidates = []
+        for r in ranges:
+            if r["lines"] is not None:
+                candidates.extend(self._build_candidates(r["lines"], median_font_size, threshold_width, furniture))
+        trace.count("candidates", len(candidates))
+        return candidates, text_index
+
+    def page_count(self, pdf_path):
+        """Number of pages of a file path or DocumentLayout (no page is decoded)."""
+        if isinstance(pdf_path, DocumentLayout):
+            return pdf_path.page_count
+        with fitz.open(pdf_path) as doc:
+            return doc.page_count
+
+    def iter_sections(self, pdf_path, heading_matches):
+        """
+        Streaming form of extract_sections(): decodes the PDF one page at a
+        time and yields every section as soon as its text is complete.
+        """
+        yield from iter_sections(self._iter_pages(pdf_path, {}), self.page_count(pdf_path), heading_matches)
+
+    # --- Helper Methods for Internal Logic ---
+
+    def _iter_pages(self, pdf_path, fonts):
+        """Decodes the PDF one page at a time (fonts: name -> code, filled as pages are read)."""
         doc = fitz.open(pdf_path)
-        sorted_matches = sorted(heading_matches, key=lambda x: (x["page_num"], x["y"]))
-        sections = []
+        try:
+            for n in range(doc.page_count):
+                if n and n % STREAM_REOPEN_PAGES == 0:
+                    # Drops the objects MuPDF keeps for every page it has loaded
+                    doc.close()
+                    doc = fitz.open(pdf_path)
+                yield LayoutPage.from_fitz(doc.load_page(n), n, fonts, TEXT_FLAGS)
+                trace.count("pages")
+                if n % STREAM_STORE_PAGES == STREAM_STORE_PAGES - 1:
+                    # Decoded fonts and images are cached globally (up to 256 MB)
+                    fitz.TOOLS.store_shrink(100)
+        finally:
+            doc.close()
 
-        for i, current in enumerate(sorted_matches):
-            start_page = current["page_num"]
-            start_y = current["y"]
-            
-            # Determine end boundary
-            if i + 1 < len(sorted_matches):
-                next_heading = sorted_matches[i + 1]
-                end_page = next_heading["page_num"]
-                end_y = next_heading["y"]
+    def _iter_page_lines(self, pdf_path):
+        """Yields the merged lines of every page, decoding one page at a time."""
+        fonts = {}
+        for page in self._iter_pages(pdf_path, fonts):
+            # Lines never run across pages, so merging per page is exact
+            lines = self._merge_spans_to_lines(self._collect_spans(DocumentLayout(pdf_path, [page], fonts=list(fonts))))
+            if lines["text"]:
+                yield lines
+
+    def _furniture_keys(self, lines):
+        """
+        (normalized text, height bucket) of every line in the top or bottom
+        page margin, None for the other lines.
+        """
+        y0 = lines["y0"].tolist()
+        heights = lines["page_height"].tolist()
+        keys = []
+        for text, y, height in zip(lines["text"], y0, heights):
+            if height is None or FURNITURE_MARGIN * height <= y <= (1 - FURNITURE_MARGIN) * height:
+                keys.append(None)
             else:
-                end_page = doc.page_count - 1
-                end_y = None
+                keys.append((_DIGITS.sub("#", " ".join(text.casefold().split())), round(y / FURNITURE_Y_TOLERANCE)))
+        return keys
 
-            section_content = self._extract_text_range(doc, start_page, start_y, end_page, end_y)
-            
-            sections.append({
-                "heading": current["text"],
-                "score": current.get("score", 0.0),
-                "content": clean_text(section_content),
-                "page_number": start_page + 1
+    def _furniture_pages(self, lines):
+        """Number of pages each margin text (see _furniture_keys) occurs on."""
+        seen = {(key, page) for key, page in zip(self._furniture_keys(lines), lines["page_num"].tolist())
+                if key is not None}
+        return Counter(key for key, _ in seen)
+
+    def _find_furniture(self, furniture_pages, page_count):
+        """Margin texts that recur on enough pages to be running headers/footers."""
+        min_pages = max(FURNITURE_MIN_PAGES, math.ceil(FURNITURE_MIN_SHARE * page_count))
+        return {key for key, pages in furniture_pages.items() if pages >= min_pages}
+
+    def _build_candidates(self, lines, median_size, threshold_width, furniture=()):
+        rules = self._evaluate_heading_rules(lines, median_size, threshold_width)
+        is_candidate = np.any(list(rules.values()), axis=0)
+        if furniture:
+            is_candidate &= np.array([key not in furniture for key in self._furniture_keys(lines)], dtype=bool)
+
+        candidates = []
+        for i in np.flatnonzero(is_candidate):
+            candidates.append({
+                "text": lines["text"][i],
+                "page_num": int(lines["page_num"][i]),
+                "y": float(lines["y0"][i]),
+                "reasons": [reason for reason, hits in rules.items() if hits[i]]
             })
+        return candidates
 
-        return sections
+    def _collect_spans(self, layout):
+        """
+        Flattens the layout into struct-of-arrays form (one entry per span),
+        sorted per page by vertical position, then horizontal.
+        """
+        pages = layout.pages
+        counts = [len(page.span_text) for page in pages]
+        page_num = np.repeat([page.number for page in pages], counts).astype(int)
+        page_width = np.repeat([page.width for page in pages], counts).astype(float)
+        page_height = np.repeat(np.array([page.height for page in pages], dtype=object), counts)
 
-    # --- Helper Methods for Internal Logic ---
+        def column(name, dtype):
+            # float32 storage -> float64, so thresholds compare like Python floats
+            return np.concatenate([getattr(page, name) for page in pages]).astype(dtype)
+
+        # Every span inherits the (rounded) y of its line
+        origin_y = np.concatenate([
+            np.repeat([round(y, 1) for y in page.line_y.tolist()], np.diff(page.line_start))
+            for page in pages
+        ]).astype(float)
+        span_bbox = column("span_bbox", float)
+
+        # Sort spans by vertical position, then horizontal (stable, per page)
+        order = np.lexsort((span_bbox[:, 0], origin_y, page_num))
+        text = [t for page in pages for t in page.span_text]
+
+        return {
+            "text": [text[i] for i in order],
+            "font": column("span_font", int)[order],
+            "fonts": layout.fonts,
+            "size": column("span_size", float)[order],
+            "flags": column("span_flags", int)[order],
+            "x0": span_bbox[order, 0],
+            "x1": span_bbox[order, 2],
+            "y0": span_bbox[order, 1],
+            "origin_y": origin_y[order],
+            "page_num": page_num[order],
+            "page_width": page_width[order],
+            "page_height": page_height[order]
+        }
 
     def _merge_spans_to_lines(self, spans):
-        merged_lines = []
+        """
+        Merges sorted spans into lines (text never runs across pages).
+        Each line takes the metadata of its last span.
+        """
+        texts = []
+        last_spans = []
         buffer = ""
         last_y = None
-        last_size = None
         last_span = None
+        current_page = None
 
-        for span in spans:
-            raw_text = span["text"]
-            if is_binary_data(raw_text): continue
-            
+        origin_y = spans["origin_y"].tolist()
+        sizes = spans["size"].tolist()
+        pages = spans["page_num"].tolist()
+
+        for i, raw_text in enumerate(spans["text"]):
+            if pages[i] != current_page:
+                # New page: flush the line in progress
+                if buffer:
+                    texts.append(buffer.strip())
+                    last_spans.append(last_span)
+                buffer = ""
+                last_y = None
+                current_page = pages[i]
+
+            # Binary spans clean to ""
             text = clean_text(raw_text)
             if not text: continue
 
-            current_y = round(span["origin_y"], 1)
-            size = span["size"]
+            current_y = origin_y[i]
+            size = sizes[i]
             
             is_new_para = (last_y is not None and abs(current_y - last_y) > size * 1.2)
 
-            if buffer and (re.search(r"[.?!]$", buffer) or is_new_para):
-                merged_lines.append((buffer.strip(), last_size, last_span))
+            if buffer and (buffer.endswith((".", "?", "!")) or is_new_para):
+                texts.append(buffer.strip())
+                last_spans.append(last_span)
                 buffer = text
             else:
                 buffer = buffer + " " + text if buffer else text
 
             last_y = current_y
-            last_size = size
-            last_span = span
+            last_span = i
 
         if buffer:
-            merged_lines.append((buffer.strip(), last_size, last_span))
-        return merged_lines
+            texts.append(buffer.strip())
+            last_spans.append(last_span)
 
-    def _calculate_doc_stats(self, all_lines):
-        line_widths = [span["x1"] - span["x0"] for _, _, span in all_lines]
-        rounded_widths = [round(w, -1) for w in line_widths]
+        idx = np.array(last_spans, dtype=int)
+        lines = {key: spans[key][idx] for key in ("font", "size", "flags", "x0", "x1", "y0", "page_num", "page_width",
+                                                  "page_height")}
+        lines["text"] = texts
+        lines["fonts"] = spans["fonts"]
+        return lines
+
+    def _calculate_doc_stats(self, lines):
+        rounded_widths = np.round(lines["x1"] - lines["x0"], -1)
         
-        if rounded_widths:
-            most_common_width = Counter(rounded_widths).most_common(1)[0][0]
+        if len(rounded_widths):
+            # Most common width; ties go to the width seen first (as Counter.most_common)
+            values, first_seen, counts = np.unique(rounded_widths, return_index=True, return_counts=True)
+            is_mode = counts == counts.max()
+            most_common_width = float(values[is_mode][np.argmin(first_seen[is_mode])])
             threshold_width = 0.75 * most_common_width
         else:
             threshold_width = 0
 
-        font_sizes = [line[1] for line in all_lines]
-        median_font_size = sorted(font_sizes)[len(font_sizes) // 2] if font_sizes else 12
+        font_sizes = lines["size"]
+        median_font_size = float(np.sort(font_sizes)[len(font_sizes) // 2]) if len(font_sizes) else 12
         
         return median_font_size, threshold_width
 
+    def _stats_from_histograms(self, size_counts, width_counts):
+        """
+        _calculate_doc_stats() from a font-size histogram and a width
+        histogram (rounded widths, counted in line order).
+        """
+        # Counter.most_common keeps the width seen first on ties
+        threshold_width = 0.75 * width_counts.most_common(1)[0][0] if width_counts else 0
+
+        # Median as in _calculate_doc_stats: element n // 2 of the sorted sizes
+        middle = sum(size_counts.values()) // 2
+        seen = 0
+        for size in sorted(size_counts):
+            seen += size_counts[size]
+            if seen > middle:
+                return size, threshold_width
+        return 12, threshold_width
+
+    def _evaluate_heading_rules(self, lines, median_size, threshold_width):
+        """
+        Vectorized form of _evaluate_heading_heuristics: one boolean array
+        per reason (in reporting order) over all lines of the document.
+        """
+        size = lines["size"]
+        text_width = lines["x1"] - lines["x0"]
+        profiles = [text_profile(sentence) for sentence in lines["text"]]
+        word_count = np.array([profile.word_count for profile in profiles], dtype=int)
+
+        # Font names are checked once per distinct font, not once per line
+        bold_fonts = np.array([is_bold_font({"flags": 0, "font": f}) for f in lines["fonts"]], dtype=bool)
+        is_bold = ((lines["flags"] & 2) != 0) | bold_fonts[lines["font"]]
+        is_centered = np.abs(lines["x0"] - (lines["page_width"] - lines["x1"])) < 20
+
+        return {
+            "Larger font": size > median_size * 1.15,
+            "Bold": is_bold,
+            "Centered": is_centered & ((text_width < threshold_width) | (word_count < 10)),
+            "Uppercase": np.array([profile.is_upper for profile in profiles], dtype=bool),
+            "Title Case": np.array([profile.is_title for profile in profiles], dtype=bool),
+            "Short & Prominent": (word_count < 10) & (size > median_size)
+        }
+
     def _evaluate_heading_heuristics(self, sentence, size, span, median_size, threshold_width):
+        """Single-line form of _evaluate_heading_rules."""
         page_width = span["page_width"]
         text_width = span["x1"] - span["x0"]
         is_bold = is_bold_font(span)
@@ -167,21 +491,3 @@ class PDFParser:
         if word_count < 10 and size > median_size: reasons.append("Short & Prominent")
         
         return reasons
-
-    def _extract_text_range(self, doc, start_page, start_y, end_page, end_y):
-        text = ""
-        for p in range(start_page, end_page + 1):
-            page = doc[p]
-            blocks = page.get_text("dict")["blocks"]
-            for block in blocks:
-                for line in block.get("lines", []):
-                    line_y = line["bbox"][1]
-                    # Skip text before start_y on first page
-                    if p == start_page and line_y < start_y: continue
-                    # Skip text after end_y on last page
-                    if p == end_page and end_y is not None and line_y >= end_y: continue
-                    
-                    for span in line["spans"]:
-                        text += span["text"] + " "
-            text += "\n"
-        return text
\ No newline at end of file
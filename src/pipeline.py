@@ -0,0 +1,304 @@
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from src import trace
+from src.layout import DocumentLayout, SectionCache
+from src.lexical import shortlist
+from src.parser import PARALLEL_MIN_PAGES, PDFParser, page_ranges
+
+# Each pool worker keeps its own parser
+_worker_parser = None
+
+
+def _init_worker():
+    global _worker_parser
+    _worker_parser = PDFParser()
+
+
+def _parse_document(pdf_path, stream=False):
+    """
+    Worker side: decodes the PDF once and returns its candidates together
+    with the text index, so sections can be cut without decoding it again.
+    In stream mode only the candidates are returned (text index is None).
+    """
+    if stream:
+        return list(_worker_parser.iter_candidates(pdf_path)), None
+    layout = _worker_parser.load_layout(pdf_path)
+    return _worker_parser.extract_candidates(layout), layout.to_text_index()
+
+
+def _parse_range(pdf_path, start, stop):
+    # Worker side: one page range of a large document
+    return _worker_parser.parse_range(pdf_path, start, stop)
+
+
+class _RangeJob:
+    """
+    The page-range futures of one large document; result() merges them
+    into what _parse_document() would have returned.
+    """
+
+    def __init__(self, futures):
+        self.futures = futures
+
+    def result(self):
+        return PDFParser().merge_ranges([future.result() for future in self.futures])
+
+
+def process_documents(pdf_paths, ranker, job_query, top_k=10, workers=1, parser=None, manifest=None,
+                      stream=False, prefilter=None):
+    """
+    Runs parse -> rank -> extract over every PDF.
+    Candidates of all documents are ranked together with one batched
+    RankingEngine.rank_collection() call (top_k is still per document).
+    With a DocumentManifest, unchanged documents are not parsed again.
+    With stream=True, no document is held in memory as a whole: candidates
+    and sections come from PDFParser.iter_candidates()/iter_sections().
+    With prefilter=N, only the N candidates of the collection that score
+    best lexically (see prefilter_candidates) are embedded and ranked.
+    Returns a list of (pdf_path, sections) in the same order as pdf_paths,
+    so the merged output does not depend on the number of workers.
+    Documents that fail are reported and left out.
+    """
+    parser = parser or PDFParser()
+    with trace.span("pipeline.parse", documents=len(pdf_paths)):
+        parsed = parse_documents(pdf_paths, workers=workers, parser=parser, manifest=manifest, stream=stream)
+    return rank_and_extract(parsed, ranker, job_query, top_k=top_k, parser=parser, prefilter=prefilter)
+
+
+def rank_and_extract(parsed, ranker, job_query, top_k=10, parser=None, prefilter=None):
+    """
+    Rank and extract stages of process_documents(), for documents that
+    were already parsed (the output of parse_documents()/collect_parsed()).
+    Returns a list of (pdf_path, sections) in the order of parsed.
+    """
+    parser = parser or PDFParser()
+    candidates_by_doc = [candidates for _, _, candidates in parsed]
+    if prefilter:
+        with trace.span("pipeline.prefilter", top_n=prefilter):
+            candidates_by_doc = prefilter_candidates(parsed, job_query, prefilter, parser=parser)
+
+    # B. Rank Candidates (Semantic) across the whole collection
+    with trace.span("pipeline.rank", candidates=sum(map(len, candidates_by_doc))):
+        matches_by_doc = ranker.rank_collection(candidates_by_doc, job_query, top_k=top_k)
+
+    # C. Extract Content
+    results = []
+    with trace.span("pipeline.extract"):
+        for (pdf_path, layout, _), matches in zip(parsed, matches_by_doc):
+            print(f"  -> {os.path.basename(pdf_path)}: identified {len(matches)} relevant sections")
+            try:
+                if layout is None:
+                    with trace.span("document.extract", document=os.path.basename(pdf_path)):
+                        results.append((pdf_path, list(parser.iter_sections(pdf_path, matches))))
+                else:
+                    results.append((pdf_path, parser.extract_sections(layout, matches)))
+            except Exception as e:
+                print(f"  X Error processing {os.path.basename(pdf_path)}: {e}")
+                trace.event("error", stage="extract", document=os.path.basename(pdf_path), error=repr(e))
+    return results
+
+
+def process_queries(pdf_paths, ranker, job_queries, top_k=10, workers=1, parser=None, manifest=None):
+    """
+    process_documents() for many job queries over the same PDFs in one
+    pass: documents are parsed once, candidates are embedded once and all
+    queries are scored together (RankingEngine.rank_queries). Section text
+    is cut once per distinct heading interval selected by any query
+    (SectionCache). Returns, per query, the list of (pdf_path, sections)
+    that process_documents() would return for it.
+    """
+    parser = parser or PDFParser()
+    with trace.span("pipeline.parse", documents=len(pdf_paths)):
+        parsed = parse_documents(pdf_paths, workers=workers, parser=parser, manifest=manifest)
+
+    # B. Rank every query against the collection at once
+    candidates_by_doc = [candidates for _, _, candidates in parsed]
+    with trace.span("pipeline.rank", candidates=sum(map(len, candidates_by_doc)), queries=len(job_queries)):
+        matches_by_query = ranker.rank_queries(candidates_by_doc, job_queries, top_k=top_k)
+
+    # C. Extract Content, shared between queries
+    caches = [SectionCache(layout) for _, layout, _ in parsed]
+    results_by_query = []
+    with trace.span("pipeline.extract", queries=len(job_queries)):
+        for matches_by_doc in matches_by_query:
+            results = []
+            for (pdf_path, _, _), cache, matches in zip(parsed, caches, matches_by_doc):
+                try:
+                    results.append((pdf_path, cache.extract_sections(matches)))
+                except Exception as e:
+                    print(f"  X Error processing {os.path.basename(pdf_path)}: {e}")
+                    trace.event("error", stage="extract", document=os.path.basename(pdf_path), error=repr(e))
+            results_by_query.append(results)
+
+    cut = sum(cache.misses for cache in caches)
+    print(f"Sections: {cut} cut for {cut + sum(cache.hits for cache in caches)} selected across {len(job_queries)} queries")
+    return results_by_query
+
+
+def prefilter_candidates(parsed, job_query, top_n, parser=None):
+    """
+    Lexical first stage in front of the semantic ranker. Every candidate
+    of the collection is scored with BM25 against job_query, using its
+    heading text plus the body of the section it opens, and only the top_n
+    are kept. parsed is the output of parse_documents(); returns the kept
+    candidates per document, in their original order.
+    """
+    parser = parser or PDFParser()
+    texts, owners = [], []
+    for n, (pdf_path, layout, candidates) in enumerate(parsed):
+        for i, body in enumerate(_section_bodies(parser, pdf_path, layout, candidates)):
+            texts.append(candidates[i]["text"] + " " + body)
+            owners.append((n, i))
+
+    kept = [[] for _ in parsed]
+    for j in shortlist(texts, job_query, top_n):
+        n, i = owners[j]
+        kept[n].append(parsed[n][2][i])
+    print(f"Pre-filter: kept {sum(map(len, kept))} of {len(texts)} candidates")
+    return kept
+
+
+def _section_bodies(parser, pdf_path, layout, candidates):
+    """Content of the section each candidate opens (all candidates as boundaries), in candidate order."""
+    if layout is None:
+        sections = list(parser.iter_sections(pdf_path, candidates))
+    else:
+        sections = layout.extract_sections(candidates)
+
+    # Sections come back sorted by (page_num, y), like the sort below (stable)
+    order = sorted(range(len(candidates)), key=lambda i: (candidates[i]["page_num"], candidates[i]["y"]))
+    bodies = [""] * len(candidates)
+    for i, section in zip(order, sections):
+        bodies[i] = section["content"]
+    return bodies
+
+
+def parse_documents(pdf_paths, workers=1, parser=None, manifest=None, stream=False):
+    """
+    Parse stage of the pipeline. Returns (pdf_path, layout, candidates)
+    for every document that could be parsed, in input order. Layouts
+    from the pool or the manifest hold text only (enough for sections).
+    In stream mode, freshly parsed documents have no layout (None) and
+    are not stored in the manifest.
+    """
+    if workers <= 1:
+        parsed = _parse_serial(pdf_paths, parser or PDFParser(), manifest, stream)
+    else:
+        parsed = _parse_parallel(pdf_paths, workers, manifest, stream)
+
+    if manifest is not None:
+        manifest.save()
+    return parsed
+
+
+def _lookup(manifest, pdf_path):
+    if manifest is None:
+        return None, None, None
+    return manifest.lookup(pdf_path)
+
+
+def _parse_serial(pdf_paths, parser, manifest, stream=False):
+    # A. Parse Candidates (Heuristic); layouts are kept for section extraction
+    parsed = []
+    for pdf_path in pdf_paths:
+        print(f"Scanning: {os.path.basename(pdf_path)}...")
+        try:
+            with trace.span("document.parse", document=os.path.basename(pdf_path)):
+                digest, candidates, layout = _lookup(manifest, pdf_path)
+                if layout is not None:
+                    print(f"  -> Unchanged, reusing {len(candidates)} stored candidates")
+                    trace.count("documents.reused")
+                elif stream:
+                    candidates = list(parser.iter_candidates(pdf_path))
+                    print(f"  -> Found {len(candidates)} structural candidates")
+                else:
+                    layout = parser.load_layout(pdf_path)
+                    candidates = parser.extract_candidates(layout)
+                    print(f"  -> Found {len(candidates)} structural candidates")
+                    if manifest is not None:
+                        manifest.store(digest, candidates, layout.to_text_index())
+            parsed.append((pdf_path, layout, candidates))
+        except Exception as e:
+            print(f"  X Error processing file: {e}")
+            trace.event("error", stage="parse", document=os.path.basename(pdf_path), error=repr(e))
+    return parsed
+
+
+def parse_pool(workers):
+    """
+    Process pool for submit_parse(). "spawn" keeps torch (already loaded
+    by the ranker) out of the workers.
+    """
+    ctx = multiprocessing.get_context("spawn")
+    return ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=_init_worker)
+
+
+def submit_parse(pool, pdf_paths, manifest=None, stream=False, workers=1):
+    """
+    Queues every changed document of pdf_paths on pool (a parse_pool())
+    and returns at once. Pass the result to collect_parsed(); work queued
+    for several collections is parsed while earlier ones are collected.
+    With workers > 1, documents of PARALLEL_MIN_PAGES pages or more are
+    queued as page ranges (not in stream mode), so one long PDF does not
+    keep a single worker busy while the others sit idle.
+    """
+    parser = PDFParser()
+    lookups, futures = {}, {}
+    for pdf_path in pdf_paths:
+        try:
+            lookups[pdf_path] = _lookup(manifest, pdf_path)
+            if lookups[pdf_path][2] is not None:
+                continue
+            page_count = parser.page_count(pdf_path) if workers > 1 and not stream else 0
+        except Exception as e:
+            lookups[pdf_path] = e
+            continue
+        if page_count >= PARALLEL_MIN_PAGES:
+            futures[pdf_path] = _RangeJob([pool.submit(_parse_range, pdf_path, start, stop)
+                                           for start, stop in page_ranges(page_count, workers)])
+        else:
+            futures[pdf_path] = pool.submit(_parse_document, pdf_path, stream)
+    return lookups, futures
+
+
+def collect_parsed(pdf_paths, pending, manifest=None):
+    """
+    Waits for the documents queued by submit_parse() and returns
+    (pdf_path, layout, candidates) for those that could be parsed, in
+    input order (see parse_documents()). The manifest is not saved.
+    """
+    lookups, futures = pending
+    parsed = []
+    for pdf_path in pdf_paths:
+        print(f"Scanning: {os.path.basename(pdf_path)}...")
+        try:
+            if isinstance(lookups[pdf_path], Exception):
+                raise lookups[pdf_path]
+            digest, candidates, layout = lookups[pdf_path]
+            if layout is not None:
+                print(f"  -> Unchanged, reusing {len(candidates)} stored candidates")
+                trace.count("documents.reused")
+            else:
+                # Covers the wait for the worker; its own spans stay in the worker
+                with trace.span("document.parse", document=os.path.basename(pdf_path)):
+                    candidates, text_index = futures[pdf_path].result()
+                print(f"  -> Found {len(candidates)} structural candidates")
+                if not isinstance(futures[pdf_path], _RangeJob):
+                    # Page-range jobs are counted by PDFParser.merge_ranges()
+                    trace.count("candidates", len(candidates))
+                if text_index is not None:
+                    if manifest is not None:
+                        manifest.store(digest, candidates, text_index)
+                    layout = DocumentLayout.from_text_index(pdf_path, text_index)
+            parsed.append((pdf_path, layout, candidates))
+        except Exception as e:
+            print(f"  X Error processing file: {e}")
+            trace.event("error", stage="parse", document=os.path.basename(pdf_path), error=repr(e))
+    return parsed
+
+
+def _parse_parallel(pdf_paths, workers, manifest, stream=False):
+    # A. Parse every changed document concurrently
+    with parse_pool(workers) as pool:
+        return collect_parsed(pdf_paths, submit_parse(pool, pdf_paths, manifest, stream, workers), manifest)
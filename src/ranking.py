@@ -1,22 +1,109 @@
 from sentence_transformers import SentenceTransformer, util
+import numpy as np
+import torch
 import os
+import re
+import warnings
+from src import trace
+from src.embedding_cache import EmbeddingCache
+
+
+def _load_torch(model_name, model_kwargs, threads):
+    if threads:
+        torch.set_num_threads(threads)
+    return SentenceTransformer(model_name, **model_kwargs)
+
+
+def _load_int8(model_name, model_kwargs, threads):
+    # Dynamic int8 quantization of every Linear layer (weights int8,
+    # activations quantized on the fly); runs on the stock CPU kernels
+    model = _load_torch(model_name, model_kwargs, threads)
+    with warnings.catch_warnings():
+        # Newer torch releases flag quantized tensors as deprecated
+        warnings.simplefilter("ignore", UserWarning)
+        return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def _version_tuple(version):
+    # "3.2.1" -> (3, 2, 1); pre-release/local suffixes are ignored
+    return tuple(int(part) for part in re.findall(r"\d+", version.split("+")[0])[:3])
+
+
+def _load_onnx(model_name, model_kwargs, threads):
+    # Needs sentence-transformers >= 3.2 (the backend argument) and the
+    # optional onnxruntime/optimum packages
+    # (pip install "sentence-transformers[onnx]"); the ONNX export is
+    # read from the model directory, or created on first load
+    import sentence_transformers
+    if _version_tuple(sentence_transformers.__version__) < (3, 2):
+        raise ImportError(f'The "onnx" backend needs sentence-transformers>=3.2 '
+                          f'(installed: {sentence_transformers.__version__}): '
+                          f'pip install -U "sentence-transformers[onnx]"')
+    try:
+        import onnxruntime
+    except ImportError:
+        raise ImportError('The "onnx" backend needs onnxruntime: pip install "sentence-transformers[onnx]"')
+
+    onnx_kwargs = {"provider": "CPUExecutionProvider"}
+    if threads:
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = threads
+        onnx_kwargs["session_options"] = options
+    return SentenceTransformer(model_name, backend="onnx", model_kwargs=onnx_kwargs, **model_kwargs)
+
+
+# Encoder backends by name: loader(model_name, SentenceTransformer kwargs, threads) -> model with .encode()
+ENCODER_BACKENDS = {
+    "torch": _load_torch,
+    "int8": _load_int8,
+    "onnx": _load_onnx
+}
+
 
 class RankingEngine:
-    def __init__(self, model_name="intfloat/e5-small-v2", model_path=None):
+    def __init__(self, model_name="intfloat/e5-small-v2", model_path=None, batch_size=64,
+                 cache_dir=None, cache_size=200000, backend="torch", threads=None, normalize_duplicates=True):
         """
         Initializes the semantic ranking engine.
         If model_path is provided, it loads from there (Offline mode).
         Otherwise, it downloads from HuggingFace.
+        batch_size is the number of texts per forward pass when encoding.
+        If cache_dir is provided, embeddings are kept on disk across runs
+        (at most cache_size texts) and only unseen texts are encoded.
+        backend selects the encoder (see ENCODER_BACKENDS): "torch" (full
+        precision), "int8" (dynamically quantized) or "onnx" (ONNX Runtime).
+        threads caps the CPU threads used for encoding.
+        Duplicate texts are encoded once; with normalize_duplicates, texts
+        that differ only in whitespace (and in case, if the model's
+        tokenizer lowercases anyway) count as duplicates too.
         """
-        print(f"Initializing NLP Model: {model_name}...")
+        if backend not in ENCODER_BACKENDS:
+            raise ValueError(f"Unknown encoder backend '{backend}' (choose from {', '.join(ENCODER_BACKENDS)})")
+
+        self.model_name = model_name
+        self.backend = backend
+        self.batch_size = batch_size
+        # Backends do not produce bit-identical vectors, so each keeps its own cache
+        cache_key = model_name if backend == "torch" else f"{model_name}@{backend}"
+        self.cache = EmbeddingCache(cache_dir, cache_key, cache_size) if cache_dir else None
+        # Query embeddings are reused across documents/collections
+        self._query_cache = {}
+
+        print(f"Initializing NLP Model: {model_name} ({backend} backend)...")
         
+        model_kwargs = {}
         if model_path and os.path.exists(model_path):
             print(f"Loading from local cache: {model_path}")
-            self.model = SentenceTransformer(model_name, cache_folder=model_path)
+            model_kwargs["cache_folder"] = model_path
         else:
             # Fallback for standard assignment usage
             print("Loading from HuggingFace (may require internet first run)...")
-            self.model = SentenceTransformer(model_name)
+        with trace.span("ranking.load_model", model=model_name, backend=backend):
+            self.model = ENCODER_BACKENDS[backend](model_name, model_kwargs, threads)
+
+        self.normalize_duplicates = normalize_duplicates
+        tokenizer = getattr(self.model, "tokenizer", None)
+        self._lowercase = bool(getattr(tokenizer, "do_lower_case", False))
 
     def rank_candidates(self, candidates, job_query, top_k=5):
         """
@@ -29,18 +116,145 @@ class RankingEngine:
         candidate_texts = [c["text"] for c in candidates]
         
         # Vectorize
-        embeddings = self.model.encode(candidate_texts, convert_to_tensor=True)
-        query_embedding = self.model.encode(job_query, convert_to_tensor=True)
+        embeddings = self.encode(candidate_texts)
+        query_embedding = self.encode_query(job_query)
 
         # Compute Similarity
         cos_scores = util.cos_sim(query_embedding, embeddings)[0]
-        
-        # Get Top K
-        k = min(top_k, len(candidate_texts))
-        top_results = cos_scores.topk(k=k)
+
+        return self._top_matches(candidates, cos_scores, top_k)
+
+    def rank_collection(self, candidates_by_doc, job_query, top_k=5):
+        """
+        Ranks the candidates of several documents at once.
+        All candidate texts go through a single batched encode call and the
+        query is encoded once. candidates_by_doc is a list of candidate lists
+        (one per document); the result holds the top_k matches of each
+        document, in the same order.
+        """
+        if not any(candidates_by_doc):
+            return [[] for _ in candidates_by_doc]
+
+        candidate_texts = [c["text"] for candidates in candidates_by_doc for c in candidates]
+        embeddings = self.encode(candidate_texts)
+        query_embedding = self.encode_query(job_query)
+        return self.rank_embeddings(candidates_by_doc, embeddings, query_embedding, top_k)
+
+    def rank_embeddings(self, candidates_by_doc, embeddings, query_embedding, top_k=5):
+        """
+        Per-document Top K from precomputed embeddings (one row per
+        candidate, documents concatenated in order). Used by callers that
+        batch the encoding themselves (e.g. src/server.py).
+        """
+        results = [[] for _ in candidates_by_doc]
+        if not len(embeddings):
+            return results
+
+        with trace.span("ranking.rank", candidates=len(embeddings)):
+            return self._rank_scores(candidates_by_doc, util.cos_sim(query_embedding, embeddings)[0], top_k)
+
+    def rank_queries(self, candidates_by_doc, job_queries, top_k=5):
+        """
+        rank_collection() for several queries over the same documents.
+        The candidates are encoded once and every query is scored with one
+        (queries x candidates) similarity product. Returns, per query, the
+        top_k matches of each document.
+        """
+        if not job_queries:
+            return []
+        if not any(candidates_by_doc):
+            return [[[] for _ in candidates_by_doc] for _ in job_queries]
+
+        candidate_texts = [c["text"] for candidates in candidates_by_doc for c in candidates]
+        embeddings = self.encode(candidate_texts)
+        query_embeddings = torch.stack([self.encode_query(q) for q in job_queries])
+
+        with trace.span("ranking.rank", candidates=len(embeddings), queries=len(job_queries)):
+            cos_scores = util.cos_sim(query_embeddings, embeddings)
+            return [self._rank_scores(candidates_by_doc, row, top_k) for row in cos_scores]
+
+    def _rank_scores(self, candidates_by_doc, cos_scores, top_k):
+        # Per-document Top K over each document's slice of the score vector
+        results = [[] for _ in candidates_by_doc]
+        offset = 0
+        for n, candidates in enumerate(candidates_by_doc):
+            size = len(candidates)
+            if size:
+                results[n] = self._top_matches(candidates, cos_scores[offset:offset + size], top_k)
+            offset += size
+        return results
+
+    def encode(self, texts):
+        """
+        Embeds a list of texts. With an embedding cache, only texts that were
+        never embedded before go through the model.
+        """
+        with trace.span("ranking.encode", texts=len(texts), batch_size=self.batch_size):
+            # Repeated headings (within a document and across the collection)
+            # are encoded once and their vector fanned back out
+            first = {}
+            index = [first.setdefault(self._duplicate_key(t), len(first)) for t in texts]
+            if len(first) == len(texts):
+                return self._encode(texts)
+
+            unique = [None] * len(first)
+            for text, n in zip(texts, index):
+                if unique[n] is None:
+                    unique[n] = text
+            trace.count("encode.duplicates", len(texts) - len(unique))
+            return self._encode(unique)[torch.tensor(index)]
+
+    def _duplicate_key(self, text):
+        if not self.normalize_duplicates:
+            return text
+        key = " ".join(text.split())
+        return key.lower() if self._lowercase else key
+
+    def _encode(self, texts):
+        if self.cache is None:
+            self._count_encoded(len(texts))
+            return self.model.encode(texts, batch_size=self.batch_size, convert_to_tensor=True)
+
+        vectors = self.cache.get_many(texts)
+        missing = [i for i, v in enumerate(vectors) if v is None]
+        trace.count("cache.hits", len(texts) - len(missing))
+        trace.count("cache.misses", len(missing))
+        if missing:
+            # Each distinct unseen text is encoded once
+            unseen = list(dict.fromkeys(texts[i] for i in missing))
+            self._count_encoded(len(unseen))
+            encoded = self.model.encode(unseen, batch_size=self.batch_size, convert_to_numpy=True)
+            self.cache.put_many(unseen, encoded)
+            by_text = dict(zip(unseen, encoded))
+            for i in missing:
+                vectors[i] = by_text[texts[i]]
+
+        return torch.from_numpy(np.stack(vectors).astype(np.float32))
+
+    def _count_encoded(self, size):
+        # Texts through the model and the forward passes they take
+        trace.count("encode.texts", size)
+        trace.count("encode.batches", -(-size // self.batch_size))
+
+    def encode_query(self, job_query):
+        if job_query not in self._query_cache:
+            if len(self._query_cache) >= 128:
+                self._query_cache.pop(next(iter(self._query_cache)))
+            if self.cache is None:
+                self._query_cache[job_query] = self.model.encode(job_query, convert_to_tensor=True)
+            else:
+                # Keep the query on the same device/dtype as cached embeddings
+                self._query_cache[job_query] = self.encode([job_query])[0]
+        return self._query_cache[job_query]
+
+    def _top_matches(self, candidates, cos_scores, top_k):
+        # Get Top K: highest score first, ties by candidate order (repeated
+        # headings share one embedding, so their scores are exactly equal)
+        k = min(top_k, len(candidates))
+        top_results = torch.sort(cos_scores, descending=True, stable=True)
 
         matches = []
-        for idx, score in zip(top_results.indices, top_results.values):
+        for idx, score in zip(top_results.indices[:k].tolist(), top_results.values[:k]):
             c = candidates[idx]
             matches.append({
                 "text": c["text"],
@@ -49,4 +263,4 @@ class RankingEngine:
                 "y": c["y"]
             })
 
-        return matches
\ No newline at end of file
+        return matches
@@ -0,0 +1,261 @@
+import argparse
+import glob
+import json
+import os
+import queue
+import socket
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from src.output import OutputGenerator
+
+# Parsed document text indexes kept in memory per loaded corpus index
+LAYOUT_CACHE_SIZE = 256
+
+
+class MicroBatcher:
+    """
+    Funnels encode requests from concurrent jobs into shared encode calls.
+    The first request opens a batch; requests arriving within max_wait
+    seconds (up to max_batch texts) are encoded with it in one forward
+    pass, and each caller gets back its own rows.
+    """
+
+    def __init__(self, encode, max_wait=0.01, max_batch=2048):
+        self._encode = encode
+        self.max_wait = max_wait
+        self.max_batch = max_batch
+        self.batches = 0
+        self.texts = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="encode-batcher", daemon=True)
+        self._thread.start()
+
+    def encode(self, texts):
+        future = Future()
+        self._queue.put((list(texts), future))
+        return future.result()
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            size = len(item[0])
+            deadline = time.monotonic() + self.max_wait
+            stop = False
+
+            # Collect whatever else arrives before the deadline
+            while size < self.max_batch:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+                size += len(item[0])
+
+            self._encode_batch(batch)
+            if stop:
+                return
+
+    def _encode_batch(self, batch):
+        texts = [t for item_texts, _ in batch for t in item_texts]
+        try:
+            embeddings = self._encode(texts) if texts else []
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        self.batches += 1
+        self.texts += len(texts)
+        offset = 0
+        for item_texts, future in batch:
+            future.set_result(embeddings[offset:offset + len(item_texts)])
+            offset += len(item_texts)
+
+
+class RankingService:
+    """
+    Keeps one RankingEngine (and loaded corpus indexes) in memory and
+    answers rank jobs with the same JSON that OutputGenerator.save_json writes.
+    """
+
+    def __init__(self, ranker, workers=1, max_wait=0.01):
+        self.ranker = ranker
+        self.workers = workers
+        self.batcher = MicroBatcher(ranker.encode, max_wait=max_wait)
+        self._indexes = {}
+        self._indexes_lock = threading.Lock()
+
+    def handle(self, job):
+        """
+        job keys: persona, job, and either input (folder of PDFs) or index
+        (folder written by src.index build). Optional: job_query,
+        top_k_matches (default 10), top_k (default 20).
+        """
+        for key in ("persona", "job"):
+            if not job.get(key):
+                raise ValueError(f"Missing '{key}'")
+        query = job.get("job_query") or job["job"]
+        top_k_matches = int(job.get("top_k_matches", 10))
+        top_k = int(job.get("top_k", 20))
+
+        skipped = 0
+        if job.get("index"):
+            names, results, skipped = self._rank_index(job["index"], query, top_k_matches, top_k)
+        elif job.get("input"):
+            names, results = self._rank_folder(job["input"], query, top_k_matches)
+        else:
+            raise ValueError("Either 'input' or 'index' is required")
+
+        formatter = OutputGenerator(names, job["persona"], job["job"], top_k=top_k)
+        for name, sections in results:
+            for sec in sections:
+                formatter.add_result(name, sec)
+        formatter.count_skipped(skipped)
+        return formatter.build_output()
+
+    def stats(self):
+        return {"encode_batches": self.batcher.batches, "encoded_texts": self.batcher.texts}
+
+    def _rank_folder(self, folder, query, top_k):
+        # Imported here so the server only loads PyMuPDF once a folder job arrives
+        from src.pipeline import parse_documents
+
+        pdf_files = glob.glob(os.path.join(folder, "*.pdf"))
+        if not pdf_files:
+            raise ValueError(f"No PDF files found in '{folder}'")
+
+        parsed = parse_documents(pdf_files, workers=self.workers)
+        candidates_by_doc = [candidates for _, _, candidates in parsed]
+        texts = [c["text"] for candidates in candidates_by_doc for c in candidates]
+
+        # Candidates and query share one (micro-batched) encode call
+        embeddings = self.batcher.encode(texts + [query])
+        matches_by_doc = self.ranker.rank_embeddings(candidates_by_doc, embeddings[:-1], embeddings[-1], top_k)
+
+        results = [
+            (os.path.basename(pdf_path), layout.extract_sections(matches))
+            for (pdf_path, layout, _), matches in zip(parsed, matches_by_doc)
+        ]
+        return [os.path.basename(p) for p in pdf_files], results
+
+    def _rank_index(self, index_dir, query, top_k, output_top_k):
+        from src.index import CorpusIndex
+
+        with self._indexes_lock:
+            if index_dir not in self._indexes:
+                self._indexes[index_dir] = CorpusIndex(index_dir, layout_cache_size=LAYOUT_CACHE_SIZE)
+            index = self._indexes[index_dir]
+
+        query_embedding = self.batcher.encode([query])[0]
+        results, skipped = index.query_top(query_embedding, top_k, output_top_k)
+        return [d["name"] for d in index.documents], results, skipped
+
+
+class RankingRequestHandler(BaseHTTPRequestHandler):
+    """POST /rank with a JSON job; GET /health for liveness and batch stats."""
+
+    def do_GET(self):
+        if self.path != "/health":
+            self._send(404, {"error": "Not found"})
+            return
+        self._send(200, {"status": "ok", **self.server.service.stats()})
+
+    def do_POST(self):
+        if self.path != "/rank":
+            self._send(404, {"error": "Not found"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            job = json.loads(self.rfile.read(length) or b"{}")
+            output = self.server.service.handle(job)
+        except (ValueError, KeyError) as e:
+            self._send(400, {"error": str(e)})
+            return
+        except Exception as e:
+            self._send(500, {"error": str(e)})
+            return
+        self._send(200, output)
+
+    def address_string(self):
+        # Unix-socket clients have no (host, port) address
+        return self.client_address[0] if self.client_address else "unix"
+
+    def log_message(self, format, *args):
+        print(f"[server] {self.address_string()} {format % args}")
+
+    def _send(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False, indent=2).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class RankingHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, service):
+        self.service = service
+        super().__init__(address, RankingRequestHandler)
+
+
+class UnixRankingHTTPServer(RankingHTTPServer):
+    address_family = socket.AF_UNIX
+
+    def server_bind(self):
+        if os.path.exists(self.server_address):
+            os.remove(self.server_address)
+        self.socket.bind(self.server_address)
+        self.server_name = "localhost"
+        self.server_port = 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DocLayout AI - Ranking server (keeps the model loaded)")
+    parser.add_argument('--host', default="127.0.0.1", help="Address to listen on (default: 127.0.0.1)")
+    parser.add_argument('--port', type=int, default=8765, help="TCP port (default: 8765)")
+    parser.add_argument('--socket', default=None, help="Listen on this Unix socket instead of TCP")
+    parser.add_argument('-w', '--workers', type=int, default=1, help="Parse PDFs in N worker processes")
+    parser.add_argument('--cache-dir', default=None, help="Folder for the persistent embedding cache")
+    parser.add_argument('--batch-wait-ms', type=float, default=10,
+                        help="How long to wait for concurrent jobs to join an encode batch")
+    args = parser.parse_args()
+
+    from src.ranking import RankingEngine
+    service = RankingService(RankingEngine(cache_dir=args.cache_dir), workers=args.workers,
+                             max_wait=args.batch_wait_ms / 1000)
+
+    if args.socket:
+        server = UnixRankingHTTPServer(args.socket, service)
+        print(f"Listening on unix:{args.socket}")
+    else:
+        server = RankingHTTPServer((args.host, args.port), service)
+        print(f"Listening on http://{args.host}:{args.port}")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.batcher.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Opt-in instrumentation: timed spans and counters, exported as JSON lines
+or as a Chrome trace (open in chrome://tracing or https://ui.perfetto.dev).
+
+Tracing is off until enable() is called. While it is off, span() returns
+one shared no-op context manager and count()/event() return at once, so
+instrumented code pays a function call and nothing else.
+
+    from src import trace
+    with trace.span("parse", document=name):
+        ...
+    trace.count("pages", layout.page_count)
+
+Spans recorded inside parse worker processes (--workers N) are not
+collected; the parent's per-document span covers the wait for them.
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+TRACE_FORMATS = ("chrome", "jsonl")
+
+_NULL_SPAN = nullcontext()
+
+# The active Tracer, or None while tracing is disabled
+_tracer = None
+
+
+class Tracer:
+    """Collects finished spans, instant events and counter totals."""
+
+    def __init__(self):
+        self.events = []
+        self.counters = {}
+        self._lock = threading.Lock()
+        self._start = time.perf_counter()
+        self._pid = os.getpid()
+
+    def _now_us(self):
+        return (time.perf_counter() - self._start) * 1e6
+
+    @contextmanager
+    def span(self, name, **args):
+        start = self._now_us()
+        try:
+            yield
+        finally:
+            self._add({"name": name, "ph": "X", "ts": round(start, 1), "dur": round(self._now_us() - start, 1),
+                       "pid": self._pid, "tid": threading.get_ident(), "args": args})
+
+    def count(self, name, value=1):
+        with self._lock:
+            total = self.counters[name] = self.counters.get(name, 0) + value
+        self._add({"name": name, "ph": "C", "ts": round(self._now_us(), 1), "pid": self._pid,
+                   "tid": threading.get_ident(), "args": {name: total}})
+
+    def event(self, name, **args):
+        self._add({"name": name, "ph": "i", "s": "t", "ts": round(self._now_us(), 1), "pid": self._pid,
+                   "tid": threading.get_ident(), "args": args})
+
+    def _add(self, event):
+        with self._lock:
+            self.events.append(event)
+
+    def summary(self):
+        """Total time and number of calls per span name, plus counter totals."""
+        spans = {}
+        for e in self.events:
+            if e["ph"] == "X":
+                entry = spans.setdefault(e["name"], {"calls": 0, "seconds": 0.0})
+                entry["calls"] += 1
+                entry["seconds"] += e["dur"] / 1e6
+        for entry in spans.values():
+            entry["seconds"] = round(entry["seconds"], 4)
+        return {"spans": spans, "counters": dict(self.counters)}
+
+    def save(self, path, trace_format=None):
+        """
+        Writes the trace as "chrome" (Trace Event JSON) or "jsonl" (one
+        event per line, then a summary line). The format defaults to
+        jsonl for *.jsonl paths and chrome otherwise.
+        """
+        trace_format = trace_format or ("jsonl" if path.endswith(".jsonl") else "chrome")
+        if trace_format not in TRACE_FORMATS:
+            raise ValueError(f"Unknown trace format '{trace_format}'")
+
+        with self._lock:
+            events = list(self.events)
+        with open(path, "w", encoding="utf-8") as f:
+            if trace_format == "chrome":
+                json.dump({"traceEvents": events, "displayTimeUnit": "ms",
+                           "otherData": self.summary()}, f, ensure_ascii=False)
+            else:
+                for e in events:
+                    f.write(json.dumps(e, ensure_ascii=False) + "\n")
+                f.write(json.dumps({"summary": self.summary()}, ensure_ascii=False) + "\n")
+
+
+def enable():
+    """Starts a new trace and returns its Tracer."""
+    global _tracer
+    _tracer = Tracer()
+    return _tracer
+
+
+def disable():
+    """Stops tracing and returns the Tracer that was active (or None)."""
+    global _tracer
+    tracer, _tracer = _tracer, None
+    return tracer
+
+
+def active():
+    return _tracer
+
+
+def span(name, **args):
+    """Times the enclosed block as one span (a no-op while tracing is disabled)."""
+    if _tracer is None:
+        return _NULL_SPAN
+    return _tracer.span(name, **args)
+
+
+def count(name, value=1):
+    """Adds value to the counter name."""
+    if _tracer is not None:
+        _tracer.count(name, value)
+
+
+def event(name, **args):
+    """Records an instant event, e.g. an error that was reported and skipped."""
+    if _tracer is not None:
+        _tracer.event(name, **args)
@@ -1,32 +1,56 @@
-import re
+from collections import namedtuple
+from functools import lru_cache
+
+# Everything the heading heuristics need to know about one string
+TextProfile = namedtuple("TextProfile", ["is_binary", "is_upper", "is_title", "word_count"])
+
+def _is_plain_text(text):
+    """True if text holds only printable characters and tab/newline/CR (the common case)."""
+    # str.replace and isprintable run in C; str.translate would be far slower here
+    return text.isprintable() or text.replace("\n", "").replace("\t", "").replace("\r", "").isprintable()
 
 def is_binary_data(text):
     """Check if text contains binary data"""
     if not isinstance(text, str):
         return True
-    
+    if _is_plain_text(text):
+        return False
+
+    # Characters are classified once per distinct character, then counted
+    chars = set(text)
+
     # Check for high percentage of non-printable characters
-    printable_chars = sum(1 for c in text if c.isprintable() or c.isspace())
-    if len(text) > 0 and printable_chars / len(text) < 0.7:
+    unprintable = sum(text.count(c) for c in chars if not (c.isprintable() or c.isspace()))
+    if (len(text) - unprintable) / len(text) < 0.7:
         return True
-    
+
     # Check for null bytes or other binary indicators
-    if '\x00' in text or len([c for c in text if ord(c) < 32 and c not in '\n\r\t']) > len(text) * 0.1:
+    controls = sum(text.count(c) for c in chars if ord(c) < 32 and c not in '\n\r\t')
+    if '\x00' in chars or controls > len(text) * 0.1:
         return True
     return False
 
+@lru_cache(maxsize=65536)
+def text_profile(text):
+    """
+    Binary check, casing and word count of a string, computed once and
+    shared by is_title_case, is_all_upper and the parser's heading rules.
+    """
+    words = text.split()
+    if is_binary_data(text):
+        return TextProfile(True, False, False, len(words))
+
+    is_upper = text.isupper() and any(c.isalpha() for c in text)
+    is_title = len(words) > 0 and all(w[0].isupper() for w in words if w[0].isalpha())
+    return TextProfile(False, is_upper, is_title, len(words))
+
 def is_title_case(text):
     """Check if text is in title case"""
-    if is_binary_data(text):
-        return False
-    words = text.strip().split()
-    return len(words) > 0 and all(w[0].isupper() for w in words if w[0].isalpha())
+    return isinstance(text, str) and text_profile(text).is_title
 
 def is_all_upper(text):
     """Check if text is all uppercase"""
-    if is_binary_data(text):
-        return False
-    return text.isupper() and any(c.isalpha() for c in text)
+    return isinstance(text, str) and text_profile(text).is_upper
 
 def is_bold_font(span):
     """Check if a text span uses bold formatting"""
@@ -40,18 +64,19 @@ def clean_text(text, max_words=150):
         return ""
     if is_binary_data(text):
         return ""
-    
-    cleaned = ''.join(char for char in text if char.isprintable() or char in '\n\r\t ')
-    cleaned = cleaned.replace('\t', ' ')
-    cleaned = re.sub(r'\s+', ' ', cleaned).strip()
-    
-    if is_binary_data(cleaned):
-        return ""
 
-    words = cleaned.split()
+    if not _is_plain_text(text):
+        # Drop non-printable characters (tab, newline and CR are kept)
+        for c in set(text):
+            if not (c.isprintable() or c in '\n\r\t '):
+                text = text.replace(c, "")
+
+    # Collapsing whitespace leaves only printable characters, so the
+    # result can no longer look binary
+    words = text.split()
     if len(words) <= max_words:
-        return cleaned.strip()
-    
+        return " ".join(words)
+
     prefix = words[:max_words]
     suffix = words[max_words:]
 
@@ -62,8 +87,8 @@ def clean_text(text, max_words=150):
         if word.endswith('.'):
             found_period = True
             break
-    
+
     if not found_period:
         return " ".join(prefix + collected).strip() + " ..."
-    
-    return " ".join(prefix + collected).strip()
\ No newline at end of file
+
+    return " ".join(prefix + collected).strip()
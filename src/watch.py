@@ -0,0 +1,189 @@
+"""
+Hot-folder mode: watches an input folder and keeps one result JSON up
+to date while PDFs arrive, change or disappear.
+
+The folder is polled (no extra dependency, works on network shares). A
+PDF is only picked up once its size and mtime have not changed for
+--settle seconds, so files that are still being copied are not parsed
+half-written. Only new or changed PDFs go through parse -> rank ->
+extract, with the model loaded once for the whole session. The ranked
+sections of every document are kept, so after each change the output is
+re-merged from them and written atomically (readers never see a partial
+file).
+
+  python -m src.watch -i inbox -o output/inbox.json -p "Travel Planner" -j "Plan a trip"
+"""
+import argparse
+import glob
+import os
+import time
+from src import trace
+from src.output import OutputGenerator, OUTPUT_FORMATS
+from src.parser import PDFParser, PARSER_VERSION
+from src.pipeline import process_documents
+from src.manifest import DocumentManifest
+# src.ranking (sentence-transformers/torch) is imported only once the session starts
+
+POLL_INTERVAL = 2.0
+SETTLE_SECONDS = 2.0
+
+
+class FolderWatcher:
+    """
+    Polls folder for PDFs. poll() returns the PDFs that are ready (new or
+    changed, and unchanged for settle seconds) and the ones that were
+    removed since they were last returned.
+    """
+
+    def __init__(self, folder, settle=SETTLE_SECONDS):
+        self.folder = folder
+        self.settle = settle
+        # (size, mtime_ns) of every PDF returned as ready
+        self.known = {}
+        # PDFs waiting to settle: path -> ((size, mtime_ns), first seen with it)
+        self._pending = {}
+
+    def _scan(self):
+        files = {}
+        for path in glob.glob(os.path.join(self.folder, "*.pdf")):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                # Removed (or renamed) between listing and stat
+                continue
+            files[path] = (stat.st_size, stat.st_mtime_ns)
+        return files
+
+    def poll(self, now=None):
+        now = time.monotonic() if now is None else now
+        files = self._scan()
+
+        removed = sorted(path for path in self.known if path not in files)
+        for path in removed:
+            del self.known[path]
+        self._pending = {path: entry for path, entry in self._pending.items() if path in files}
+
+        ready = []
+        for path, signature in sorted(files.items()):
+            if self.known.get(path) == signature:
+                self._pending.pop(path, None)
+                continue
+            pending = self._pending.get(path)
+            if pending is None or pending[0] != signature:
+                # New, or still being written: (re)start its settle time
+                self._pending[path] = (signature, now)
+            elif now - pending[1] >= self.settle and signature[0] > 0:
+                ready.append(path)
+                self.known[path] = signature
+                del self._pending[path]
+        return ready, removed
+
+
+class WatchSession:
+    """
+    The result of one watched collection. update() processes the ready
+    PDFs with the warm ranker, drops removed ones and rewrites the output.
+    """
+
+    def __init__(self, output_path, persona, job, ranker, job_query=None, top_k_matches=10, top_k=20,
+                 workers=1, manifest=None, output_format="json", parser=None):
+        self.output_path = output_path
+        self.persona = persona
+        self.job = job
+        self.job_query = job_query or job
+        self.ranker = ranker
+        self.top_k_matches = top_k_matches
+        self.top_k = top_k
+        self.workers = workers
+        self.manifest = manifest
+        self.output_format = output_format
+        self.parser = parser or PDFParser()
+        # Ranked sections of every processed PDF
+        self.sections = {}
+
+    def update(self, ready, removed=()):
+        with trace.span("watch.update", ready=len(ready), removed=len(removed)):
+            for path in removed:
+                print(f"  -> {os.path.basename(path)}: removed")
+                self.sections.pop(path, None)
+
+            if ready:
+                # Documents that fail are reported by the pipeline; an older
+                # version of such a file no longer counts either
+                for path in ready:
+                    self.sections.pop(path, None)
+                results = process_documents(ready, self.ranker, self.job_query, top_k=self.top_k_matches,
+                                            workers=self.workers, parser=self.parser, manifest=self.manifest)
+                self.sections.update(results)
+                if self.manifest is not None:
+                    self.manifest.save()
+
+            self.save()
+
+    def save(self):
+        """Merges the sections of all documents and atomically replaces the output."""
+        paths = sorted(self.sections)
+        formatter = OutputGenerator([os.path.basename(p) for p in paths], self.persona, self.job, top_k=self.top_k)
+        for path in paths:
+            for sec in self.sections[path]:
+                formatter.add_result(os.path.basename(path), sec)
+        formatter.save(self.output_path, self.output_format, atomic=True)
+
+
+def watch(watcher, session, interval=POLL_INTERVAL, polls=None):
+    """
+    Polls until interrupted (or for polls rounds) and updates session on
+    every change. Returns the number of updates.
+    """
+    updates = 0
+    rounds = 0
+    while polls is None or rounds < polls:
+        ready, removed = watcher.poll()
+        if ready or removed:
+            print(f"\n[{time.strftime('%H:%M:%S')}] {len(ready)} new/changed, {len(removed)} removed")
+            session.update(ready, removed)
+            updates += 1
+        rounds += 1
+        if polls is None or rounds < polls:
+            time.sleep(interval)
+    return updates
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DocLayout AI - Watch a folder for new PDFs")
+    parser.add_argument('-i', '--input', required=True, help="Folder to watch")
+    parser.add_argument('-o', '--output', required=True, help="Result JSON, updated after every change")
+    parser.add_argument('-p', '--persona', required=True, help="User Persona (e.g., 'Data Scientist')")
+    parser.add_argument('-j', '--job', required=True, help="Job to be done (Query string)")
+    parser.add_argument('--job-query', default=None, help="Text that is ranked (default: the job)")
+    parser.add_argument('--interval', type=float, default=POLL_INTERVAL, help="Seconds between polls")
+    parser.add_argument('--settle', type=float, default=SETTLE_SECONDS,
+                        help="Seconds a PDF must stay unchanged before it is processed")
+    parser.add_argument('-w', '--workers', type=int, default=1, help="Parse PDFs in N worker processes")
+    parser.add_argument('--backend', default="torch", choices=["torch", "int8", "onnx"], help="Encoder backend")
+    parser.add_argument('--threads', type=int, default=None, help="CPU threads used for encoding")
+    parser.add_argument('--cache-dir', default=None, help="Folder for the persistent embedding cache")
+    parser.add_argument('--state-dir', default=None,
+                        help="Keep parse results here, so a restarted watcher does not parse unchanged PDFs again")
+    parser.add_argument('--output-format', default="json", choices=OUTPUT_FORMATS, help="Format of the result file")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.input):
+        parser.error(f"'{args.input}' is not a folder")
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+
+    from src.ranking import RankingEngine
+    ranker = RankingEngine(cache_dir=args.cache_dir, backend=args.backend, threads=args.threads)
+    manifest = DocumentManifest(args.state_dir, PARSER_VERSION) if args.state_dir else None
+    session = WatchSession(args.output, args.persona, args.job, ranker, job_query=args.job_query,
+                           workers=args.workers, manifest=manifest, output_format=args.output_format)
+
+    print(f"Watching {args.input} (Ctrl+C to stop)...")
+    try:
+        watch(FolderWatcher(args.input, settle=args.settle), session, interval=args.interval)
+    except KeyboardInterrupt:
+        print("\nStopped.")
+
+
+if __name__ == "__main__":
+    main()
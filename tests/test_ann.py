@@ -0,0 +1,48 @@
+import unittest
+import numpy as np
+from src.ann import IVFIndex, exact_search, recall_at_k
+
+def _clustered(n, dim=16, clusters=20, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim))
+    vectors = centers[rng.integers(clusters, size=n)] + 0.3 * rng.normal(size=(n, dim))
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+class TestIVFIndex(unittest.TestCase):
+    def setUp(self):
+        self.vectors = _clustered(3000)
+        self.queries = _clustered(20, seed=1)
+        self.index = IVFIndex.train(self.vectors, n_lists=32)
+
+    def test_probing_every_list_is_exact(self):
+        for query in self.queries:
+            rows, scores = self.index.search(self.vectors, query, 10, nprobe=self.index.n_lists)
+            exact_rows, exact_scores = exact_search(self.vectors, query, 10)
+            self.assertEqual(rows.tolist(), exact_rows.tolist())
+
+    def test_recall_grows_with_nprobe(self):
+        def recall(nprobe):
+            return np.mean([
+                recall_at_k(exact_search(self.vectors, q, 10)[0], self.index.search(self.vectors, q, 10, nprobe)[0])
+                for q in self.queries
+            ])
+        self.assertLessEqual(recall(1), recall(8))
+        self.assertGreater(recall(8), 0.9)
+
+    def test_incremental_add(self):
+        extra = _clustered(500, seed=2)
+        self.index.add(extra)
+        vectors = np.concatenate([self.vectors, extra])
+        self.assertEqual(self.index.size, len(vectors))
+
+        query = extra[7]
+        rows, _ = self.index.search(vectors, query, 1, nprobe=4)
+        self.assertEqual(rows.tolist(), [len(self.vectors) + 7])
+
+    def test_nprobe_below_one_is_rejected(self):
+        for nprobe in (0, -1):
+            with self.assertRaises(ValueError):
+                self.index.search(self.vectors, self.queries[0], 10, nprobe=nprobe)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,37 @@
+import unittest
+from unittest.mock import patch
+from src.bench import STAGES, compare, run_workload
+from src.ranking import RankingEngine
+from tests.test_server import fake_encode
+
+class TestBench(unittest.TestCase):
+    @patch('src.ranking.SentenceTransformer')
+    def test_run_workload_reports_every_stage(self, MockModel):
+        MockModel.return_value.encode.side_effect = fake_encode
+        row = run_workload(["tests/test_data/sample.pdf"], "Persona", "Find the introduction", RankingEngine(),
+                           top_k_matches=3)
+
+        self.assertEqual(row["documents"], 1)
+        self.assertGreater(row["pages"], 0)
+        self.assertGreater(row["candidates"], 0)
+        self.assertEqual(set(row["stages"]), set(STAGES))
+        self.assertAlmostEqual(row["total_seconds"], sum(row["stages"].values()), places=2)
+        self.assertGreater(row["pages_per_sec"], 0)
+
+    def test_compare_flags_slower_workloads(self):
+        def workload(name, total, rss=100.0):
+            return {"name": name, "total_seconds": total, "peak_rss_mb": rss,
+                    "stages": {s: total / len(STAGES) for s in STAGES}}
+
+        baseline = {"workloads": [workload("a", 1.0), workload("b", 1.0)]}
+        results = {"workloads": [workload("a", 1.05), workload("b", 1.5, rss=120.0), workload("new", 1.0)]}
+        rows = {r["name"]: r for r in compare(results, baseline)}
+
+        self.assertEqual(set(rows), {"a", "b"})
+        self.assertFalse(rows["a"]["regression"])
+        self.assertTrue(rows["b"]["regression"])
+        self.assertEqual(rows["b"]["total_ratio"], 1.5)
+        self.assertEqual(rows["b"]["peak_rss_delta_mb"], 20.0)
+
+if __name__ == '__main__':
+    unittest.main()
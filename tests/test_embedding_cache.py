@@ -0,0 +1,88 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+from src.embedding_cache import EmbeddingCache
+
+class TestEmbeddingCache(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def test_roundtrip_and_counters(self):
+        cache = EmbeddingCache(self.cache_dir, "test-model")
+        self.assertEqual(cache.get_many(["Hello World"]), [None])
+
+        cache.put_many(["Hello World"], np.array([[1.0, 2.0, 3.0]]))
+        # Keys use whitespace-normalized text
+        found = cache.get_many(["  Hello   World ", "Other"])
+        np.testing.assert_array_equal(found[0], [1.0, 2.0, 3.0])
+        self.assertIsNone(found[1])
+        self.assertEqual(cache.stats()["hits"], 1)
+        self.assertEqual(cache.stats()["misses"], 2)
+
+    def test_persists_across_instances_per_model(self):
+        EmbeddingCache(self.cache_dir, "model-a").put_many(["x"], np.ones((1, 4)))
+        self.assertIsNotNone(EmbeddingCache(self.cache_dir, "model-a").get_many(["x"])[0])
+        self.assertIsNone(EmbeddingCache(self.cache_dir, "model-b").get_many(["x"])[0])
+
+    def test_lru_eviction(self):
+        cache = EmbeddingCache(self.cache_dir, "test-model", max_entries=2)
+        cache.put_many(["a", "b"], np.array([[1.0], [2.0]]))
+        cache.get_many(["a"])  # "b" is now the least recently used
+        cache.put_many(["c"], np.array([[3.0]]))
+
+        found = EmbeddingCache(self.cache_dir, "test-model", max_entries=2).get_many(["a", "b", "c"])
+        self.assertEqual(found[0][0], 1.0)
+        self.assertIsNone(found[1])
+        self.assertEqual(found[2][0], 3.0)
+        self.assertLessEqual(os.path.getsize(cache.vectors_path), 2 * 4)
+
+    def test_reopen_with_another_size(self):
+        texts = ["a", "b", "c", "d", "e", "f"]
+        vectors = {t: np.array([[float(n)]]) for n, t in enumerate(texts)}
+        EmbeddingCache(self.cache_dir, "test-model", max_entries=4).put_many(
+            texts[:4], np.concatenate([vectors[t] for t in texts[:4]]))
+        EmbeddingCache(self.cache_dir, "test-model", max_entries=2).put_many(["e"], vectors["e"])
+        EmbeddingCache(self.cache_dir, "test-model", max_entries=10).put_many(["f"], vectors["f"])
+
+        cache = EmbeddingCache(self.cache_dir, "test-model", max_entries=10)
+        found = cache.get_many(texts)
+        for text, vector in zip(texts, found):
+            if vector is not None:
+                self.assertEqual(vector[0], vectors[text][0][0], text)
+        self.assertEqual(found[4][0], 4.0)
+        self.assertEqual(found[5][0], 5.0)
+        slots = [entry[0] for entry in cache._index["entries"].values()]
+        self.assertEqual(len(slots), len(set(slots)))
+
+    def test_evicted_rows_are_reused_after_the_index_drops_them(self):
+        cache = EmbeddingCache(self.cache_dir, "test-model", max_entries=2)
+        cache.put_many(["a", "b"], np.array([[1.0], [2.0]]))
+        cache.get_many(["a"])
+
+        # Crash after the evicting write: the index on disk may not point
+        # "b" at the row that now holds "c"
+        written = []
+        original = cache._write_index
+        def write_index():
+            original()
+            with open(cache.index_path, encoding="utf-8") as f:
+                written.append(json.load(f))
+            if len(written) == 1:
+                raise KeyboardInterrupt
+        cache._write_index = write_index
+        with self.assertRaises(KeyboardInterrupt):
+            cache.put_many(["c"], np.array([[3.0]]))
+
+        found = EmbeddingCache(self.cache_dir, "test-model", max_entries=2).get_many(["a", "b", "c"])
+        self.assertEqual(found[0][0], 1.0)
+        self.assertIsNone(found[1])
+        self.assertIsNone(found[2])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,156 @@
+import glob
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+import zlib
+from unittest.mock import patch
+import numpy as np
+from src.index import CorpusIndex, add_to_index, build_index
+from src.output import OutputGenerator
+from src.parser import PDFParser
+
+class FakeRanker:
+    model_name = "fake-model"
+
+    def encode(self, texts):
+        # Deterministic pseudo-embedding per text
+        return np.array([np.random.default_rng(zlib.crc32(t.encode())).random(8) for t in texts], dtype=np.float32)
+
+class TestCorpusIndex(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.pdf_path = "tests/test_data/sample.pdf"
+        cls.index_dir = tempfile.mkdtemp()
+        build_index([cls.pdf_path], cls.index_dir, FakeRanker())
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.index_dir, ignore_errors=True)
+
+    def test_rank_matches_brute_force(self):
+        index = CorpusIndex(self.index_dir)
+        query = np.linspace(1.0, 0.1, 8, dtype=np.float32)
+        matches = index.rank(query, top_k=5)[0]
+
+        candidates = PDFParser().extract_candidates(self.pdf_path)
+        vectors = FakeRanker().encode([c["text"] for c in candidates])
+        scores = vectors @ query / np.linalg.norm(vectors, axis=1) / np.linalg.norm(query)
+        expected = sorted(range(len(candidates)), key=lambda i: (-scores[i], i))[:5]
+        self.assertEqual([m["text"] for m in matches], [candidates[i]["text"] for i in expected])
+
+    def test_query_sections_match_parser(self):
+        index = CorpusIndex(self.index_dir)
+        results = index.query(np.ones(8), top_k=3)
+        matches = index.rank(np.ones(8), top_k=3)[0]
+        self.assertEqual(results, [("sample.pdf", PDFParser().extract_sections(self.pdf_path, matches))])
+
+    def test_query_does_not_import_pymupdf(self):
+        code = (
+            "import sys, numpy as np\n"
+            "from src.index import CorpusIndex\n"
+            f"CorpusIndex({self.index_dir!r}).query(np.ones(8), top_k=3)\n"
+            "assert 'fitz' not in sys.modules and 'pymupdf' not in sys.modules\n"
+        )
+        subprocess.run([sys.executable, "-c", code], check=True, cwd=os.getcwd())
+
+class TestQueryTop(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.index_dir = tempfile.mkdtemp()
+        pdfs = sorted(glob.glob("data/Collection 1/PDFs/*.pdf")) + ["tests/test_data/sample.pdf"] * 2
+        build_index(pdfs, cls.index_dir, FakeRanker())
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.index_dir, ignore_errors=True)
+
+    def _output(self, results, skipped=0, top_k=20):
+        formatter = OutputGenerator([], "P", "J", top_k=top_k)
+        for name, sections in results:
+            for sec in sections:
+                formatter.add_result(name, sec)
+        formatter.count_skipped(skipped)
+        output = formatter.build_output()
+        del output["metadata"]["processing_timestamp"]
+        return output
+
+    def test_only_documents_reaching_the_output_are_cut(self):
+        index = CorpusIndex(self.index_dir)
+        rng = np.random.default_rng(3)
+        for query in [np.ones(8)] + list(rng.random((4, 8))):
+            full = index.query(query, top_k=5)
+            for top_k in (0, 1, 3, 20, 1000):
+                results, skipped = index.query_top(query, top_k=5, output_top_k=top_k)
+                self.assertEqual(self._output(results, skipped, top_k), self._output(full, top_k=top_k))
+                if top_k == 1:
+                    self.assertLess(len(results), len(full))
+
+    def test_layout_cache(self):
+        index = CorpusIndex(self.index_dir, layout_cache_size=2)
+        first = index.layout(0)
+        self.assertIs(index.layout(0), first)
+        index.layout(1)
+        index.layout(2)
+        self.assertIsNot(index.layout(0), first)
+        uncached = CorpusIndex(self.index_dir)
+        self.assertIsNot(uncached.layout(0), uncached.layout(0))
+
+class TestAnnIndex(unittest.TestCase):
+    def setUp(self):
+        self.index_dir = tempfile.mkdtemp()
+        self.pdf_copy = os.path.join(self.index_dir, "copy.pdf")
+        shutil.copy("tests/test_data/sample.pdf", self.pdf_copy)
+
+    def tearDown(self):
+        shutil.rmtree(self.index_dir, ignore_errors=True)
+
+    def test_ann_rank_with_all_lists_matches_exact(self):
+        build_index(["tests/test_data/sample.pdf"], self.index_dir, FakeRanker(), ann_lists=4, nprobe=1)
+        index = CorpusIndex(self.index_dir)
+        query = np.linspace(1.0, 0.1, 8, dtype=np.float32)
+        self.assertEqual(index.rank(query, top_k=5, nprobe=3), index._rank_rows(
+            np.arange(len(index.embeddings)), query / np.linalg.norm(query), 5))
+        self.assertEqual(index._rank_rows(np.arange(len(index.embeddings)), query / np.linalg.norm(query), 5),
+                         index.rank(query, top_k=5, nprobe=0))
+        self.assertLessEqual(len(index.rank(query, top_k=5)[0]), 5)
+
+    def test_add_documents(self):
+        build_index(["tests/test_data/sample.pdf"], self.index_dir, FakeRanker(), ann_lists=4)
+        before = CorpusIndex(self.index_dir)
+        add_to_index([self.pdf_copy, "tests/test_data/sample.pdf"], self.index_dir, FakeRanker())
+
+        index = CorpusIndex(self.index_dir)
+        self.assertEqual([d["name"] for d in index.documents], ["sample.pdf", "copy.pdf"])
+        self.assertEqual(len(index.embeddings), 2 * len(before.embeddings))
+        self.assertEqual(index.ann.size, len(index.embeddings))
+
+        # Same PDF twice: both documents get the same matches
+        ranked = index.rank(np.ones(8), top_k=3, nprobe=0)
+        self.assertEqual(ranked[0], ranked[1])
+        self.assertEqual(index.query(np.ones(8), top_k=3, nprobe=0)[1][0], "copy.pdf")
+
+    def test_add_after_interrupted_add(self):
+        build_index(["tests/test_data/sample.pdf"], self.index_dir, FakeRanker(), ann_lists=4)
+        rows = len(CorpusIndex(self.index_dir).embeddings)
+
+        # Embeddings and ann.npz are written, index.json is not
+        with patch("src.index._write_meta", side_effect=KeyboardInterrupt):
+            with self.assertRaises(KeyboardInterrupt):
+                add_to_index([self.pdf_copy], self.index_dir, FakeRanker())
+        self.assertEqual([d["name"] for d in CorpusIndex(self.index_dir).documents], ["sample.pdf"])
+
+        add_to_index([self.pdf_copy], self.index_dir, FakeRanker())
+        index = CorpusIndex(self.index_dir)
+        self.assertEqual([d["name"] for d in index.documents], ["sample.pdf", "copy.pdf"])
+        self.assertEqual(len(index.embeddings), 2 * rows)
+        self.assertEqual(index.ann.size, 2 * rows)
+        ranked = index.rank(np.ones(8), top_k=3, nprobe=0)
+        self.assertEqual(ranked[0], ranked[1])
+        self.assertEqual(index.rank(np.ones(8), top_k=3, nprobe=4), ranked)
+        self.assertFalse([name for name in os.listdir(self.index_dir) if ".tmp" in name])
+
+if __name__ == '__main__':
+    unittest.main()
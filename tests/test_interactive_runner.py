@@ -0,0 +1,51 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from src.interactive_runner import process_collection, run_all
+from tests.test_pipeline import FakeRanker
+
+class CachelessRanker(FakeRanker):
+    cache = None
+
+class TestRunAll(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        second = os.path.join(self.tmp, "second")
+        os.makedirs(second)
+        shutil.copy("tests/test_data/sample.pdf", second)
+        self.config = {
+            "output_settings": {"output_folder": os.path.join(self.tmp, "out"), "top_k_matches": 3, "top_k_output": 5},
+            "processing": {"workers": 2},
+            "collections": {
+                "First": {"input_folder": "tests/test_data", "persona": "P", "job_to_be_done": "J"},
+                "Second": {"input_folder": second, "persona": "P2", "job_to_be_done": "J2", "job_query": "q"},
+                "Missing": {"input_folder": os.path.join(self.tmp, "missing"), "persona": "P", "job_to_be_done": "J"}
+            }
+        }
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def _read(self, name):
+        with open(os.path.join(self.tmp, "out", f"{name}_results.json"), encoding="utf-8") as f:
+            output = json.load(f)
+        del output["metadata"]["processing_timestamp"]
+        return output
+
+    def test_batch_matches_one_collection_at_a_time(self):
+        summary = run_all(self.config, ranker=CachelessRanker())
+        batch = {name: self._read(name) for name in ("First", "Second")}
+
+        self.assertEqual([row["collection"] for row in summary], ["First", "Second"])
+        self.assertEqual(summary[1]["documents"], 1)
+        self.assertGreater(summary[0]["pages"], 0)
+        self.assertGreater(summary[0]["candidates"], 0)
+
+        for name in ("First", "Second"):
+            process_collection(name, self.config, ranker=CachelessRanker())
+            self.assertEqual(self._read(name), batch[name])
+
+if __name__ == '__main__':
+    unittest.main()
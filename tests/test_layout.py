@@ -0,0 +1,55 @@
+import unittest
+from src.layout import DocumentLayout, SectionCache, iter_sections
+
+def _line(y, text):
+    return [[50, y, 300, y + 10], text]
+
+class TestSectionExtraction(unittest.TestCase):
+    def setUp(self):
+        # Lines are in block order, not sorted by y
+        self.layout = DocumentLayout.from_text_index("doc.pdf", [
+            {"width": 600, "lines": [_line(10, "Intro "), _line(30, "A "), _line(20, "intro text ")]},
+            {"width": 600, "lines": [_line(10, "a text ")]},
+            {"width": 600, "lines": [_line(10, "more a "), _line(40, "B "), _line(50, "b text ")]}
+        ])
+
+    def _match(self, text, page_num, y):
+        return {"text": text, "page_num": page_num, "y": y, "score": 0.5}
+
+    def test_lines_are_assigned_to_their_heading_interval(self):
+        sections = self.layout.extract_sections([
+            self._match("B", 2, 40), self._match("Intro", 0, 10), self._match("A", 0, 30)
+        ])
+        self.assertEqual([(s["heading"], s["content"], s["page_number"]) for s in sections], [
+            ("Intro", "Intro intro text", 1),
+            ("A", "A a text more a", 1),
+            ("B", "B b text", 3)
+        ])
+
+    def test_duplicate_boundaries_leave_the_first_section_empty(self):
+        sections = self.layout.extract_sections([self._match("A", 0, 30), self._match("A", 0, 30)])
+        self.assertEqual([s["content"] for s in sections], ["", "A a text more a B b text"])
+
+    def test_sections_are_yielded_as_pages_are_consumed(self):
+        seen = []
+        def pages():
+            for page in self.layout.pages:
+                seen.append(page.number)
+                yield page
+
+        sections = iter_sections(pages(), self.layout.page_count, [self._match("Intro", 0, 10), self._match("A", 0, 30)])
+        self.assertEqual(next(sections)["heading"], "Intro")
+        self.assertEqual(seen, [0])
+
+    def test_section_cache_matches_extract_sections(self):
+        intro, a, b = self._match("Intro", 0, 10), self._match("A", 0, 30), self._match("B", 2, 40)
+        cache = SectionCache(self.layout)
+        for selection in ([intro, a, b], [b, intro], [a, b], [dict(a, score=0.9), b], [a, a], [b], []):
+            self.assertEqual(cache.extract_sections(selection), self.layout.extract_sections(selection))
+
+        # Each distinct (heading, next heading) interval is cut once
+        self.assertEqual(cache.misses, 6)
+        self.assertEqual(cache.hits, 6)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,33 @@
+import unittest
+from src.lexical import BM25Index, recall_at_k, shortlist, tokenize
+
+class TestLexical(unittest.TestCase):
+    def setUp(self):
+        self.texts = [
+            "Vegetarian Lasagna with spinach and ricotta",
+            "Company history",
+            "Gluten-free vegetarian buffet ideas",
+            "Travel insurance",
+        ]
+
+    def test_tokenize(self):
+        self.assertEqual(tokenize("Gluten-free, BUFFET!"), ["gluten", "free", "buffet"])
+
+    def test_bm25_prefers_matching_texts(self):
+        scores = BM25Index(self.texts).scores("vegetarian buffet")
+        self.assertEqual(int(scores.argmax()), 2)
+        self.assertEqual(scores[1], 0)
+        self.assertGreater(scores[0], 0)
+
+    def test_shortlist_keeps_original_order(self):
+        self.assertEqual(shortlist(self.texts, "vegetarian buffet", 2), [0, 2])
+        self.assertEqual(shortlist(self.texts, "anything", 10), [0, 1, 2, 3])
+
+    def test_recall_at_k(self):
+        a = {"text": "A", "page_num": 0, "y": 1.0}
+        b = {"text": "B", "page_num": 0, "y": 2.0}
+        self.assertEqual(recall_at_k([[a, b], []], [[b], []]), 0.5)
+        self.assertEqual(recall_at_k([[]], [[]]), 1.0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from src.main import load_queries
+
+class TestLoadQueries(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, "queries.jsonl")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def _load(self, *queries):
+        with open(self.path, "w", encoding="utf-8") as f:
+            for query in queries:
+                f.write(json.dumps(query) + "\n")
+        return load_queries(self.path)
+
+    def test_ids_default_to_query_number(self):
+        queries = self._load({"persona": "P", "job": "J"}, {"persona": "P2", "job_to_be_done": "J2", "id": "hr"})
+        self.assertEqual([q["id"] for q in queries], ["query_1", "hr"])
+        self.assertEqual(queries[1]["job_query"], "J2")
+
+    def test_ids_must_be_plain_file_names(self):
+        for query_id in ("../escape", "a/b", "a\\b", "..", ".", "", " "):
+            with self.assertRaisesRegex(ValueError, "invalid id"):
+                self._load({"persona": "P", "job": "J", "id": query_id})
+
+    def test_duplicate_ids_are_rejected(self):
+        with self.assertRaisesRegex(ValueError, "duplicate id 'hr'"):
+            self._load({"persona": "P", "job": "J", "id": "hr"}, {"persona": "P", "job": "J2", "id": "hr"})
+        with self.assertRaisesRegex(ValueError, "duplicate id 'query_1'"):
+            self._load({"persona": "P", "job": "J"}, {"persona": "P", "job": "J2", "id": "query_1"})
+
+if __name__ == '__main__':
+    unittest.main()
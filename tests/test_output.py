@@ -0,0 +1,108 @@
+import importlib
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+from src import output
+from src.output import OutputGenerator
+
+def _sections(n, seed):
+    rng = random.Random(seed)
+    return [
+        (f"doc{rng.randrange(3)}.pdf", {"heading": f"H{i}", "score": rng.choice([0.1, 0.5, 0.5, 0.9, rng.random()]),
+                                       "content": f"text {i}", "page_number": i})
+        for i in range(n)
+    ]
+
+class TestOutputGenerator(unittest.TestCase):
+    def _generator(self, sections, top_k=5):
+        generator = OutputGenerator(["a.pdf"], "Persona", "Job", top_k=top_k)
+        for name, section in sections:
+            generator.add_result(name, section)
+        return generator
+
+    def test_keeps_top_k_like_a_stable_sort(self):
+        sections = _sections(200, seed=1)
+        output = self._generator(sections).build_output()
+
+        expected = sorted(sections, key=lambda s: s[1]["score"], reverse=True)[:5]
+        self.assertEqual([s["section_title"] for s in output["extracted_sections"]], [s["heading"] for _, s in expected])
+        self.assertEqual([s["importance_rank"] for s in output["extracted_sections"]], [1, 2, 3, 4, 5])
+        self.assertEqual(output["metadata"]["total_sections_found"], 200)
+        self.assertEqual(output["metadata"]["top_k_selected"], 5)
+
+    def test_merge_matches_serial_order(self):
+        sections = _sections(90, seed=2)
+        serial = self._generator(sections)
+        merged = self._generator(sections[:30])
+        merged.merge(self._generator(sections[30:60]))
+        merged.merge(self._generator(sections[60:]))
+
+        self.assertEqual(merged.total_sections, 90)
+        self.assertEqual(merged.top_sections(), serial.top_sections())
+
+    def test_fewer_sections_than_top_k(self):
+        output = self._generator(_sections(3, seed=3), top_k=20).build_output()
+        self.assertEqual(output["metadata"]["top_k_selected"], 3)
+
+    def test_streamed_json_is_byte_identical(self):
+        generator = self._generator(_sections(40, seed=4), top_k=10)
+        out_dir = tempfile.mkdtemp()
+        try:
+            plain, streamed = os.path.join(out_dir, "a.json"), os.path.join(out_dir, "b.json")
+            generator.save(plain)
+            generator.save(streamed, "json-stream")
+            with open(plain, "rb") as a, open(streamed, "rb") as b:
+                self.assertEqual(a.read(), b.read())
+
+            lines_path = os.path.join(out_dir, "c.jsonl")
+            generator.save(lines_path, "jsonl")
+            with open(lines_path, encoding="utf-8") as f:
+                lines = [json.loads(line) for line in f]
+            output = generator.build_output()
+            self.assertEqual(lines[0], {"metadata": output["metadata"]})
+            self.assertEqual([line["refined_text"] for line in lines[1:]],
+                             [s["refined_text"] for s in output["subsection_analysis"]])
+        finally:
+            shutil.rmtree(out_dir, ignore_errors=True)
+
+    def test_atomic_save_replaces_the_file(self):
+        generator = self._generator(_sections(40, seed=5), top_k=10)
+        out_dir = tempfile.mkdtemp()
+        try:
+            plain, atomic = os.path.join(out_dir, "a.json"), os.path.join(out_dir, "b.json")
+            generator.save(plain)
+            with open(atomic, "w") as f:
+                f.write("old")
+            generator.save(atomic, atomic=True)
+            with open(plain, "rb") as a, open(atomic, "rb") as b:
+                self.assertEqual(a.read(), b.read())
+            self.assertEqual(sorted(os.listdir(out_dir)), ["a.json", "b.json"])
+        finally:
+            shutil.rmtree(out_dir, ignore_errors=True)
+
+    def test_jsonl_bytes_do_not_depend_on_orjson(self):
+        generator = self._generator(_sections(40, seed=6), top_k=10)
+        generator.metadata["persona"] = "Caf\u00e9 owner \u2013 \u201cquotes\u201d \U0001F680"
+        out_dir = tempfile.mkdtemp()
+        try:
+            with_orjson, without_orjson = os.path.join(out_dir, "a.jsonl"), os.path.join(out_dir, "b.jsonl")
+            generator.save(with_orjson, "jsonl")
+            # Re-run the module body without orjson: _dumps_line falls back to json
+            try:
+                with patch.dict(sys.modules, {"orjson": None}):
+                    importlib.reload(output)
+                generator.save(without_orjson, "jsonl")
+            finally:
+                importlib.reload(output)
+            with open(with_orjson, "rb") as a, open(without_orjson, "rb") as b:
+                self.assertEqual(a.read(), b.read())
+        finally:
+            shutil.rmtree(out_dir, ignore_errors=True)
+
+if __name__ == '__main__':
+    unittest.main()
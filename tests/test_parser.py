@@ -1,5 +1,9 @@
+import os
+import tempfile
 import unittest
-from src.parser import PDFParser
+from unittest.mock import patch
+import fitz
+from src.parser import PDFParser, page_ranges
 
 class TestParserLogic(unittest.TestCase):
     def setUp(self):
@@ -42,5 +46,86 @@ class TestParserLogic(unittest.TestCase):
         )
         self.assertEqual(reasons, [])
 
+    def test_layout_decoded_once_per_document(self):
+        # extract_sections() should reuse the pages decoded by extract_candidates()
+        pdf_path = "tests/test_data/sample.pdf"
+        with patch("src.parser.fitz.open", wraps=fitz.open) as mock_open:
+            candidates = self.parser.extract_candidates(pdf_path)
+            sections = self.parser.extract_sections(pdf_path, candidates[:3])
+        self.assertEqual(mock_open.call_count, 1)
+        self.assertEqual(len(sections), min(3, len(candidates)))
+
+    def test_vectorized_rules_match_scalar_heuristics(self):
+        layout = self.parser.load_layout("tests/test_data/sample.pdf")
+        lines = self.parser._merge_spans_to_lines(self.parser._collect_spans(layout))
+        median_size, threshold_width = self.parser._calculate_doc_stats(lines)
+        rules = self.parser._evaluate_heading_rules(lines, median_size, threshold_width)
+
+        for i, sentence in enumerate(lines["text"]):
+            span = {key: lines[key][i] for key in ("flags", "x0", "x1", "page_width")}
+            span["font"] = lines["fonts"][lines["font"][i]]
+            expected = self.parser._evaluate_heading_heuristics(
+                sentence, lines["size"][i], span, median_size, threshold_width
+            )
+            self.assertEqual([reason for reason, hits in rules.items() if hits[i]], expected)
+
+    def test_streaming_matches_whole_document(self):
+        pdf_path = "tests/test_data/sample.pdf"
+        candidates = self.parser.extract_candidates(pdf_path)
+        stream = self.parser.iter_candidates(pdf_path)
+        self.assertFalse(isinstance(stream, list))
+        self.assertEqual(list(stream), candidates)
+
+        matches = candidates[::2]
+        self.assertEqual(list(self.parser.iter_sections(pdf_path, matches)),
+                         self.parser.extract_sections(pdf_path, matches))
+
+    def test_page_ranges_cover_every_page(self):
+        for page_count, workers in ((13, 2), (2000, 4), (100, 8), (0, 2)):
+            ranges = page_ranges(page_count, workers)
+            self.assertEqual([p for start, stop in ranges for p in range(start, stop)], list(range(page_count)))
+        self.assertEqual(len(page_ranges(2000, 4)), 16)
+        self.assertEqual(len(page_ranges(100, 8)), 3)
+
+    @patch('src.parser.PARALLEL_RANGE_PAGES', 2)
+    def test_page_range_parallel_matches_serial(self):
+        pdf_path = "tests/test_data/sample.pdf"
+        layout = self.parser.load_layout(pdf_path)
+        serial = (self.parser.extract_candidates(layout), layout.to_text_index())
+
+        # Ranges cut at every page boundary give the same candidates and text
+        ranges = [self.parser.parse_range(pdf_path, n, n + 1) for n in range(layout.page_count)]
+        self.assertEqual(self.parser.merge_ranges(ranges), serial)
+        self.assertEqual(self.parser.extract_candidates_parallel(pdf_path, workers=2), serial)
+
+    def test_running_headers_and_footers_are_dropped(self):
+        tmp = tempfile.mkdtemp()
+        pdf_path = os.path.join(tmp, "report.pdf")
+        with fitz.open() as doc:
+            for n in range(1, 5):
+                page = doc.new_page()
+                page.insert_text((72, 30), "ACME Annual Report", fontname="hebo", fontsize=11)
+                page.insert_text((72, 400), f"Section {n} Results", fontname="hebo", fontsize=16)
+                page.insert_text((72, 430), "Plain body text that is not a heading at all.", fontsize=10)
+                page.insert_text((280, 820), f"Page {n}", fontname="hebo", fontsize=11)
+            doc.save(pdf_path)
+
+        try:
+            texts = [c["text"] for c in self.parser.extract_candidates(pdf_path)]
+            self.assertEqual(texts, [f"Section {n} Results" for n in range(1, 5)])
+            self.assertEqual([c["text"] for c in self.parser.iter_candidates(pdf_path)], texts)
+            ranges = [self.parser.parse_range(pdf_path, n, n + 1) for n in range(4)]
+            self.assertEqual([c["text"] for c in self.parser.merge_ranges(ranges)[0]], texts)
+
+            # Without the furniture filter, the heading rules would keep them
+            lines = self.parser._merge_spans_to_lines(self.parser._collect_spans(self.parser.load_layout(pdf_path)))
+            median_size, threshold_width = self.parser._calculate_doc_stats(lines)
+            kept = [c["text"] for c in self.parser._build_candidates(lines, median_size, threshold_width)]
+            self.assertIn("ACME Annual Report", kept)
+            self.assertIn("Page 3", kept)
+        finally:
+            os.remove(pdf_path)
+            os.rmdir(tmp)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,96 @@
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+from src import trace
+from src.manifest import DocumentManifest
+from src.parser import PARSER_VERSION
+from src.pipeline import process_documents, process_queries
+from src.ranking import RankingEngine
+from tests.test_server import fake_encode
+
+class FakeRanker:
+    """Deterministic stand-in for RankingEngine (no model download)."""
+    def rank_candidates(self, candidates, job_query, top_k=5):
+        scored = sorted(candidates, key=lambda c: (-len(c["text"]), c["page_num"], c["y"]))
+        return [
+            {"text": c["text"], "score": round(1.0 / len(c["text"]), 3), "page_num": c["page_num"], "y": c["y"]}
+            for c in scored[:top_k]
+        ]
+
+    def rank_collection(self, candidates_by_doc, job_query, top_k=5):
+        return [self.rank_candidates(c, job_query, top_k) for c in candidates_by_doc]
+
+class TestPipeline(unittest.TestCase):
+    def setUp(self):
+        self.pdfs = ["tests/test_data/sample.pdf", "tests/test_data/missing.pdf", "tests/test_data/sample.pdf"]
+
+    def test_parallel_matches_serial(self):
+        serial = process_documents(self.pdfs, FakeRanker(), "query", top_k=3, workers=1)
+        parallel = process_documents(self.pdfs, FakeRanker(), "query", top_k=3, workers=2)
+        self.assertEqual(serial, parallel)
+
+    @patch('src.parser.PARALLEL_RANGE_PAGES', 4)
+    @patch('src.pipeline.PARALLEL_MIN_PAGES', 8)
+    def test_page_range_split_matches_serial(self):
+        # sample.pdf (13 pages) is split into page ranges across the workers
+        trace.enable()
+        try:
+            serial = process_documents(self.pdfs, FakeRanker(), "query", top_k=3, workers=1)
+            serial_candidates = trace.active().counters["candidates"]
+            trace.enable()
+            split = process_documents(self.pdfs, FakeRanker(), "query", top_k=3, workers=2)
+            split_candidates = trace.active().counters["candidates"]
+        finally:
+            trace.disable()
+        self.assertEqual(serial, split)
+        # Candidates of split documents are counted once
+        self.assertEqual(split_candidates, serial_candidates)
+
+    @patch('src.ranking.SentenceTransformer')
+    def test_multi_query_matches_one_run_per_query(self, MockModel):
+        MockModel.return_value.encode.side_effect = fake_encode
+        ranker = RankingEngine()
+        queries = ["introduction", "results", "methods and data"]
+
+        batch = process_queries(self.pdfs, ranker, queries, top_k=4)
+        self.assertEqual(batch, [process_documents(self.pdfs, ranker, q, top_k=4) for q in queries])
+
+    def test_stream_mode_matches_default(self):
+        default = process_documents(self.pdfs, FakeRanker(), "query", top_k=3)
+        self.assertEqual(process_documents(self.pdfs, FakeRanker(), "query", top_k=3, stream=True), default)
+        self.assertEqual(process_documents(self.pdfs, FakeRanker(), "query", top_k=3, workers=2, stream=True), default)
+
+    def test_prefilter_limits_ranked_candidates(self):
+        ranker = FakeRanker()
+        seen = []
+        def rank_collection(candidates_by_doc, job_query, top_k=5):
+            seen.append(sum(map(len, candidates_by_doc)))
+            return FakeRanker.rank_collection(ranker, candidates_by_doc, job_query, top_k)
+        ranker.rank_collection = rank_collection
+
+        default = process_documents(self.pdfs, ranker, "summary conclusion", top_k=3)
+        self.assertEqual(process_documents(self.pdfs, ranker, "summary conclusion", top_k=3, prefilter=10000), default)
+        process_documents(self.pdfs, ranker, "summary conclusion", top_k=3, prefilter=4)
+        self.assertEqual(seen[2], 4)
+        self.assertGreater(seen[0], 4)
+
+    def test_failed_documents_are_skipped(self):
+        results = process_documents(self.pdfs, FakeRanker(), "query", top_k=3)
+        self.assertEqual([p for p, _ in results], [self.pdfs[0], self.pdfs[2]])
+
+    def test_incremental_run_skips_unchanged_documents(self):
+        state_dir = tempfile.mkdtemp()
+        try:
+            first = process_documents(self.pdfs, FakeRanker(), "query", top_k=3,
+                                      manifest=DocumentManifest(state_dir, PARSER_VERSION))
+            with patch("src.parser.fitz.open", side_effect=AssertionError("re-parsed")):
+                second = process_documents(self.pdfs, FakeRanker(), "query", top_k=3,
+                                           manifest=DocumentManifest(state_dir, PARSER_VERSION))
+            self.assertEqual(first, second)
+            self.assertEqual(first, process_documents(self.pdfs, FakeRanker(), "query", top_k=3))
+        finally:
+            shutil.rmtree(state_dir, ignore_errors=True)
+
+if __name__ == '__main__':
+    unittest.main()
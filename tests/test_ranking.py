@@ -1,5 +1,9 @@
+import shutil
+import tempfile
 import unittest
-from unittest.mock import MagicMock, patch
+from unittest.mock import patch
+import numpy as np
+import torch
 from src.ranking import RankingEngine
 
 class TestRanking(unittest.TestCase):
@@ -18,9 +22,7 @@ class TestRanking(unittest.TestCase):
         
         # 3. Mock the Math (The tricky part)
         # We force the math function to say: Index 1 is best (0.9), Index 0 is worst (0.1)
-        mock_scores = MagicMock()
-        mock_scores.topk.return_value.indices = [1, 0] # Order: Index 1, then Index 0
-        mock_scores.topk.return_value.values = [0.9, 0.1]
+        mock_scores = torch.tensor([0.1, 0.9])
         
         # Tell the system: "When cos_sim is called, return our fake scores"
         # We use [0] because the real code does [0] to get the first batch
@@ -44,5 +46,143 @@ class TestRanking(unittest.TestCase):
             result = engine.rank_candidates([], "query")
             self.assertEqual(result, [])
 
+    @patch('src.ranking.SentenceTransformer')
+    def test_rank_collection_batches_documents(self, MockModel):
+        vectors = {
+            "query": [1.0, 0.0],
+            "A1": [0.0, 1.0], "A2": [0.9, 0.1],
+            "B1": [0.8, 0.2], "B2": [0.1, 0.9], "B3": [1.0, 0.0],
+        }
+        def fake_encode(texts, **kwargs):
+            if isinstance(texts, str):
+                return torch.tensor(vectors[texts])
+            return torch.tensor([vectors[t] for t in texts])
+        MockModel.return_value.encode.side_effect = fake_encode
+
+        engine = RankingEngine()
+        docs = [
+            [{"text": "A1", "page_num": 0, "y": 1}, {"text": "A2", "page_num": 0, "y": 2}],
+            [],
+            [{"text": t, "page_num": 1, "y": 5} for t in ("B1", "B2", "B3")],
+        ]
+        results = engine.rank_collection(docs, "query", top_k=2)
+
+        # Top K is kept per document
+        self.assertEqual([m["text"] for m in results[0]], ["A2", "A1"])
+        self.assertEqual(results[1], [])
+        self.assertEqual([m["text"] for m in results[2]], ["B3", "B1"])
+
+        # One encode for all candidates, one for the (cached) query
+        engine.rank_collection(docs, "query", top_k=2)
+        self.assertEqual(MockModel.return_value.encode.call_count, 3)
+
+    @patch('src.ranking.SentenceTransformer')
+    def test_rank_queries_matches_rank_collection(self, MockModel):
+        rng = np.random.default_rng(0)
+        vectors = {t: rng.random(8).astype(np.float32) for t in ["q1", "q2", "q3", "A1", "A2", "B1", "B2", "B3"]}
+        def fake_encode(texts, **kwargs):
+            if isinstance(texts, str):
+                return torch.tensor(vectors[texts])
+            return torch.tensor(np.array([vectors[t] for t in texts]))
+        MockModel.return_value.encode.side_effect = fake_encode
+
+        engine = RankingEngine()
+        docs = [
+            [{"text": "A1", "page_num": 0, "y": 1}, {"text": "A2", "page_num": 0, "y": 2}],
+            [],
+            [{"text": t, "page_num": 1, "y": 5} for t in ("B1", "B2", "B3")],
+        ]
+        results = engine.rank_queries(docs, ["q1", "q2", "q3"], top_k=2)
+        self.assertEqual(results, [engine.rank_collection(docs, q, top_k=2) for q in ("q1", "q2", "q3")])
+        self.assertEqual(engine.rank_queries(docs, []), [])
+
+    @patch('src.ranking.SentenceTransformer')
+    def test_embedding_cache_skips_seen_texts(self, MockModel):
+        MockModel.return_value.encode.side_effect = lambda texts, **kw: np.ones((len(texts), 3), dtype=np.float32)
+        cache_dir = tempfile.mkdtemp()
+        try:
+            candidates = [{"text": t, "page_num": 0, "y": 0} for t in ("One", "Two", "Two")]
+            RankingEngine(cache_dir=cache_dir).rank_candidates(candidates, "query")
+            encoded = [call.args[0] for call in MockModel.return_value.encode.call_args_list]
+            self.assertEqual(encoded, [["One", "Two"], ["query"]])
+
+            # A new engine (new run) finds everything on disk
+            MockModel.return_value.encode.reset_mock()
+            engine = RankingEngine(cache_dir=cache_dir)
+            matches = engine.rank_candidates(candidates, "query")
+            self.assertEqual(len(matches), 3)
+            MockModel.return_value.encode.assert_not_called()
+            # The repeated "Two" is collapsed before the cache lookup
+            self.assertEqual(engine.cache.stats()["hits"], 3)
+        finally:
+            shutil.rmtree(cache_dir, ignore_errors=True)
+
+    @patch('src.ranking.SentenceTransformer')
+    def test_duplicate_texts_are_encoded_once(self, MockModel):
+        MockModel.return_value.tokenizer.do_lower_case = True
+        MockModel.return_value.encode.side_effect = lambda texts, **kw: torch.tensor(
+            [[float(len(t)), float(t[0] == "I")] for t in texts])
+
+        engine = RankingEngine()
+        texts = ["Ingredients", "Method", "INGREDIENTS", "Ingredients ", "Method"]
+        vectors = engine.encode(texts)
+        self.assertEqual(MockModel.return_value.encode.call_args.args[0], ["Ingredients", "Method"])
+        # Every input still gets its (shared) vector, in order
+        self.assertEqual(vectors[:, 0].tolist(), [11.0, 6.0, 11.0, 11.0, 6.0])
+
+        # Case is only folded when the tokenizer lowercases anyway
+        MockModel.return_value.tokenizer.do_lower_case = False
+        engine = RankingEngine(normalize_duplicates=True)
+        engine.encode(texts)
+        self.assertEqual(MockModel.return_value.encode.call_args.args[0], ["Ingredients", "Method", "INGREDIENTS"])
+
+        engine = RankingEngine(normalize_duplicates=False)
+        engine.encode(texts)
+        self.assertEqual(MockModel.return_value.encode.call_args.args[0],
+                         ["Ingredients", "Method", "INGREDIENTS", "Ingredients "])
+
+    @patch('src.ranking.SentenceTransformer')
+    def test_duplicate_headings_tie_by_candidate_order(self, MockModel):
+        vectors = {"query": [1.0, 0.0], "Key Attractions": [0.6, 0.8], "Nightlife": [0.0, 1.0]}
+        MockModel.return_value.encode.side_effect = lambda texts, **kw: torch.tensor(
+            vectors[texts] if isinstance(texts, str) else [vectors[t] for t in texts])
+
+        engine = RankingEngine()
+        texts = ["Nightlife", "Key Attractions", "Key Attractions", "Nightlife", "Key Attractions"]
+        candidates = [{"text": t, "page_num": 0, "y": y} for y, t in enumerate(texts)]
+        for _ in range(3):
+            matches = engine.rank_candidates(candidates, "query", top_k=3)
+            self.assertEqual([m["y"] for m in matches], [1, 2, 4])
+        matches = engine.rank_candidates(candidates, "query", top_k=4)
+        self.assertEqual([m["y"] for m in matches], [1, 2, 4, 0])
+
+    @patch('src.ranking.SentenceTransformer')
+    def test_int8_backend_quantizes_linear_layers(self, MockModel):
+        with patch('src.ranking.torch.ao.quantization.quantize_dynamic') as quantize:
+            engine = RankingEngine(backend="int8")
+        quantize.assert_called_once_with(MockModel.return_value, {torch.nn.Linear}, dtype=torch.qint8)
+        self.assertIs(engine.model, quantize.return_value)
+
+    @patch('src.ranking.SentenceTransformer')
+    def test_onnx_backend_needs_sentence_transformers_3_2(self, MockModel):
+        with patch('sentence_transformers.__version__', '2.7.0'):
+            with self.assertRaisesRegex(ImportError, "sentence-transformers>=3.2"):
+                RankingEngine(backend="onnx")
+        MockModel.assert_not_called()
+
+    def test_unknown_backend_is_rejected(self):
+        with self.assertRaises(ValueError):
+            RankingEngine(backend="tpu")
+
+    @patch('src.ranking.SentenceTransformer')
+    def test_backends_keep_separate_caches(self, MockModel):
+        cache_dir = tempfile.mkdtemp()
+        try:
+            with patch('src.ranking.torch.ao.quantization.quantize_dynamic', side_effect=lambda m, *a, **kw: m):
+                slugs = {RankingEngine(cache_dir=cache_dir, backend=b).cache.dir for b in ("torch", "int8")}
+            self.assertEqual(len(slugs), 2)
+        finally:
+            shutil.rmtree(cache_dir, ignore_errors=True)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
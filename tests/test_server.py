@@ -0,0 +1,74 @@
+import json
+import threading
+import unittest
+import urllib.request
+import zlib
+from unittest.mock import patch
+import numpy as np
+import torch
+from src.output import OutputGenerator
+from src.pipeline import process_documents
+from src.ranking import RankingEngine
+from src.server import MicroBatcher, RankingHTTPServer, RankingService
+
+def fake_encode(texts, **kwargs):
+    # Deterministic pseudo-embedding per text
+    if isinstance(texts, str):
+        return fake_encode([texts])[0]
+    return torch.tensor(np.array([np.random.default_rng(zlib.crc32(t.encode())).random(8) for t in texts], dtype=np.float32))
+
+class TestMicroBatcher(unittest.TestCase):
+    def test_concurrent_requests_share_encode_calls(self):
+        calls = []
+        def encode(texts):
+            calls.append(list(texts))
+            return [t.upper() for t in texts]
+
+        batcher = MicroBatcher(encode, max_wait=0.2)
+        results = {}
+        def job(n):
+            results[n] = batcher.encode([f"a{n}", f"b{n}"])
+        threads = [threading.Thread(target=job, args=(n,)) for n in range(8)]
+        for t in threads: t.start()
+        for t in threads: t.join()
+        batcher.close()
+
+        self.assertLess(len(calls), 8)
+        self.assertEqual(sum(len(c) for c in calls), 16)
+        for n in range(8):
+            self.assertEqual(results[n], [f"A{n}", f"B{n}"])
+
+class TestRankingServer(unittest.TestCase):
+    @patch('src.ranking.SentenceTransformer')
+    def test_rank_folder_matches_pipeline_output(self, MockModel):
+        MockModel.return_value.encode.side_effect = fake_encode
+        ranker = RankingEngine()
+        service = RankingService(ranker)
+        server = RankingHTTPServer(("127.0.0.1", 0), service)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            job = {"input": "tests/test_data", "persona": "Tester", "job": "summary conclusion", "top_k": 5}
+            request = urllib.request.Request(
+                f"http://127.0.0.1:{server.server_port}/rank",
+                data=json.dumps(job).encode("utf-8"), method="POST"
+            )
+            with urllib.request.urlopen(request) as response:
+                served = json.loads(response.read())
+        finally:
+            server.shutdown()
+            server.server_close()
+            service.batcher.close()
+
+        formatter = OutputGenerator(["sample.pdf"], "Tester", "summary conclusion", top_k=5)
+        for pdf_path, sections in process_documents(["tests/test_data/sample.pdf"], ranker, job["job"]):
+            for sec in sections:
+                formatter.add_result("sample.pdf", sec)
+        expected = formatter.build_output()
+
+        for output in (served, expected):
+            del output["metadata"]["processing_timestamp"]
+        self.assertEqual(served, expected)
+
+if __name__ == '__main__':
+    unittest.main()
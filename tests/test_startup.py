@@ -0,0 +1,53 @@
+import os
+import subprocess
+import sys
+import unittest
+
+# Cold-start budget (seconds) for importing the CLI without ranking.
+# Importing torch/sentence-transformers alone takes several seconds.
+COLD_START_BUDGET = 1.5
+
+PROBE = (
+    "import sys, time\n"
+    "start = time.perf_counter()\n"
+    "import {module}\n"
+    "elapsed = time.perf_counter() - start\n"
+    "heavy = sorted(m for m in ('torch', 'sentence_transformers') if m in sys.modules)\n"
+    "print(elapsed, *heavy)\n"
+)
+
+class TestStartup(unittest.TestCase):
+    def _import_probe(self, module):
+        out = subprocess.run(
+            [sys.executable, "-c", PROBE.format(module=module)],
+            check=True, capture_output=True, text=True, cwd=os.getcwd()
+        ).stdout.strip().splitlines()[-1].split()
+        return float(out[0]), out[1:]
+
+    def test_cli_import_is_light(self):
+        for module in ("src.main", "src.interactive_runner", "src.server", "src.index", "src.bench",
+                       "src.watch"):
+            elapsed, heavy = self._import_probe(module)
+            self.assertEqual(heavy, [], f"{module} imports {heavy} at load time")
+            self.assertLess(elapsed, COLD_START_BUDGET, f"{module} took {elapsed:.2f}s to import")
+
+    def test_help_and_parse_only_skip_torch(self):
+        code = (
+            "import sys, runpy\n"
+            "sys.argv = ['main', '--parse-only', '-i', 'tests/test_data', '-o', {out!r}]\n"
+            "runpy.run_module('src.main', run_name='__main__')\n"
+            "assert 'torch' not in sys.modules\n"
+        ).format(out=os.path.join("tests", "test_data", "parse_only_output.json"))
+        try:
+            subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, cwd=os.getcwd())
+        finally:
+            if os.path.exists("tests/test_data/parse_only_output.json"):
+                os.remove("tests/test_data/parse_only_output.json")
+
+        help_run = subprocess.run([sys.executable, "-m", "src.main", "--help"],
+                                  capture_output=True, text=True, timeout=30)
+        self.assertEqual(help_run.returncode, 0)
+        self.assertIn("--parse-only", help_run.stdout)
+
+if __name__ == '__main__':
+    unittest.main()
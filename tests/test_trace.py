@@ -0,0 +1,65 @@
+import json
+import os
+import tempfile
+import unittest
+from src import trace
+from src.pipeline import process_documents
+from tests.test_pipeline import FakeRanker
+
+class TestTrace(unittest.TestCase):
+    def tearDown(self):
+        trace.disable()
+
+    def test_disabled_records_nothing(self):
+        self.assertIsNone(trace.active())
+        self.assertIs(trace.span("a"), trace.span("b", document="x"))
+        with trace.span("a"):
+            trace.count("pages", 3)
+            trace.event("error")
+        self.assertIsNone(trace.disable())
+
+    def test_pipeline_spans_counters_and_errors(self):
+        tracer = trace.enable()
+        process_documents(["tests/test_data/sample.pdf", "tests/test_data/missing.pdf"], FakeRanker(), "query", top_k=3)
+        summary = tracer.summary()
+
+        for name in ("pipeline.parse", "pipeline.rank", "pipeline.extract", "document.parse",
+                     "parser.load_layout", "parser.extract_candidates", "parser.extract_sections"):
+            self.assertIn(name, summary["spans"])
+        self.assertEqual(summary["spans"]["document.parse"]["calls"], 2)
+        self.assertGreater(summary["counters"]["pages"], 0)
+        self.assertGreater(summary["counters"]["candidates"], 0)
+        self.assertEqual(summary["counters"]["sections"], 3)
+
+        errors = [e for e in tracer.events if e["name"] == "error"]
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(errors[0]["args"]["document"], "missing.pdf")
+
+    def test_save_chrome_and_jsonl(self):
+        tracer = trace.enable()
+        with trace.span("outer", document="a.pdf"):
+            with trace.span("inner"):
+                trace.count("texts", 5)
+        trace.disable()
+
+        with tempfile.TemporaryDirectory() as tmp:
+            chrome_path = os.path.join(tmp, "trace.json")
+            tracer.save(chrome_path)
+            with open(chrome_path, encoding="utf-8") as f:
+                chrome = json.load(f)
+            self.assertEqual({e["name"] for e in chrome["traceEvents"]}, {"outer", "inner", "texts"})
+            outer = next(e for e in chrome["traceEvents"] if e["name"] == "outer")
+            inner = next(e for e in chrome["traceEvents"] if e["name"] == "inner")
+            self.assertLessEqual(outer["ts"], inner["ts"])
+            self.assertGreaterEqual(outer["dur"], inner["dur"])
+            self.assertEqual(outer["args"], {"document": "a.pdf"})
+
+            jsonl_path = os.path.join(tmp, "trace.jsonl")
+            tracer.save(jsonl_path)
+            with open(jsonl_path, encoding="utf-8") as f:
+                lines = [json.loads(line) for line in f]
+            self.assertEqual(len(lines), 4)
+            self.assertEqual(lines[-1]["summary"]["counters"], {"texts": 5})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,5 @@
 import unittest
-from src.utils import clean_text, is_all_upper, is_title_case, is_bold_font
+from src.utils import clean_text, is_all_upper, is_title_case, is_bold_font, is_binary_data, text_profile
 
 class TestUtils(unittest.TestCase):
 
@@ -49,6 +49,23 @@ class TestUtils(unittest.TestCase):
         self.assertTrue(is_title_case("The Quick Brown Fox"))
         self.assertFalse(is_title_case("the quick brown fox"))
 
+    def test_clean_text_drops_non_printable_characters(self):
+        self.assertEqual(clean_text("\uf0b7 Bullet\tpoint\n\x0bnext "), "Bullet point next")
+
+    def test_is_binary_data_mixed_text(self):
+        self.assertFalse(is_binary_data("Line one\nLine two\t\r"))
+        self.assertFalse(is_binary_data(""))
+        self.assertTrue(is_binary_data("abc\x00"))
+        self.assertTrue(is_binary_data("\x01\x02 text"))
+        self.assertTrue(is_binary_data(None))
+
+    def test_text_profile(self):
+        profile = text_profile("CHAPTER 2 OVERVIEW")
+        self.assertEqual((profile.is_binary, profile.is_upper, profile.is_title, profile.word_count),
+                         (False, True, True, 3))
+        self.assertEqual(text_profile("\x00\x01").is_binary, True)
+        self.assertFalse(is_title_case(None))
+
     def test_is_bold_font(self):
         bold_span_flag = {"flags": 2, "font": "Arial"} 
         bold_span_name = {"flags": 0, "font": "Arial-Bold"}
@@ -0,0 +1,108 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+from src import watch
+from src.output import OutputGenerator
+from src.pipeline import process_documents
+from src.watch import FolderWatcher, WatchSession
+from tests.test_pipeline import FakeRanker
+
+class TestFolderWatcher(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def _write(self, name, data, mtime):
+        path = os.path.join(self.tmp, name)
+        with open(path, "wb") as f:
+            f.write(data)
+        os.utime(path, ns=(mtime, mtime))
+        return path
+
+    def test_files_are_returned_once_they_settle(self):
+        watcher = FolderWatcher(self.tmp, settle=2)
+        path = self._write("a.pdf", b"%PDF-", 1)
+        self.assertEqual(watcher.poll(now=0), ([], []))
+
+        # Still growing: the settle time starts again
+        self._write("a.pdf", b"%PDF-1.7 more", 2)
+        self.assertEqual(watcher.poll(now=1.5), ([], []))
+        self.assertEqual(watcher.poll(now=3), ([], []))
+        self.assertEqual(watcher.poll(now=3.5), ([path], []))
+        self.assertEqual(watcher.poll(now=10), ([], []))
+
+        # Changed later: returned again; removed: reported once
+        self._write("a.pdf", b"%PDF-1.7 changed", 3)
+        watcher.poll(now=11)
+        self.assertEqual(watcher.poll(now=13), ([path], []))
+        os.remove(path)
+        self.assertEqual(watcher.poll(now=14), ([], [path]))
+        self.assertEqual(watcher.poll(now=15), ([], []))
+
+    def test_empty_files_are_not_ready(self):
+        watcher = FolderWatcher(self.tmp, settle=0)
+        self._write("empty.pdf", b"", 1)
+        watcher.poll(now=0)
+        self.assertEqual(watcher.poll(now=1), ([], []))
+
+class TestWatchSession(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.inbox = os.path.join(self.tmp, "inbox")
+        os.makedirs(self.inbox)
+        self.output = os.path.join(self.tmp, "result.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def _add(self, name):
+        path = os.path.join(self.inbox, name)
+        shutil.copy("tests/test_data/sample.pdf", path)
+        return path
+
+    def _read(self):
+        with open(self.output, encoding="utf-8") as f:
+            output = json.load(f)
+        del output["metadata"]["processing_timestamp"]
+        return output
+
+    def _full_run(self, pdf_paths):
+        formatter = OutputGenerator([os.path.basename(p) for p in pdf_paths], "P", "J")
+        for pdf_path, sections in process_documents(pdf_paths, FakeRanker(), "J", top_k=10):
+            for sec in sections:
+                formatter.add_result(os.path.basename(pdf_path), sec)
+        output = formatter.build_output()
+        del output["metadata"]["processing_timestamp"]
+        return output
+
+    def test_only_new_files_are_processed(self):
+        session = WatchSession(self.output, "P", "J", FakeRanker())
+        first = self._add("a.pdf")
+        watcher = FolderWatcher(self.inbox, settle=0)
+        watcher.poll()
+        self.assertEqual(watch.watch(watcher, session, interval=0, polls=1), 1)
+        self.assertEqual(self._read(), self._full_run([first]))
+
+        second = self._add("b.pdf")
+        with patch("src.watch.process_documents", wraps=process_documents) as run:
+            watcher.poll()
+            watch.watch(watcher, session, interval=0, polls=2)
+        self.assertEqual([call.args[0] for call in run.call_args_list], [[second]])
+        self.assertEqual(self._read(), self._full_run([first, second]))
+
+        # A removed PDF leaves the result without re-processing the others
+        os.remove(first)
+        with patch("src.watch.process_documents") as run:
+            watch.watch(watcher, session, interval=0, polls=1)
+        run.assert_not_called()
+        self.assertEqual(self._read(), self._full_run([second]))
+        # No temporary file is left behind
+        self.assertEqual(sorted(os.listdir(self.tmp)), ["inbox", "result.json"])
+
+if __name__ == '__main__':
+    unittest.main()